@@ -0,0 +1,126 @@
+"""
+Laporan recall@k vs latensi indeks ANN IVF-PQ terhadap pencarian exact (brute force).
+
+Embedding diambil dari indeks yang ditulis perda_processor.py --embeddings (--index), atau dibuat
+sintetis (--synthetic N) dengan cluster bertingkat (topik -> sub-topik -> chunk) seperti
+embedding kalimat. Query adalah embedding chunk acak yang diberi gangguan. Untuk setiap
+kombinasi nprobe x refine_factor dilaporkan recall@k (irisan dengan top-k exact),
+latensi rata-rata/p95, dan ukuran kode PQ dibanding matriks float16.
+
+Contoh:
+    python benchmarks/bench_ann.py --synthetic 100000 --nprobe 1 4 8 16 32 --refine 0 4 16
+    python benchmarks/bench_ann.py --index data/perda_index
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(REPO_ROOT, "src"))
+from ann_index import IVFPQIndex
+from index_store import load_chunk_embeddings
+from scoring import dense_top_k
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DEFAULT_OUTPUT_FILE = os.path.join(REPO_ROOT, "benchmarks", "results", "ann.json")
+EMBEDDING_DIM = 384 # Dimensi paraphrase-multilingual-MiniLM-L12-v2
+QUERY_NOISE = 0.05
+
+def synthetic_embeddings(num_vectors: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    """Embedding float16 ternormalisasi dengan cluster bertingkat."""
+    num_topics = max(1, int(np.sqrt(num_vectors) / 4))
+    topics = rng.standard_normal((num_topics, dim))
+    subtopics = topics[rng.integers(0, num_topics, num_topics * 8)] + 0.6 * rng.standard_normal((num_topics * 8, dim))
+    embeddings = np.empty((num_vectors, dim), dtype=np.float16)
+    for start in range(0, num_vectors, 65536):
+        rows = min(65536, num_vectors - start)
+        block = subtopics[rng.integers(0, len(subtopics), rows)] + 0.5 * rng.standard_normal((rows, dim))
+        embeddings[start:start + rows] = block / np.linalg.norm(block, axis=1, keepdims=True)
+    return embeddings
+
+def main():
+    parser = argparse.ArgumentParser(description='Recall@k vs latensi indeks ANN IVF-PQ.')
+    parser.add_argument('--index', type=str, default=None, help='Indeks dengan embedding chunk (ditulis perda_processor.py).')
+    parser.add_argument('--synthetic', type=int, default=100_000, help='Jumlah embedding sintetis jika --index tidak diberikan.')
+    parser.add_argument('--k', type=int, default=20, help='Jumlah tetangga (recall@k).')
+    parser.add_argument('--queries', type=int, default=200, help='Jumlah query.')
+    parser.add_argument('--nlist', type=int, default=0, help='Jumlah list IVF (0: sekitar akar jumlah vektor).')
+    parser.add_argument('--m', type=int, default=0, help='Jumlah sub-quantizer PQ (0: sub-vektor 8 dimensi).')
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 4, 8, 16, 32], help='Nilai nprobe yang diuji.')
+    parser.add_argument('--refine', type=int, nargs='+', default=[0, 4, 16], help='Nilai refine_factor yang diuji.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', type=str, default=DEFAULT_OUTPUT_FILE, help='File JSON hasil.')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if args.index:
+        loaded = load_chunk_embeddings(args.index)
+        if loaded is None:
+            logging.error(f"Indeks {args.index} tidak menyimpan embedding chunk.")
+            return
+        embeddings, source = loaded[0], f"{args.index} ({loaded[1]})"
+    else:
+        embeddings, source = synthetic_embeddings(args.synthetic, EMBEDDING_DIM, rng), "synthetic"
+
+    start = time.perf_counter()
+    ann_index = IVFPQIndex.build(embeddings, args.nlist, args.m, seed=args.seed)
+    build_seconds = time.perf_counter() - start
+
+    sample = rng.choice(len(embeddings), min(args.queries, len(embeddings)), replace=False)
+    queries = np.asarray(embeddings[sample], dtype=np.float32)
+    queries += QUERY_NOISE * rng.standard_normal(queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    exact_latencies, exact_results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        exact_results.append(dense_top_k(query, embeddings, args.k)[0])
+        exact_latencies.append(time.perf_counter() - start)
+    exact_ms = 1000 * float(np.mean(exact_latencies))
+    logging.info(f"{len(embeddings)} vektor ({source}), exact: {exact_ms:.2f} ms/query, build ANN {build_seconds:.1f} s")
+
+    results = []
+    print(f"{'nprobe':>7}{'refine':>7}{'recall@' + str(args.k):>11}{'ms/q':>8}{'p95':>8}{'speedup':>9}")
+    for nprobe in args.nprobe:
+        for refine_factor in args.refine:
+            latencies, recalls = [], []
+            for query, exact in zip(queries, exact_results):
+                start = time.perf_counter()
+                found, _ = ann_index.search(query, args.k, nprobe, refine_factor, embeddings)
+                latencies.append(time.perf_counter() - start)
+                recalls.append(len(np.intersect1d(found, exact)) / len(exact) if len(exact) else 1.0)
+            latencies_ms = 1000 * np.array(latencies)
+            result = {
+                'nprobe': nprobe,
+                'refine_factor': refine_factor,
+                'recall': round(float(np.mean(recalls)), 4),
+                'mean_ms': round(float(latencies_ms.mean()), 3),
+                'p95_ms': round(float(np.percentile(latencies_ms, 95)), 3),
+                'speedup': round(exact_ms / float(latencies_ms.mean()), 1),
+            }
+            results.append(result)
+            print(f"{nprobe:>7}{refine_factor:>7}{result['recall']:>11.3f}{result['mean_ms']:>8.2f}"
+                  f"{result['p95_ms']:>8.2f}{result['speedup']:>8.1f}x")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'source': source,
+            'num_vectors': int(len(embeddings)),
+            'k': args.k,
+            'ann': ann_index.params(),
+            'build_seconds': round(build_seconds, 2),
+            'pq_code_bytes': int(ann_index.codes.nbytes),
+            'float16_bytes': int(embeddings.nbytes),
+            'exact_ms': round(exact_ms, 3),
+            'results': results,
+        }, f, indent=2)
+    logging.info(f"Hasil disimpan ke {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Benchmark kernel scoring TF-IDF tahap pertama pada matriks sintetis 10k/100k/1M chunk.
+
+Membandingkan jalur lama (sklearn cosine_similarity + argsort seluruh skor) dengan
+scoring.tfidf_top_k (dot product + partial sort), dan memeriksa bahwa keduanya
+mengembalikan kandidat yang sama. Untuk BM25, scoring.bm25_top_k dengan pruning MaxScore
+dibandingkan dengan scoring menyeluruh (prune=False), termasuk proporsi posting yang
+dipindai.
+
+Matriks dibuat langsung dalam format CSR dengan distribusi term Zipf, ~60 term per
+chunk (seperti indeks reference/nasional), dan ukuran vocabulary yang tumbuh
+mengikuti hukum Heaps.
+
+Contoh:
+    python benchmarks/bench_first_stage.py --sizes 10000 100000 1000000 --k 50
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.metrics.pairwise import cosine_similarity
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(REPO_ROOT, "src"))
+from index_store import BM25Index
+from scoring import bm25_top_k, tfidf_top_k
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DEFAULT_OUTPUT_FILE = os.path.join(REPO_ROOT, "benchmarks", "results", "first_stage.json")
+TERMS_PER_CHUNK = 60
+# Heaps: vocabulary ~6k term pada ~1.7k chunk (korpus saat ini)
+BASE_CHUNKS, BASE_VOCABULARY = 1700, 6000
+TERMS_PER_QUERY = (4, 12)
+BLOCK_ROWS = 100_000
+
+def zipf_probabilities(vocabulary_size: int) -> np.ndarray:
+    probabilities = 1.0 / np.arange(1, vocabulary_size + 1)
+    return probabilities / probabilities.sum()
+
+def synthetic_tfidf_matrix(num_chunks: int, rng: np.random.Generator, dtype: str) -> csr_matrix:
+    """Membuat matriks CSR ber-norma L2 per baris dengan TERMS_PER_CHUNK term per chunk."""
+    vocabulary_size = int(BASE_VOCABULARY * (num_chunks / BASE_CHUNKS) ** 0.5)
+    probabilities = zipf_probabilities(vocabulary_size)
+    nnz = num_chunks * TERMS_PER_CHUNK
+    indices = np.empty(nnz, dtype=np.int32)
+    data = np.empty(nnz, dtype=dtype)
+    # Dibangun per blok baris agar array sementara tidak sebesar seluruh matriks
+    for start in range(0, num_chunks, BLOCK_ROWS):
+        rows = min(BLOCK_ROWS, num_chunks - start)
+        block = slice(start * TERMS_PER_CHUNK, (start + rows) * TERMS_PER_CHUNK)
+        columns = rng.choice(vocabulary_size, size=(rows, TERMS_PER_CHUNK), p=probabilities)
+        columns.sort(axis=1)
+        indices[block] = columns.ravel()
+        values = rng.random((rows, TERMS_PER_CHUNK))
+        values /= np.linalg.norm(values, axis=1, keepdims=True)
+        data[block] = values.ravel()
+    indptr = np.arange(0, nnz + 1, TERMS_PER_CHUNK, dtype=np.int64)
+    return csr_matrix((data, indices, indptr), shape=(num_chunks, vocabulary_size))
+
+def synthetic_queries(num_queries: int, vocabulary_size: int, rng: np.random.Generator, dtype: str) -> list:
+    """Membuat vektor query ber-norma L2 dengan term yang diambil dari distribusi yang sama."""
+    probabilities = zipf_probabilities(vocabulary_size)
+    queries = []
+    for _ in range(num_queries):
+        terms = np.unique(rng.choice(vocabulary_size, size=rng.integers(*TERMS_PER_QUERY), p=probabilities))
+        values = rng.random(len(terms))
+        values /= np.linalg.norm(values)
+        queries.append(csr_matrix((values.astype(dtype), terms.astype(np.int32), [0, len(terms)]),
+                                  shape=(1, vocabulary_size)))
+    return queries
+
+def cosine_argsort_top_k(query_vector: csr_matrix, tfidf_matrix: csr_matrix, k: int):
+    """Jalur lama DocumentRetriever.retrieve_chunks."""
+    scores = cosine_similarity(query_vector, tfidf_matrix).flatten()
+    top_indices = scores.argsort()[-k:][::-1]
+    top_indices = np.array([i for i in top_indices if scores[i] > 0], dtype=np.int64)
+    return top_indices, scores[top_indices]
+
+def time_bm25(bm25_index: BM25Index, queries, k: int, repeat: int, prune: bool) -> dict:
+    latencies = []
+    postings_total = postings_scanned = postings_probed = 0
+    for _ in range(repeat):
+        for query_vector in queries:
+            stats = {}
+            start = time.perf_counter()
+            bm25_top_k(bm25_index, query_vector.indices, np.ones(query_vector.nnz), k, prune=prune, stats=stats)
+            latencies.append(time.perf_counter() - start)
+            postings_total += stats['postings_total']
+            postings_scanned += stats['postings_scanned']
+            postings_probed += stats['postings_probed']
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'mean_ms': round(float(latencies_ms.mean()), 3),
+        'p95_ms': round(float(np.percentile(latencies_ms, 95)), 3),
+        'postings_scanned_fraction': round(postings_scanned / postings_total, 4) if postings_total else None,
+        # Posting yang disentuh: dipindai penuh ditambah yang dibaca binary search kandidat
+        'postings_touched_fraction': round((postings_scanned + postings_probed) / postings_total, 4) if postings_total else None,
+    }
+
+def time_kernel(kernel, queries, tfidf_matrix, k: int, repeat: int) -> dict:
+    latencies = []
+    for _ in range(repeat):
+        for query_vector in queries:
+            start = time.perf_counter()
+            kernel(query_vector, tfidf_matrix, k)
+            latencies.append(time.perf_counter() - start)
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'mean_ms': round(float(latencies_ms.mean()), 3),
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(latencies_ms, 95)), 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark kernel scoring TF-IDF tahap pertama.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000], help='Jumlah chunk matriks sintetis.')
+    parser.add_argument('--k', type=int, default=50, help='Jumlah kandidat (initial_k).')
+    parser.add_argument('--queries', type=int, default=50, help='Jumlah query sintetis.')
+    parser.add_argument('--repeat', type=int, default=3, help='Pengulangan seluruh query.')
+    parser.add_argument('--dtype', type=str, default='float64', choices=['float64', 'float32'], help='Tipe nilai matriks.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', type=str, default=DEFAULT_OUTPUT_FILE, help='File JSON hasil.')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    results = []
+    for num_chunks in args.sizes:
+        tfidf_matrix = synthetic_tfidf_matrix(num_chunks, rng, args.dtype)
+        queries = synthetic_queries(args.queries, tfidf_matrix.shape[1], rng, args.dtype)
+
+        # Kedua jalur harus memilih kandidat yang sama (urutan skor seri boleh berbeda)
+        for query_vector in queries:
+            old_indices, old_scores = cosine_argsort_top_k(query_vector, tfidf_matrix, args.k)
+            new_indices, new_scores = tfidf_top_k(query_vector, tfidf_matrix, args.k)
+            np.testing.assert_allclose(np.sort(new_scores), np.sort(old_scores), rtol=1e-5)
+
+        old = time_kernel(cosine_argsort_top_k, queries, tfidf_matrix, args.k, args.repeat)
+        new = time_kernel(tfidf_top_k, queries, tfidf_matrix, args.k, args.repeat)
+        # BM25: frekuensi term 1-3 pada pola sparsity yang sama
+        term_frequencies = tfidf_matrix.copy()
+        term_frequencies.data = rng.integers(1, 4, size=term_frequencies.nnz).astype(np.float64)
+        bm25_index = BM25Index.from_term_frequencies(term_frequencies)
+        del term_frequencies
+        for query_vector in queries:
+            pruned = bm25_top_k(bm25_index, query_vector.indices, np.ones(query_vector.nnz), args.k)
+            exhaustive = bm25_top_k(bm25_index, query_vector.indices, np.ones(query_vector.nnz), args.k, prune=False)
+            assert pruned[0].tolist() == exhaustive[0].tolist()
+        bm25_exhaustive = time_bm25(bm25_index, queries, args.k, args.repeat, prune=False)
+        bm25_pruned = time_bm25(bm25_index, queries, args.k, args.repeat, prune=True)
+
+        result = {
+            'num_chunks': num_chunks,
+            'vocabulary_size': tfidf_matrix.shape[1],
+            'nnz': int(tfidf_matrix.nnz),
+            'dtype': args.dtype,
+            'k': args.k,
+            'cosine_argsort': old,
+            'tfidf_top_k': new,
+            'speedup': round(old['mean_ms'] / new['mean_ms'], 1) if new['mean_ms'] else None,
+            'bm25_exhaustive': bm25_exhaustive,
+            'bm25_maxscore': bm25_pruned,
+        }
+        results.append(result)
+        logging.info(
+            f"{num_chunks} chunks: cosine+argsort {old['mean_ms']:.2f} ms (p95 {old['p95_ms']:.2f}), "
+            f"tfidf_top_k {new['mean_ms']:.2f} ms (p95 {new['p95_ms']:.2f}), {result['speedup']}x; "
+            f"BM25 menyeluruh {bm25_exhaustive['mean_ms']:.2f} ms, MaxScore {bm25_pruned['mean_ms']:.2f} ms "
+            f"({bm25_pruned['postings_scanned_fraction']:.1%} posting dipindai, "
+            f"{bm25_pruned['postings_touched_fraction']:.1%} disentuh)"
+        )
+        del tfidf_matrix, queries, bm25_index
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    logging.info(f"Hasil disimpan ke {args.output}")
+
+if __name__ == "__main__":
+    main()
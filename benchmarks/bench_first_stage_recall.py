@@ -0,0 +1,108 @@
+"""
+Recall kandidat tahap pertama (TF-IDF, BM25, hybrid) terhadap initial_k.
+
+Untuk setiap pertanyaan di data/new_evaluation.json dan setiap initial_k, diukur
+seberapa baik kandidat tahap pertama memuat jawaban. Karena reranker hanya bisa
+mengurutkan ulang kandidat ini, recall kandidat adalah batas atas kualitas akhir:
+- best_chunk_coverage: proporsi kata isi ground truth yang tercakup oleh satu kandidat
+  terbaik (ground truth berupa parafrase, jarang muncul utuh di chunk)
+- substring_hit: ground truth muncul utuh di salah satu kandidat (kriteria 2_calculate_metrics.py)
+
+Laporan juga menyebut initial_k terkecil per metode yang mencapai best_chunk_coverage
+TF-IDF pada initial_k terbesar, yaitu jumlah pasangan CrossEncoder per query yang
+dibutuhkan untuk kualitas yang sama.
+
+Contoh:
+    python benchmarks/bench_first_stage_recall.py --index data/perda_index --ks 10 20 50 100 200
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+from typing import Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(REPO_ROOT, "src"))
+from retriever import FIRST_STAGES, DocumentRetriever
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from bench_tfidf_options import content_terms
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DEFAULT_EVALUATION_FILE = os.path.join(REPO_ROOT, "data", "new_evaluation.json")
+DEFAULT_OUTPUT_FILE = os.path.join(REPO_ROOT, "benchmarks", "results", "first_stage_recall.json")
+
+def candidate_recall(retriever: DocumentRetriever, evaluation: List[dict], first_stage: str, k: int) -> dict:
+    """
+    Mengukur recall ground truth dan latensi tahap pertama untuk satu metode dan initial_k.
+
+    Args:
+        retriever (DocumentRetriever): Retriever yang sudah dimuat.
+        evaluation (List[dict]): Pertanyaan dan ground truth.
+        first_stage (str): Metode tahap pertama.
+        k (int): Jumlah kandidat (initial_k).
+
+    Returns:
+        dict: best_chunk_coverage, substring_hit, latensi rata-rata per query (ms), dan
+        jumlah kandidat rata-rata.
+    """
+    questions = [item['question'] for item in evaluation]
+    start = time.perf_counter()
+    results = retriever.retrieve_chunks_batch(questions, top_k=k, use_reranker=False, first_stage=first_stage)
+    elapsed = time.perf_counter() - start
+    hits, coverages = [], []
+    for item, result in zip(evaluation, results):
+        ground_truth = item['ground_truth'].lower()
+        hits.append(any(ground_truth in chunk.lower() for chunk, _ in result))
+        gt_terms = content_terms(ground_truth)
+        coverages.append(max((len(gt_terms & content_terms(chunk)) / len(gt_terms) for chunk, _ in result), default=0.0)
+                         if gt_terms else 0.0)
+    return {
+        'best_chunk_coverage': round(sum(coverages) / len(coverages), 4) if coverages else 0.0,
+        'substring_hit': round(sum(hits) / len(hits), 4) if hits else 0.0,
+        'ms_per_query': round(1000 * elapsed / len(questions), 3) if questions else 0.0,
+        'mean_candidates': round(sum(len(result) for result in results) / len(results), 1) if results else 0.0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Recall kandidat tahap pertama terhadap initial_k.')
+    parser.add_argument('--index', type=str, default=os.path.join(REPO_ROOT, "data", "perda_index"), help='Indeks yang ditulis perda_processor.py.')
+    parser.add_argument('--evaluation', type=str, default=DEFAULT_EVALUATION_FILE, help='File evaluasi (question, ground_truth).')
+    parser.add_argument('--ks', type=int, nargs='+', default=[5, 10, 20, 50, 100, 200, 500], help='Nilai initial_k yang diuji.')
+    parser.add_argument('--first-stages', type=str, nargs='+', default=list(FIRST_STAGES), choices=list(FIRST_STAGES), help='Metode tahap pertama yang dibandingkan.')
+    parser.add_argument('--output', type=str, default=DEFAULT_OUTPUT_FILE, help='File JSON hasil.')
+    args = parser.parse_args()
+
+    with open(args.evaluation, 'r', encoding='utf-8') as f:
+        evaluation = [item for item in json.load(f) if item.get('question') and item.get('ground_truth')]
+    retriever = DocumentRetriever(data_path=args.index)
+    # Metode yang datanya tidak ada di indeks akan jatuh ke TF-IDF; jangan dilaporkan sebagai metodenya sendiri
+    first_stages = [stage for stage in args.first_stages if retriever._resolve_first_stage(stage) == stage]
+    logging.getLogger().setLevel(logging.WARNING)
+
+    ks = sorted(args.ks)
+    results: Dict[str, Dict[int, dict]] = {
+        stage: {k: candidate_recall(retriever, evaluation, stage, k) for k in ks} for stage in first_stages
+    }
+
+    target = results['tfidf'][ks[-1]]['best_chunk_coverage'] if 'tfidf' in results else None
+    print("best_chunk_coverage")
+    print(f"{'initial_k':>10}" + "".join(f"{stage:>12}" for stage in first_stages))
+    for k in ks:
+        print(f"{k:>10}" + "".join(f"{results[stage][k]['best_chunk_coverage']:>12.3f}" for stage in first_stages))
+    summary = {}
+    for stage in first_stages:
+        reaching = [k for k in ks if target is not None and results[stage][k]['best_chunk_coverage'] >= target]
+        summary[stage] = reaching[0] if reaching else None
+        print(f"{stage}: initial_k minimum untuk coverage TF-IDF@{ks[-1]} ({target}): {summary[stage]}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'index': args.index, 'questions': len(evaluation), 'results': results,
+                   'min_initial_k_for_tfidf_recall': summary}, f, indent=2)
+    logging.warning(f"Hasil disimpan ke {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Benchmark end-to-end pipeline ingestion (perda_processor.py) pada korpus sintetis.
+
+Setiap run menjalankan perda_processor sebagai subprocess (build penuh) dan mencatat
+waktu, peak RSS, ukuran indeks, statistik per tahap dari laporan build, serta commit
+git ke file JSONL sehingga hasil dapat dibandingkan antar-commit. Build berjalan tanpa
+embedding chunk kecuali --processor-args --embeddings diberikan.
+
+Contoh:
+    python benchmarks/bench_ingestion.py --scales 1 10 50 --workers 1 4
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import logging
+import tempfile
+import subprocess
+from typing import List, Optional
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from synthetic_corpus import generate_corpus
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROCESSOR_SCRIPT = os.path.join(REPO_ROOT, "src", "perda_processor.py")
+DEFAULT_RESULTS_FILE = os.path.join(REPO_ROOT, "benchmarks", "results", "ingestion.jsonl")
+DEFAULT_CORPUS_DIR = os.path.join(tempfile.gettempdir(), "perda_bench_corpus")
+
+def git_commit() -> Optional[str]:
+    """Commit git saat ini (ditandai '-dirty' jika ada perubahan yang belum di-commit)."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return f"{commit}-dirty" if dirty else commit
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def path_size(path: str) -> int:
+    """Ukuran file, atau total ukuran isi direktori, dalam byte."""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+def run_ingestion(corpus_dir: str, output_dir: str, workers: int, extra_args: List[str]) -> dict:
+    """
+    Menjalankan perda_processor.py sebagai subprocess dan mengukur sumber dayanya.
+
+    Peak RSS diambil dari rusage subprocess (wait4), yaitu RSS maksimum proses utama
+    atau worker-nya, sehingga tidak tercampur memori proses benchmark ini.
+
+    Args:
+        corpus_dir (str): Direktori PDF input.
+        output_dir (str): Direktori kerja untuk indeks, manifest, dan laporan.
+        workers (int): Nilai --workers.
+        extra_args (List[str]): Argumen tambahan untuk perda_processor.py.
+
+    Returns:
+        dict: Hasil pengukuran satu run.
+    """
+    index_path = os.path.join(output_dir, "perda_index")
+    report_path = os.path.join(output_dir, "report.json")
+    command = [
+        sys.executable, PROCESSOR_SCRIPT, corpus_dir, "--output", index_path, "--report", report_path,
+        "--workers", str(workers), "--full-rebuild", "--log-level", "WARNING",
+        # Embedding diukur terpisah; aktifkan lewat --processor-args --embeddings (flag terakhir menang)
+        "--no-embeddings",
+    ] + extra_args
+
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=REPO_ROOT)
+    _, status, rusage = os.wait4(process.pid, 0)
+    wall_seconds = time.perf_counter() - start
+    # Proses sudah di-reap oleh wait4; returncode diisi agar Popen tidak menunggunya lagi
+    process.returncode = exit_code = os.waitstatus_to_exitcode(status)
+    if exit_code != 0 or not os.path.exists(report_path):
+        raise RuntimeError(f"perda_processor.py gagal (exit code {exit_code}).")
+
+    with open(report_path, 'r', encoding='utf-8') as f:
+        report = json.load(f)
+    return {
+        'wall_seconds': round(wall_seconds, 3),
+        # ru_maxrss dalam KB di Linux
+        'peak_rss_mb': round(rusage.ru_maxrss / 1024, 1),
+        'index_bytes': path_size(index_path),
+        'manifest_bytes': path_size(os.path.join(output_dir, "perda_index_manifest.pkl")),
+        # Jumlah chunk yang diindeks (setelah deduplikasi)
+        'chunks': report['stages']['vectorizing']['items'],
+        'pages': sum(doc['pages'] for doc in report['documents'].values()),
+        'stages': {stage: entry['seconds'] for stage, entry in report['stages'].items()},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark pipeline ingestion pada korpus PDF sintetis.')
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10], help='Kelipatan ukuran korpus terhadap korpus saat ini (14 PDF).')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1], help='Nilai --workers yang diuji.')
+    parser.add_argument('--repeat', type=int, default=1, help='Jumlah pengulangan per konfigurasi.')
+    parser.add_argument('--seed', type=int, default=42, help='Seed korpus sintetis.')
+    parser.add_argument('--corpus-dir', type=str, default=DEFAULT_CORPUS_DIR, help='Direktori cache korpus sintetis (dipakai ulang antar-run).')
+    parser.add_argument('--results', type=str, default=DEFAULT_RESULTS_FILE, help='File JSONL tempat hasil ditambahkan.')
+    parser.add_argument('--processor-args', type=str, nargs=argparse.REMAINDER, default=[], help='Argumen tambahan untuk perda_processor.py (harus di posisi terakhir).')
+    args = parser.parse_args()
+
+    commit = git_commit()
+    os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+    for scale in args.scales:
+        corpus_dir = os.path.join(args.corpus_dir, f"scale_{scale:g}_seed_{args.seed}")
+        num_documents, _ = generate_corpus(corpus_dir, scale, args.seed)
+        corpus_bytes = path_size(corpus_dir)
+        for workers in args.workers:
+            for repeat in range(args.repeat):
+                output_dir = tempfile.mkdtemp(prefix="perda_bench_")
+                try:
+                    result = run_ingestion(corpus_dir, output_dir, workers, args.processor_args)
+                finally:
+                    shutil.rmtree(output_dir, ignore_errors=True)
+                record = {
+                    'benchmark': 'ingestion',
+                    'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                    'commit': commit,
+                    'python': platform.python_version(),
+                    'machine': f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPU",
+                    'scale': scale,
+                    'seed': args.seed,
+                    'documents': num_documents,
+                    'corpus_bytes': corpus_bytes,
+                    'workers': workers,
+                    'repeat': repeat,
+                    'processor_args': args.processor_args,
+                    **result,
+                }
+                with open(args.results, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record) + "\n")
+                pages_per_sec = result['pages'] / result['wall_seconds'] if result['wall_seconds'] else 0
+                logging.info(
+                    f"scale={scale:g} docs={num_documents} workers={workers}: {result['wall_seconds']:.2f} s, "
+                    f"{pages_per_sec:.0f} halaman/s, peak RSS {result['peak_rss_mb']:.0f} MB, "
+                    f"indeks {result['index_bytes'] / 1e6:.1f} MB, {result['chunks']} chunks"
+                )
+    logging.info(f"Hasil ditambahkan ke {args.results}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Throughput reranking di bawah beban serentak: predict langsung per thread vs MicroBatchReranker.
+
+Sejumlah thread klien (mensimulasikan sesi Streamlit) masing-masing mengirim pertanyaan dari
+data/new_evaluation.json beserta initial_k kandidat TF-IDF-nya ke satu CrossEncoder bersama.
+Mode 'direct' memanggil predict_bucketed di thread klien (seperti sebelum ada worker),
+mode 'service' mengirimnya ke MicroBatchReranker. Dilaporkan throughput (query/detik),
+latensi per query, dan rata-rata request per batch gabungan.
+
+Contoh:
+    python benchmarks/bench_rerank_service.py --concurrency 1 2 4 8 --initial-k 50 --wait-ms 5
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import threading
+from typing import List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(REPO_ROOT, "src"))
+from sentence_transformers import CrossEncoder
+from config import AppConfig
+from index_store import load_index
+from rerank_service import MicroBatchReranker
+from reranking import configure_torch_threads, predict_bucketed
+from retriever import RERANKER_MODEL
+from scoring import tfidf_top_k
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from bench_reranker_batching import latency_summary
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DEFAULT_EVALUATION_FILE = os.path.join(REPO_ROOT, "data", "new_evaluation.json")
+DEFAULT_OUTPUT_FILE = os.path.join(REPO_ROOT, "benchmarks", "results", "rerank_service.json")
+
+def run_clients(score, requests: List[list], concurrency: int) -> dict:
+    """
+    Menjalankan request oleh sejumlah thread klien; setiap klien mengambil request berikutnya
+    begitu request sebelumnya selesai.
+
+    Returns:
+        dict: Throughput (query/detik) dan ringkasan latensi per query.
+    """
+    latencies: List[float] = []
+    lock = threading.Lock()
+    next_request = iter(range(len(requests)))
+
+    def client():
+        while True:
+            with lock:
+                i = next(next_request, None)
+            if i is None:
+                return
+            start = time.perf_counter()
+            score(requests[i])
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    return {'queries_per_second': round(len(requests) / wall, 2), **latency_summary(latencies)}
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark reranking serentak: langsung vs micro-batching.')
+    parser.add_argument('--index', type=str, default=os.path.join(REPO_ROOT, "data", "perda_index"), help='Indeks mmap (ditulis perda_processor.py).')
+    parser.add_argument('--evaluation', type=str, default=DEFAULT_EVALUATION_FILE, help='File evaluasi.')
+    parser.add_argument('--initial-k', type=int, default=50, help='Jumlah kandidat yang direrank per query.')
+    parser.add_argument('--queries', type=int, default=64, help='Jumlah query per pengukuran.')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8], help='Jumlah klien serentak.')
+    parser.add_argument('--max-batch-pairs', type=int, default=AppConfig.RERANKER_MICRO_BATCH_MAX_PAIRS, help='Batas pasangan per batch gabungan.')
+    parser.add_argument('--wait-ms', type=float, default=AppConfig.RERANKER_MICRO_BATCH_WAIT_MS, help='Jendela tunggu worker (ms).')
+    parser.add_argument('--output', type=str, default=DEFAULT_OUTPUT_FILE, help='File JSON hasil.')
+    args = parser.parse_args()
+
+    with open(args.evaluation, 'r', encoding='utf-8') as f:
+        questions = [item['question'] for item in json.load(f) if item.get('question')]
+    questions = (questions * (args.queries // max(len(questions), 1) + 1))[:args.queries]
+    chunks, vectorizer, tfidf_matrix = load_index(args.index)
+    requests = [
+        [[question, chunks[i]] for i in tfidf_top_k(vectorizer.transform([question]), tfidf_matrix, args.initial_k)[0]]
+        for question in questions
+    ]
+    configure_torch_threads(AppConfig.RERANKER_NUM_THREADS)
+    model = CrossEncoder(RERANKER_MODEL, max_length=AppConfig.RERANKER_MAX_LENGTH)
+    batch_size = AppConfig.RERANKER_BATCH_SIZE
+    predict_bucketed(model, requests[0][:1], batch_size)
+
+    results = []
+    print(f"{'klien':>6}{'mode':>9}{'query/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'req/batch':>11}")
+    for concurrency in args.concurrency:
+        direct = run_clients(lambda pairs: predict_bucketed(model, pairs, batch_size), requests, concurrency)
+        service = MicroBatchReranker(model, args.max_batch_pairs, args.wait_ms, batch_size)
+        batched = run_clients(service.predict, requests, concurrency)
+        service_stats = service.stats()
+        service.close()
+        for mode, result in (('direct', direct), ('service', batched)):
+            per_batch = service_stats['requests_per_batch'] if mode == 'service' else 1.0
+            results.append({'concurrency': concurrency, 'mode': mode, 'requests_per_batch': per_batch, **result})
+            print(f"{concurrency:>6}{mode:>9}{result['queries_per_second']:>10.2f}{result['p50_ms']:>10.1f}"
+                  f"{result['p95_ms']:>10.1f}{per_batch:>11.2f}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'index': args.index, 'initial_k': args.initial_k, 'queries': len(requests),
+                   'max_batch_pairs': args.max_batch_pairs, 'wait_ms': args.wait_ms, 'results': results}, f, indent=2)
+    logging.info(f"Hasil disimpan ke {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Latensi reranking CrossEncoder per query: predict biasa vs micro-batch berdasarkan panjang.
+
+Untuk setiap pertanyaan di data/new_evaluation.json, initial_k kandidat TF-IDF diambil
+sekali, lalu diskor ulang dengan beberapa konfigurasi (batch size, max_length, jumlah
+thread). Dilaporkan latensi per query (mean/p50/p95/max) dan kesesuaian dengan baseline
+(predict semua pasangan dengan pengaturan default): selisih skor maksimum dan proporsi
+query dengan top-k identik.
+
+Contoh:
+    python benchmarks/bench_reranker_batching.py --initial-k 500 --batch-sizes 8 16 32 --threads 2 4
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+from typing import List
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(REPO_ROOT, "src"))
+from sentence_transformers import CrossEncoder
+from index_store import load_index
+from reranking import configure_torch_threads, predict_bucketed
+from retriever import RERANKER_MODEL
+from scoring import tfidf_top_k
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DEFAULT_EVALUATION_FILE = os.path.join(REPO_ROOT, "data", "new_evaluation.json")
+DEFAULT_OUTPUT_FILE = os.path.join(REPO_ROOT, "benchmarks", "results", "reranker_batching.json")
+
+def latency_summary(latencies: List[float]) -> dict:
+    latencies_ms = 1000 * np.array(latencies)
+    return {
+        'mean_ms': round(float(latencies_ms.mean()), 1),
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 1),
+        'p95_ms': round(float(np.percentile(latencies_ms, 95)), 1),
+        'max_ms': round(float(latencies_ms.max()), 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark micro-batch reranking CrossEncoder.')
+    parser.add_argument('--index', type=str, default=os.path.join(REPO_ROOT, "data", "perda_index"), help='Indeks mmap (ditulis perda_processor.py).')
+    parser.add_argument('--evaluation', type=str, default=DEFAULT_EVALUATION_FILE, help='File evaluasi.')
+    parser.add_argument('--initial-k', type=int, default=500, help='Jumlah kandidat yang direrank per query.')
+    parser.add_argument('--top-k', type=int, default=5, help='Top-k untuk perbandingan peringkat.')
+    parser.add_argument('--queries', type=int, default=30, help='Jumlah pertanyaan yang diuji.')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[8, 16, 32], help='Ukuran micro-batch.')
+    parser.add_argument('--max-lengths', type=int, nargs='+', default=[512, 384, 256], help='Nilai max_length CrossEncoder.')
+    parser.add_argument('--threads', type=int, nargs='+', default=[0], help='Batas thread PyTorch (0: default).')
+    parser.add_argument('--output', type=str, default=DEFAULT_OUTPUT_FILE, help='File JSON hasil.')
+    args = parser.parse_args()
+
+    with open(args.evaluation, 'r', encoding='utf-8') as f:
+        questions = [item['question'] for item in json.load(f) if item.get('question')][:args.queries]
+    chunks, vectorizer, tfidf_matrix = load_index(args.index)
+    candidate_pairs = [
+        [[question, chunks[i]] for i in tfidf_top_k(vectorizer.transform([question]), tfidf_matrix, args.initial_k)[0]]
+        for question in questions
+    ]
+
+    results = []
+    baseline_scores = None
+    for max_length in args.max_lengths:
+        model = CrossEncoder(RERANKER_MODEL, max_length=max_length)
+        for num_threads in args.threads:
+            configure_torch_threads(num_threads)
+            configs = [('predict', None)] + [('bucketed', batch_size) for batch_size in args.batch_sizes]
+            for method, batch_size in configs:
+                latencies, all_scores = [], []
+                for pairs in candidate_pairs:
+                    start = time.perf_counter()
+                    if method == 'predict':
+                        scores = np.asarray(model.predict(pairs, show_progress_bar=False), dtype=np.float32)
+                    else:
+                        scores = predict_bucketed(model, pairs, batch_size)
+                    latencies.append(time.perf_counter() - start)
+                    all_scores.append(scores)
+                if baseline_scores is None:
+                    baseline_scores = all_scores
+                max_diff = max(float(np.abs(a - b).max()) if len(a) else 0.0 for a, b in zip(all_scores, baseline_scores))
+                same_top = np.mean([
+                    np.argsort(-a, kind='stable')[:args.top_k].tolist() == np.argsort(-b, kind='stable')[:args.top_k].tolist()
+                    for a, b in zip(all_scores, baseline_scores)
+                ])
+                result = {
+                    'method': method, 'batch_size': batch_size, 'max_length': max_length, 'threads': num_threads,
+                    **latency_summary(latencies),
+                    'max_score_diff': round(max_diff, 5),
+                    'same_top_k': round(float(same_top), 3),
+                }
+                results.append(result)
+                logging.info(
+                    f"{method:<9} batch={batch_size} max_length={max_length} threads={num_threads}: "
+                    f"mean {result['mean_ms']} ms, p95 {result['p95_ms']} ms, max {result['max_ms']} ms, "
+                    f"selisih skor maks {result['max_score_diff']}, top-{args.top_k} sama {result['same_top_k']:.0%}"
+                )
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'initial_k': args.initial_k, 'queries': len(questions), 'model': RERANKER_MODEL,
+                   'results': results}, f, indent=2)
+    logging.info(f"Hasil disimpan ke {args.output}")
+
+if __name__ == "__main__":
+    main()
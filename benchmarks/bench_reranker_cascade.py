@@ -0,0 +1,135 @@
+"""
+Latensi vs MRR reranking cascade (L-6 menyaring, L-12 menskor ulang shortlist).
+
+Untuk setiap pertanyaan di data/new_evaluation.json, initial_k kandidat TF-IDF diambil
+sekali, lalu diurutkan dengan:
+- L-12: semua kandidat diskor reranker utama (RERANKER_MODEL)
+- L-6: semua kandidat diskor reranker cascade (AppConfig.RERANKER_CASCADE_MODEL) saja
+- cascade@n: L-6 menyaring n kandidat teratas, L-12 menskor ulang n kandidat tersebut
+
+Chunk relevan per pertanyaan adalah kandidat dengan cakupan kata isi ground truth
+tertinggi (ground truth berupa parafrase, lihat bench_first_stage_recall.py). Dilaporkan
+latensi reranking per query, MRR terhadap chunk relevan tersebut, dan kesesuaian top-k
+dengan L-12 penuh.
+
+Contoh:
+    python benchmarks/bench_reranker_cascade.py --initial-k 200 --shortlists 10 20 30 50
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+from typing import Dict, List
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(REPO_ROOT, "src"))
+from sentence_transformers import CrossEncoder
+from config import AppConfig
+from index_store import load_index
+from reranking import configure_torch_threads, predict_bucketed
+from retriever import RERANKER_MODEL
+from scoring import select_top_k, tfidf_top_k
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from bench_reranker_batching import latency_summary
+from bench_tfidf_options import content_terms
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DEFAULT_EVALUATION_FILE = os.path.join(REPO_ROOT, "data", "new_evaluation.json")
+DEFAULT_OUTPUT_FILE = os.path.join(REPO_ROOT, "benchmarks", "results", "reranker_cascade.json")
+
+def relevant_candidate(ground_truth: str, candidates: np.ndarray, chunks) -> int:
+    """Kandidat dengan cakupan kata isi ground truth tertinggi (-1 jika ground truth tanpa kata isi)."""
+    gt_terms = content_terms(ground_truth.lower())
+    if not gt_terms:
+        return -1
+    coverages = [len(gt_terms & content_terms(chunks[i].lower())) / len(gt_terms) for i in candidates]
+    return int(candidates[int(np.argmax(coverages))])
+
+def reciprocal_rank(ranking: np.ndarray, relevant: int) -> float:
+    """1 / peringkat chunk relevan di ranking (0 jika tidak ada)."""
+    positions = np.flatnonzero(ranking == relevant)
+    return 1.0 / (positions[0] + 1) if len(positions) else 0.0
+
+def timed_scores(model, pairs: List[List[str]], batch_size: int):
+    start = time.perf_counter()
+    scores = predict_bucketed(model, pairs, batch_size)
+    return scores, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark latensi vs MRR reranking cascade.')
+    parser.add_argument('--index', type=str, default=os.path.join(REPO_ROOT, "data", "perda_index"), help='Indeks mmap (ditulis perda_processor.py).')
+    parser.add_argument('--evaluation', type=str, default=DEFAULT_EVALUATION_FILE, help='File evaluasi (question, ground_truth).')
+    parser.add_argument('--initial-k', type=int, default=200, help='Jumlah kandidat tahap pertama per query.')
+    parser.add_argument('--shortlists', type=int, nargs='+', default=[10, 20, 30, 50], help='Nilai cascade_k yang diuji.')
+    parser.add_argument('--top-k', type=int, default=5, help='Top-k untuk kesesuaian dengan L-12 penuh.')
+    parser.add_argument('--queries', type=int, default=100, help='Jumlah pertanyaan yang diuji.')
+    parser.add_argument('--cascade-model', type=str, default=AppConfig.RERANKER_CASCADE_MODEL, help='Reranker ringan.')
+    parser.add_argument('--output', type=str, default=DEFAULT_OUTPUT_FILE, help='File JSON hasil.')
+    args = parser.parse_args()
+
+    with open(args.evaluation, 'r', encoding='utf-8') as f:
+        evaluation = [item for item in json.load(f) if item.get('question') and item.get('ground_truth')][:args.queries]
+    chunks, vectorizer, tfidf_matrix = load_index(args.index)
+    configure_torch_threads(AppConfig.RERANKER_NUM_THREADS)
+    large = CrossEncoder(RERANKER_MODEL, max_length=AppConfig.RERANKER_MAX_LENGTH)
+    small = CrossEncoder(args.cascade_model, max_length=AppConfig.RERANKER_MAX_LENGTH)
+    batch_size = AppConfig.RERANKER_BATCH_SIZE
+
+    configs = ['L-12', 'L-6'] + [f'cascade@{n}' for n in args.shortlists]
+    latencies: Dict[str, List[float]] = {name: [] for name in configs}
+    reciprocal_ranks: Dict[str, List[float]] = {name: [] for name in configs}
+    agreement: Dict[str, List[float]] = {name: [] for name in configs}
+    # Pemanasan agar inisialisasi PyTorch tidak masuk ke latensi query pertama
+    predict_bucketed(large, [["pemanasan", chunks[0]]], batch_size)
+    predict_bucketed(small, [["pemanasan", chunks[0]]], batch_size)
+
+    for item in evaluation:
+        question = item['question']
+        candidates = tfidf_top_k(vectorizer.transform([question]), tfidf_matrix, args.initial_k)[0]
+        if len(candidates) == 0:
+            continue
+        relevant = relevant_candidate(item['ground_truth'], candidates, chunks)
+        pairs = [[question, chunks[i]] for i in candidates]
+
+        large_scores, large_seconds = timed_scores(large, pairs, batch_size)
+        small_scores, small_seconds = timed_scores(small, pairs, batch_size)
+        rankings = {
+            'L-12': (select_top_k(candidates, large_scores, len(candidates))[0], large_seconds),
+            'L-6': (select_top_k(candidates, small_scores, len(candidates))[0], small_seconds),
+        }
+        for n in args.shortlists:
+            shortlist = select_top_k(candidates, small_scores, n)[0]
+            shortlist_scores, shortlist_seconds = timed_scores(large, [[question, chunks[i]] for i in shortlist], batch_size)
+            rankings[f'cascade@{n}'] = (select_top_k(shortlist, shortlist_scores, len(shortlist))[0],
+                                        small_seconds + shortlist_seconds)
+
+        reference_top = set(rankings['L-12'][0][:args.top_k].tolist())
+        for name, (ranking, seconds) in rankings.items():
+            latencies[name].append(seconds)
+            reciprocal_ranks[name].append(reciprocal_rank(ranking, relevant))
+            agreement[name].append(len(reference_top & set(ranking[:args.top_k].tolist())) / max(len(reference_top), 1))
+
+    results = {}
+    print(f"{'konfigurasi':>14}{'mean ms':>10}{'p95 ms':>10}{'MRR':>8}{f'top-{args.top_k} = L-12':>16}")
+    for name in configs:
+        summary = latency_summary(latencies[name])
+        results[name] = {
+            **summary,
+            'mrr': round(float(np.mean(reciprocal_ranks[name])), 4),
+            'top_k_agreement': round(float(np.mean(agreement[name])), 4),
+        }
+        print(f"{name:>14}{summary['mean_ms']:>10.1f}{summary['p95_ms']:>10.1f}"
+              f"{results[name]['mrr']:>8.3f}{results[name]['top_k_agreement']:>16.3f}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'index': args.index, 'initial_k': args.initial_k, 'questions': len(latencies['L-12']),
+                   'cascade_model': args.cascade_model, 'results': results}, f, indent=2)
+    logging.info(f"Hasil disimpan ke {args.output}")
+
+if __name__ == "__main__":
+    main()
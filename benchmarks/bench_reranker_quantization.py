@@ -0,0 +1,113 @@
+"""
+Cek paritas akurasi dan latensi reranker int8 (dynamic quantization) terhadap fp32.
+
+Untuk setiap pertanyaan di data/new_evaluation.json, initial_k kandidat TF-IDF diambil
+sekali, lalu diskor oleh CrossEncoder fp32 dan versi int8-nya (reranking.quantize_int8)
+dengan micro-batch yang sama seperti DocumentRetriever. Dilaporkan:
+- latensi reranking per query (mean/p50/p95/max) dan speedup int8
+- MRR terhadap chunk relevan (kandidat dengan cakupan kata isi ground truth tertinggi,
+  lihat bench_reranker_cascade.py) untuk kedua backend
+- kesesuaian top-k int8 dengan fp32 dan selisih skor absolut maksimum
+
+Cek paritas gagal (exit code 1) jika MRR int8 turun lebih dari --max-mrr-drop.
+
+Contoh:
+    python benchmarks/bench_reranker_quantization.py --initial-k 50 --threads 4 --max-mrr-drop 0.01
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(REPO_ROOT, "src"))
+from sentence_transformers import CrossEncoder
+from config import AppConfig
+from index_store import load_index
+from reranking import configure_torch_threads, predict_bucketed, quantize_int8
+from retriever import RERANKER_MODEL
+from scoring import select_top_k, tfidf_top_k
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from bench_reranker_batching import latency_summary
+from bench_reranker_cascade import reciprocal_rank, relevant_candidate
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DEFAULT_EVALUATION_FILE = os.path.join(REPO_ROOT, "data", "new_evaluation.json")
+DEFAULT_OUTPUT_FILE = os.path.join(REPO_ROOT, "benchmarks", "results", "reranker_quantization.json")
+
+def main():
+    parser = argparse.ArgumentParser(description='Cek paritas dan latensi reranker int8 vs fp32.')
+    parser.add_argument('--index', type=str, default=os.path.join(REPO_ROOT, "data", "perda_index"), help='Indeks mmap (ditulis perda_processor.py).')
+    parser.add_argument('--evaluation', type=str, default=DEFAULT_EVALUATION_FILE, help='File evaluasi (question, ground_truth).')
+    parser.add_argument('--model', type=str, default=RERANKER_MODEL, help='Model CrossEncoder.')
+    parser.add_argument('--initial-k', type=int, default=50, help='Jumlah kandidat yang direrank per query.')
+    parser.add_argument('--top-k', type=int, default=5, help='Top-k untuk kesesuaian peringkat.')
+    parser.add_argument('--queries', type=int, default=100, help='Jumlah pertanyaan yang diuji.')
+    parser.add_argument('--threads', type=int, default=AppConfig.RERANKER_NUM_THREADS, help='Batas thread PyTorch (0: default).')
+    parser.add_argument('--max-mrr-drop', type=float, default=0.01, help='Penurunan MRR maksimum yang masih lolos cek paritas.')
+    parser.add_argument('--output', type=str, default=DEFAULT_OUTPUT_FILE, help='File JSON hasil.')
+    args = parser.parse_args()
+
+    with open(args.evaluation, 'r', encoding='utf-8') as f:
+        evaluation = [item for item in json.load(f) if item.get('question') and item.get('ground_truth')][:args.queries]
+    chunks, vectorizer, tfidf_matrix = load_index(args.index)
+    configure_torch_threads(args.threads)
+    models = {
+        'fp32': CrossEncoder(args.model, max_length=AppConfig.RERANKER_MAX_LENGTH),
+        'int8': quantize_int8(CrossEncoder(args.model, max_length=AppConfig.RERANKER_MAX_LENGTH)),
+    }
+    batch_size = AppConfig.RERANKER_BATCH_SIZE
+    for model in models.values():
+        # Pemanasan agar inisialisasi PyTorch tidak masuk ke latensi query pertama
+        predict_bucketed(model, [["pemanasan", chunks[0]]], batch_size)
+
+    latencies = {backend: [] for backend in models}
+    reciprocal_ranks = {backend: [] for backend in models}
+    agreement, max_abs_diff = [], 0.0
+    for item in evaluation:
+        question = item['question']
+        candidates = tfidf_top_k(vectorizer.transform([question]), tfidf_matrix, args.initial_k)[0]
+        if len(candidates) == 0:
+            continue
+        relevant = relevant_candidate(item['ground_truth'], candidates, chunks)
+        pairs = [[question, chunks[i]] for i in candidates]
+        rankings, scores = {}, {}
+        for backend, model in models.items():
+            start = time.perf_counter()
+            scores[backend] = predict_bucketed(model, pairs, batch_size)
+            latencies[backend].append(time.perf_counter() - start)
+            rankings[backend] = select_top_k(candidates, scores[backend], len(candidates))[0]
+            reciprocal_ranks[backend].append(reciprocal_rank(rankings[backend], relevant))
+        reference_top = set(rankings['fp32'][:args.top_k].tolist())
+        agreement.append(len(reference_top & set(rankings['int8'][:args.top_k].tolist())) / max(len(reference_top), 1))
+        max_abs_diff = max(max_abs_diff, float(np.abs(scores['fp32'] - scores['int8']).max()))
+
+    results = {backend: {**latency_summary(latencies[backend]),
+                         'mrr': round(float(np.mean(reciprocal_ranks[backend])), 4)} for backend in models}
+    speedup = results['fp32']['mean_ms'] / results['int8']['mean_ms'] if results['int8']['mean_ms'] else 0.0
+    mrr_drop = results['fp32']['mrr'] - results['int8']['mrr']
+    passed = mrr_drop <= args.max_mrr_drop
+
+    print(f"{'backend':>8}{'mean ms':>10}{'p95 ms':>10}{'MRR':>8}")
+    for backend, result in results.items():
+        print(f"{backend:>8}{result['mean_ms']:>10.1f}{result['p95_ms']:>10.1f}{result['mrr']:>8.3f}")
+    print(f"speedup int8: {speedup:.2f}x | top-{args.top_k} sama dengan fp32: {np.mean(agreement):.3f} | "
+          f"selisih skor maks: {max_abs_diff:.4f}")
+    print(f"Cek paritas (penurunan MRR {mrr_drop:.4f} <= {args.max_mrr_drop}): {'LULUS' if passed else 'GAGAL'}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'index': args.index, 'model': args.model, 'initial_k': args.initial_k,
+                   'questions': len(agreement), 'results': results, 'speedup': round(speedup, 3),
+                   'top_k_agreement': round(float(np.mean(agreement)), 4) if agreement else 0.0,
+                   'max_abs_score_diff': round(max_abs_diff, 6), 'mrr_drop': round(mrr_drop, 4),
+                   'parity_passed': passed}, f, indent=2)
+    logging.info(f"Hasil disimpan ke {args.output}")
+    sys.exit(0 if passed else 1)
+
+if __name__ == "__main__":
+    main()
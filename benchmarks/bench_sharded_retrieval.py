@@ -0,0 +1,91 @@
+"""
+Latensi tahap pertama indeks utuh vs scatter-gather per shard (DocumentRetriever shard_workers=True).
+
+Indeks harus dibangun dengan shard, mis. untuk korpus sintetis yang lebih besar:
+    python benchmarks/synthetic_corpus.py /tmp/korpus --scale 20
+    python src/perda_processor.py /tmp/korpus --output /tmp/korpus_index --shards 4
+
+Untuk setiap pertanyaan di data/new_evaluation.json dan setiap metode tahap pertama, hasil
+retrieval (tanpa reranker, initial_k kandidat) dari kedua jalur dibandingkan: urutan dan skor
+harus identik. Cek gagal (exit code 1) jika ada satu query pun yang berbeda. Dilaporkan
+latensi per query (mean/p50/p95/max) kedua jalur.
+
+Contoh:
+    python benchmarks/bench_sharded_retrieval.py --index /tmp/korpus_index --initial-k 200
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(REPO_ROOT, "src"))
+from retriever import FIRST_STAGES, DocumentRetriever
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from bench_reranker_batching import latency_summary
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DEFAULT_EVALUATION_FILE = os.path.join(REPO_ROOT, "data", "new_evaluation.json")
+DEFAULT_OUTPUT_FILE = os.path.join(REPO_ROOT, "benchmarks", "results", "sharded_retrieval.json")
+
+def timed_results(retriever: DocumentRetriever, questions, initial_k: int, first_stage: str):
+    """Hasil tahap pertama dan latensi per pertanyaan."""
+    results, latencies = [], []
+    for question in questions:
+        start = time.perf_counter()
+        results.append(retriever.retrieve_chunks(question, top_k=initial_k, use_reranker=False,
+                                                 first_stage=first_stage))
+        latencies.append(time.perf_counter() - start)
+    return results, latencies
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark retrieval tahap pertama: indeks utuh vs shard.')
+    parser.add_argument('--index', type=str, default=os.path.join(REPO_ROOT, "data", "perda_index"), help='Indeks mmap dengan shard (perda_processor.py --shards).')
+    parser.add_argument('--evaluation', type=str, default=DEFAULT_EVALUATION_FILE, help='File evaluasi.')
+    parser.add_argument('--initial-k', type=int, default=200, help='Jumlah kandidat tahap pertama per query.')
+    parser.add_argument('--first-stages', type=str, nargs='+', default=list(FIRST_STAGES), choices=list(FIRST_STAGES), help='Metode tahap pertama yang diuji.')
+    parser.add_argument('--queries', type=int, default=100, help='Jumlah pertanyaan yang diuji.')
+    parser.add_argument('--output', type=str, default=DEFAULT_OUTPUT_FILE, help='File JSON hasil.')
+    args = parser.parse_args()
+
+    with open(args.evaluation, 'r', encoding='utf-8') as f:
+        questions = [item['question'] for item in json.load(f) if item.get('question')][:args.queries]
+    unsharded = DocumentRetriever(args.index, cache_size=0, score_cache_path=None)
+    sharded = DocumentRetriever(args.index, cache_size=0, score_cache_path=None, shard_workers=True)
+    if sharded.shard_searcher is None:
+        logging.error(f"Indeks {args.index} tidak memiliki shard. Bangun ulang dengan --shards.")
+        sys.exit(1)
+
+    results, mismatches = {}, 0
+    print(f"{'tahap':>8}{'jalur':>11}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for first_stage in args.first_stages:
+        # Pemanasan: proses worker shard dan halaman mmap dimuat sebelum pengukuran
+        for retriever in (unsharded, sharded):
+            retriever.retrieve_chunks(questions[0], top_k=args.initial_k, use_reranker=False, first_stage=first_stage)
+        expected, unsharded_latencies = timed_results(unsharded, questions, args.initial_k, first_stage)
+        actual, sharded_latencies = timed_results(sharded, questions, args.initial_k, first_stage)
+        stage_mismatches = sum(a != e for a, e in zip(actual, expected))
+        mismatches += stage_mismatches
+        results[first_stage] = {'unsharded': latency_summary(unsharded_latencies),
+                                'sharded': latency_summary(sharded_latencies), 'mismatches': stage_mismatches}
+        for path in ('unsharded', 'sharded'):
+            summary = results[first_stage][path]
+            print(f"{first_stage:>8}{path:>11}{summary['mean_ms']:>10.2f}{summary['p50_ms']:>10.2f}{summary['p95_ms']:>10.2f}")
+    print(f"Hasil identik dengan indeks utuh: {'YA' if mismatches == 0 else f'TIDAK ({mismatches} query berbeda)'}")
+
+    num_shards = len(sharded.shard_searcher)
+    sharded.close()
+    unsharded.close()
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'index': args.index, 'shards': num_shards, 'initial_k': args.initial_k,
+                   'questions': len(questions), 'cpu_count': os.cpu_count(), 'results': results,
+                   'identical': mismatches == 0}, f, indent=2)
+    logging.info(f"Hasil disimpan ke {args.output}")
+    sys.exit(0 if mismatches == 0 else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Laporan dampak opsi build TF-IDF (min_df, max_df, max_features, token angka, float32).
+
+Untuk setiap konfigurasi, chunks dari indeks yang sudah ada di-vectorize ulang, disimpan
+dalam format indeks mmap, lalu diukur: nnz matriks, ukuran vocabulary, ukuran on-disk,
+memori array yang dipetakan per worker, latensi query tahap pertama, dan kualitas
+retrieval pada data/new_evaluation.json.
+
+Kualitas dilaporkan dengan tiga ukuran pada top-k TF-IDF (kandidat untuk reranker):
+- substring_hit: ground truth muncul utuh di salah satu chunk (kriteria 2_calculate_metrics.py)
+- gt_term_recall: proporsi kata isi ground truth yang tercakup oleh chunk top-k
+- overlap_baseline: irisan top-k dengan konfigurasi baseline (vocabulary penuh, float64)
+
+Contoh:
+    python benchmarks/bench_tfidf_options.py --index data/perda_index --k 50
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import logging
+import tempfile
+from typing import Dict, List
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(REPO_ROOT, "src"))
+from index_store import load_index, save_index
+from perda_processor import create_tfidf_index, stopwords_id
+from scoring import tfidf_top_k
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DEFAULT_EVALUATION_FILE = os.path.join(REPO_ROOT, "data", "new_evaluation.json")
+DEFAULT_OUTPUT_FILE = os.path.join(REPO_ROOT, "benchmarks", "results", "tfidf_options.json")
+
+# Konfigurasi yang dibandingkan; yang pertama menjadi baseline
+CONFIGS = {
+    'baseline': {},
+    'float32': {'dtype': 'float32'},
+    'min_df=2': {'min_df': 2},
+    'max_df=0.5': {'max_df': 0.5},
+    'max_features=4000': {'max_features': 4000},
+    'drop_numbers': {'digit_tokens': 'drop_numbers'},
+    'drop_alnum': {'digit_tokens': 'drop_alnum'},
+    'min_df=2+drop_numbers+float32': {'min_df': 2, 'digit_tokens': 'drop_numbers', 'dtype': 'float32'},
+}
+
+WORD_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+def path_size(path: str) -> int:
+    """Total ukuran isi direktori dalam byte."""
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+def first_stage_top_k(vectorizer, tfidf_matrix, query: str, k: int) -> np.ndarray:
+    """Retrieval TF-IDF seperti DocumentRetriever.retrieve_chunks (tanpa reranker)."""
+    return tfidf_top_k(vectorizer.transform([query]), tfidf_matrix, k)[0]
+
+def content_terms(text: str) -> set:
+    """Kata isi (bukan stopword) dari sebuah teks."""
+    return {term for term in WORD_PATTERN.findall(text.lower()) if term not in stopwords_id}
+
+def evaluate_config(chunks: List[str], chunk_terms: List[set], evaluation: List[dict], options: dict,
+                    k: int, repeat: int, baseline_top_k: List[np.ndarray] = None) -> dict:
+    """
+    Membangun indeks untuk satu konfigurasi dan mengukur ukuran, latensi, serta kualitasnya.
+
+    Args:
+        chunks (List[str]): Teks chunk.
+        chunk_terms (List[set]): Kata isi per chunk (untuk gt_term_recall).
+        evaluation (List[dict]): Pertanyaan dan ground truth.
+        options (dict): Argumen untuk create_tfidf_index.
+        k (int): Jumlah kandidat tahap pertama.
+        repeat (int): Jumlah pengulangan seluruh query untuk pengukuran latensi.
+        baseline_top_k (List[np.ndarray] | None): Top-k baseline per query.
+
+    Returns:
+        dict: Hasil pengukuran (termasuk 'top_k' per query untuk perbandingan).
+    """
+    vectorizer, tfidf_matrix = create_tfidf_index(chunks, **options)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index_dir = os.path.join(tmp_dir, "perda_index")
+        save_index(index_dir, chunks, vectorizer, tfidf_matrix)
+        disk_bytes = path_size(index_dir)
+        _, query_vectorizer, mapped_matrix = load_index(index_dir)
+        # Array yang dipetakan saat query: matriks CSR, idf, dan vocabulary (teks chunk tidak dihitung)
+        mapped_bytes = (mapped_matrix.data.nbytes + mapped_matrix.indices.nbytes + mapped_matrix.indptr.nbytes
+                        + query_vectorizer.idf.nbytes + query_vectorizer.vocabulary.nbytes)
+
+        questions = [item['question'] for item in evaluation]
+        latencies = []
+        for _ in range(repeat):
+            for question in questions:
+                start = time.perf_counter()
+                first_stage_top_k(query_vectorizer, mapped_matrix, question, k)
+                latencies.append(time.perf_counter() - start)
+        top_k = [first_stage_top_k(query_vectorizer, mapped_matrix, question, k) for question in questions]
+        # Lepaskan referensi ke file mmap sebelum direktori sementara dihapus
+        del query_vectorizer, mapped_matrix
+
+    substring_hits, term_recalls, overlaps = [], [], []
+    for i, item in enumerate(evaluation):
+        ground_truth = item['ground_truth'].lower()
+        substring_hits.append(any(ground_truth in chunks[j].lower() for j in top_k[i]))
+        gt_terms = content_terms(ground_truth)
+        covered = set().union(*(chunk_terms[j] for j in top_k[i])) if len(top_k[i]) else set()
+        term_recalls.append(len(gt_terms & covered) / len(gt_terms) if gt_terms else 0.0)
+        if baseline_top_k is not None:
+            overlaps.append(len(np.intersect1d(top_k[i], baseline_top_k[i])) / k)
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'options': options,
+        'vocabulary_size': len(vectorizer.vocabulary_),
+        'nnz': int(tfidf_matrix.nnz),
+        'dtype': str(tfidf_matrix.dtype),
+        'disk_bytes': disk_bytes,
+        'mapped_bytes': int(mapped_bytes),
+        'latency_ms_mean': round(float(latencies_ms.mean()), 3),
+        'latency_ms_p95': round(float(np.percentile(latencies_ms, 95)), 3),
+        'substring_hit': round(float(np.mean(substring_hits)), 4),
+        'gt_term_recall': round(float(np.mean(term_recalls)), 4),
+        'overlap_baseline': round(float(np.mean(overlaps)), 4) if overlaps else 1.0,
+        'top_k': top_k,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Laporan dampak opsi TF-IDF terhadap ukuran, latensi, dan kualitas.')
+    parser.add_argument('--index', type=str, default=os.path.join(REPO_ROOT, "data", "perda_index"), help='Indeks mmap sumber chunks (ditulis perda_processor.py).')
+    parser.add_argument('--evaluation', type=str, default=DEFAULT_EVALUATION_FILE, help='File evaluasi (question, ground_truth).')
+    parser.add_argument('--k', type=int, default=50, help='Jumlah kandidat tahap pertama (initial_k).')
+    parser.add_argument('--repeat', type=int, default=3, help='Pengulangan query untuk pengukuran latensi.')
+    parser.add_argument('--output', type=str, default=DEFAULT_OUTPUT_FILE, help='File JSON hasil.')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.index):
+        logging.error(f"Indeks tidak ditemukan: {args.index}. Jalankan perda_processor.py terlebih dahulu.")
+        return
+    with open(args.evaluation, 'r', encoding='utf-8') as f:
+        evaluation = [item for item in json.load(f) if item.get('question') and item.get('ground_truth')]
+
+    chunks = list(load_index(args.index)[0])
+    chunk_terms = [content_terms(chunk) for chunk in chunks]
+    logging.info(f"{len(chunks)} chunks, {len(evaluation)} pertanyaan evaluasi, k={args.k}")
+
+    results: Dict[str, dict] = {}
+    baseline_top_k = None
+    for name, options in CONFIGS.items():
+        result = evaluate_config(chunks, chunk_terms, evaluation, options, args.k, args.repeat, baseline_top_k)
+        if baseline_top_k is None:
+            baseline_top_k = result['top_k']
+        del result['top_k']
+        results[name] = result
+
+    header = f"{'konfigurasi':<32}{'vocab':>8}{'nnz':>10}{'disk MB':>9}{'map MB':>8}{'ms/q':>8}{'p95':>8}{'substr':>8}{'gt_rec':>8}{'overlap':>8}"
+    print(header)
+    for name, result in results.items():
+        print(
+            f"{name:<32}{result['vocabulary_size']:>8}{result['nnz']:>10}{result['disk_bytes'] / 1e6:>9.2f}"
+            f"{result['mapped_bytes'] / 1e6:>8.2f}{result['latency_ms_mean']:>8.2f}{result['latency_ms_p95']:>8.2f}"
+            f"{result['substring_hit']:>8.3f}{result['gt_term_recall']:>8.3f}{result['overlap_baseline']:>8.3f}"
+        )
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'index': args.index, 'num_chunks': len(chunks), 'k': args.k, 'results': results}, f, indent=2)
+    logging.info(f"Hasil disimpan ke {args.output}")
+
+if __name__ == "__main__":
+    main()
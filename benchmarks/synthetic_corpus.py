@@ -0,0 +1,162 @@
+"""
+Generator korpus PDF sintetis menyerupai peraturan (BAB/Pasal/ayat, teks Bahasa Indonesia).
+
+Dipakai oleh benchmark untuk mengukur skalabilitas pipeline tanpa akses jaringan.
+Isi dokumen deterministik untuk seed yang sama sehingga hasil dapat dibandingkan antar-commit.
+"""
+import os
+import random
+import argparse
+import logging
+from typing import List, Tuple
+import fitz # PyMuPDF untuk menulis PDF
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Ukuran korpus saat ini (reference/nasional) sebagai satuan skala
+BASE_NUM_DOCUMENTS = 14
+MIN_PAGES, MAX_PAGES = 10, 160 # Rata-rata ~85 halaman, mendekati korpus nyata
+LINES_PER_PAGE = 48
+WORDS_PER_LINE = (6, 12)
+FONT_SIZE = 9
+
+ROMAN_NUMERALS = [
+    "I", "II", "III", "IV", "V", "VI", "VII", "VIII", "IX", "X", "XI", "XII", "XIII", "XIV", "XV",
+    "XVI", "XVII", "XVIII", "XIX", "XX",
+]
+ORDINALS = ["Kesatu", "Kedua", "Ketiga", "Keempat", "Kelima", "Keenam", "Ketujuh", "Kedelapan"]
+
+VOCABULARY = (
+    "sampah pengelolaan rumah tangga pemerintah daerah kota provinsi setiap orang wajib dilarang "
+    "membakar membuang mengurangi menangani pemilahan pengumpulan pengangkutan pengolahan pemrosesan "
+    "akhir tempat penampungan sementara terpadu fasilitas lingkungan hidup kesehatan masyarakat "
+    "sanksi administratif denda paksaan teguran tertulis pencabutan izin usaha kegiatan pelaku "
+    "produsen kemasan bahan berbahaya beracun limbah residu daur ulang guna kompos retribusi "
+    "pembiayaan kompensasi kerja sama kemitraan badan lembaga pengawasan pembinaan pelaporan "
+    "ketentuan peraturan wali kota menteri gubernur bupati kewenangan tugas tanggung jawab hak "
+    "kewajiban perlindungan pencemaran kerusakan baku mutu standar teknis operasional prosedur "
+    "penyelenggaraan perencanaan pelaksanaan evaluasi dokumen persetujuan penetapan"
+).split()
+BAB_TITLES = [
+    "KETENTUAN UMUM", "ASAS DAN TUJUAN", "TUGAS DAN WEWENANG", "HAK DAN KEWAJIBAN", "PERIZINAN",
+    "PENYELENGGARAAN PENGELOLAAN SAMPAH", "PEMBIAYAAN DAN KOMPENSASI", "KERJA SAMA DAN KEMITRAAN",
+    "PERAN MASYARAKAT", "LARANGAN", "PENGAWASAN", "SANKSI ADMINISTRATIF", "KETENTUAN PENYIDIKAN",
+    "KETENTUAN PIDANA", "KETENTUAN PERALIHAN", "KETENTUAN PENUTUP",
+]
+# Konsiderans yang sama di semua dokumen (boilerplate untuk tahap deduplikasi)
+PREAMBLE = [
+    "Menimbang : a. bahwa pertumbuhan penduduk dan perubahan pola konsumsi masyarakat",
+    "menimbulkan bertambahnya volume, jenis, dan karakteristik sampah yang semakin beragam;",
+    "b. bahwa pengelolaan sampah selama ini belum sesuai dengan metode dan teknik pengelolaan",
+    "sampah yang berwawasan lingkungan sehingga menimbulkan dampak negatif terhadap kesehatan",
+    "masyarakat dan lingkungan;",
+    "Mengingat : 1. Pasal 18 ayat (6) Undang-Undang Dasar Negara Republik Indonesia Tahun 1945;",
+    "2. Undang-Undang Nomor 18 Tahun 2008 tentang Pengelolaan Sampah;",
+]
+
+def _sentence(rng: random.Random, num_words: int) -> str:
+    return " ".join(rng.choice(VOCABULARY) for _ in range(num_words))
+
+def _text_lines(rng: random.Random, num_lines: int) -> List[str]:
+    return [_sentence(rng, rng.randint(*WORDS_PER_LINE)) for _ in range(num_lines)]
+
+def generate_document_lines(rng: random.Random, title: str, num_pages: int) -> List[str]:
+    """
+    Menyusun baris-baris batang tubuh satu peraturan sintetis.
+
+    Struktur: judul, konsiderans, lalu BAB (angka Romawi + judul kapital) yang berisi
+    Bagian dan Pasal berurutan dengan ayat "(n)", butir daftar, dan rujukan Pasal di
+    dalam kalimat yang terpotong di awal baris (kasus yang harus diabaikan chunker).
+
+    Args:
+        rng (random.Random): Sumber acak deterministik.
+        title (str): Judul dokumen.
+        num_pages (int): Perkiraan jumlah halaman batang tubuh.
+
+    Returns:
+        List[str]: Baris teks dokumen.
+    """
+    target_lines = num_pages * LINES_PER_PAGE
+    lines = [title.upper(), "DENGAN RAHMAT TUHAN YANG MAHA ESA", ""] + PREAMBLE + ["MEMUTUSKAN:"]
+    num_babs = max(1, min(len(ROMAN_NUMERALS), target_lines // 250))
+    pasal = 0
+    for bab in range(num_babs):
+        lines += [f"BAB {ROMAN_NUMERALS[bab]}", rng.choice(BAB_TITLES)]
+        bab_lines = (target_lines - len(lines)) // (num_babs - bab)
+        bab_end = len(lines) + bab_lines
+        section = 0
+        while len(lines) < bab_end:
+            if section < len(ORDINALS) and rng.random() < 0.15:
+                lines += [f"Bagian {ORDINALS[section]}", rng.choice(BAB_TITLES).title()]
+                section += 1
+            pasal += 1
+            lines.append(f"Pasal {pasal}")
+            for ayat in range(1, rng.randint(1, 5) + 1):
+                lines.append(f"({ayat}) {_sentence(rng, rng.randint(*WORDS_PER_LINE))}")
+                lines += _text_lines(rng, rng.randint(0, 4))
+                if pasal > 1 and rng.random() < 0.2:
+                    lines += ["sebagaimana dimaksud dalam", f"Pasal {rng.randint(1, pasal - 1)}", _sentence(rng, 6)]
+                if rng.random() < 0.25:
+                    for item in "abcd"[:rng.randint(2, 4)]:
+                        lines.append(f"{item}. {_sentence(rng, rng.randint(*WORDS_PER_LINE))};")
+    return lines
+
+def write_pdf(pdf_path: str, lines: List[str], explanation_lines: List[str]):
+    """
+    Menulis baris teks ke PDF dengan header, nomor halaman, dan bagian penjelasan di akhir.
+
+    Args:
+        pdf_path (str): Path file PDF tujuan.
+        lines (List[str]): Baris batang tubuh.
+        explanation_lines (List[str]): Baris bagian penjelasan (dibuang oleh pipeline).
+    """
+    body = lines + ["Penjelasan", "Atas"] + explanation_lines
+    doc = fitz.open()
+    for page_index, start in enumerate(range(0, len(body), LINES_PER_PAGE)):
+        page = doc.new_page()
+        page_lines = ["WALI KOTA BANDUNG", f"- {page_index + 1} -"] + body[start:start + LINES_PER_PAGE]
+        page.insert_text((50, 50), "\n".join(page_lines), fontsize=FONT_SIZE)
+    doc.save(pdf_path, garbage=3, deflate=True)
+    doc.close()
+
+def generate_corpus(output_dir: str, scale: float = 1.0, seed: int = 42) -> Tuple[int, int]:
+    """
+    Membuat korpus PDF sintetis berukuran scale x korpus saat ini.
+
+    File yang sudah ada dengan nama yang sama tidak ditulis ulang, sehingga korpus
+    besar cukup dibuat sekali lalu dipakai ulang oleh beberapa run benchmark.
+
+    Args:
+        output_dir (str): Direktori tujuan.
+        scale (float): Kelipatan jumlah dokumen terhadap korpus saat ini.
+        seed (int): Seed agar isi korpus deterministik.
+
+    Returns:
+        Tuple[int, int]: (jumlah dokumen, jumlah halaman batang tubuh).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    num_documents = max(1, round(BASE_NUM_DOCUMENTS * scale))
+    total_pages = 0
+    for doc_index in range(num_documents):
+        rng = random.Random(seed * 1_000_003 + doc_index)
+        num_pages = rng.randint(MIN_PAGES, MAX_PAGES)
+        total_pages += num_pages
+        pdf_path = os.path.join(output_dir, f"Perda Sintetis {doc_index + 1:05d}.pdf")
+        if os.path.exists(pdf_path):
+            continue
+        title = f"Peraturan Daerah Nomor {doc_index + 1} Tahun {2000 + doc_index % 25} tentang {rng.choice(BAB_TITLES).title()}"
+        lines = generate_document_lines(rng, title, num_pages)
+        write_pdf(pdf_path, lines, _text_lines(rng, LINES_PER_PAGE))
+    logging.info(f"Korpus sintetis: {num_documents} dokumen, ~{total_pages} halaman di {output_dir}")
+    return num_documents, total_pages
+
+def main():
+    parser = argparse.ArgumentParser(description='Membuat korpus PDF peraturan sintetis untuk benchmark.')
+    parser.add_argument('output_dir', type=str, help='Direktori tujuan PDF.')
+    parser.add_argument('--scale', type=float, default=1.0, help='Kelipatan jumlah dokumen terhadap korpus saat ini (14 PDF).')
+    parser.add_argument('--seed', type=int, default=42, help='Seed agar isi korpus deterministik.')
+    args = parser.parse_args()
+    generate_corpus(args.output_dir, args.scale, args.seed)
+
+if __name__ == "__main__":
+    main()
@@ -23,6 +23,15 @@ RETRIEVER_MODES = {
     # },
     # "Reranker (Cepat)": {
     #     "use_reranker": True, "top_k": 3, "initial_k": 20
+    # },
+    # "BM25 + Reranker (Seimbang)": {
+    #     "use_reranker": True, "top_k": 5, "initial_k": 50, "first_stage": "bm25"
+    # },
+    # "Hybrid + Reranker (Cepat)": {
+    #     "use_reranker": True, "top_k": 5, "initial_k": 20, "first_stage": "hybrid"
+    # },
+    # "Cascade Reranker (L-6 → L-12)": {
+    #     "use_reranker": True, "top_k": 5, "initial_k": 200, "cascade_k": 30
     # }
 }
 
@@ -58,6 +67,17 @@ def generate_all_answers():
         print(f"\n--- Memproses Mode: {mode_name} ---")
         
         mode_answers = []
+
+        # 1. Retrieve chunks untuk semua pertanyaan sekaligus (satu batch scoring dan reranking)
+        questions = [item['question'] for item in evaluation_data]
+        all_retrieved_chunks = retriever.retrieve_chunks_batch(
+            questions,
+            top_k=config['top_k'],
+            initial_k=config['initial_k'],
+            use_reranker=config['use_reranker'],
+            first_stage=config.get('first_stage', 'tfidf'),
+            cascade_k=config.get('cascade_k', 0)
+        )
         
         # Loop melalui setiap item di dataset evaluasi
         for i, item in enumerate(evaluation_data):
@@ -65,13 +85,7 @@ def generate_all_answers():
             
             print(f"  > Menghasilkan jawaban untuk pertanyaan {i+1}/{len(evaluation_data)}...", end="", flush=True)
             
-            # 1. Retrieve chunks
-            retrieved_chunks_with_scores = retriever.retrieve_chunks(
-                query=question,
-                top_k=config['top_k'],
-                initial_k=config['initial_k'],
-                use_reranker=config['use_reranker']
-            )
+            retrieved_chunks_with_scores = all_retrieved_chunks[i]
             # retrieved_chunks = [c[0] for c in retrieved_chunks_with_scores]
 
             sanitized_chunks_with_scores = [
@@ -0,0 +1,194 @@
+import logging
+import numpy as np
+from scipy.sparse import csr_matrix
+from typing import Optional, Tuple
+from scoring import select_top_k
+
+# Parameter default pencarian: jumlah list IVF yang diperiksa dan kelipatan kandidat
+# yang diskor ulang secara exact (0 = pakai skor PQ saja)
+DEFAULT_NPROBE = 8
+DEFAULT_REFINE_FACTOR = 4
+# Jumlah centroid per sub-quantizer (kode 1 byte)
+PQ_CENTROIDS = 256
+DEFAULT_TRAIN_SIZE = 50_000
+DEFAULT_KMEANS_ITERATIONS = 20
+ASSIGN_BLOCK_ROWS = 16384
+
+def _nearest_centroids(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Indeks centroid terdekat (jarak Euclidean) untuk setiap baris, dihitung per blok."""
+    centroid_norms = (centroids * centroids).sum(axis=1)
+    assignment = np.empty(len(data), dtype=np.int64)
+    for start in range(0, len(data), ASSIGN_BLOCK_ROWS):
+        block = np.asarray(data[start:start + ASSIGN_BLOCK_ROWS], dtype=np.float32)
+        # ||x - c||^2 = ||x||^2 - 2 x.c + ||c||^2; ||x||^2 konstan per baris
+        assignment[start:start + len(block)] = np.argmin(centroid_norms - 2 * block @ centroids.T, axis=1)
+    return assignment
+
+def kmeans(data: np.ndarray, n_clusters: int, iterations: int = DEFAULT_KMEANS_ITERATIONS,
+           rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    K-means Lloyd sederhana dengan NumPy.
+
+    Args:
+        data (np.ndarray): Data latih (n x dimensi), float32.
+        n_clusters (int): Jumlah centroid (tidak boleh melebihi jumlah data).
+        iterations (int): Jumlah iterasi Lloyd.
+        rng (np.random.Generator | None): Generator acak untuk inisialisasi.
+
+    Returns:
+        np.ndarray: Centroid (n_clusters x dimensi), float32.
+    """
+    rng = rng or np.random.default_rng(42)
+    centroids = data[rng.choice(len(data), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = _nearest_centroids(data, centroids)
+        # Jumlah vektor per cluster lewat perkalian matriks one-hot sparse
+        one_hot = csr_matrix((np.ones(len(data), dtype=np.float32), (assignment, np.arange(len(data)))),
+                             shape=(n_clusters, len(data)))
+        counts = np.bincount(assignment, minlength=n_clusters)
+        sums = np.asarray(one_hot @ data)
+        non_empty = counts > 0
+        centroids[non_empty] = sums[non_empty] / counts[non_empty, None]
+        # Cluster kosong diisi ulang dengan titik acak agar semua centroid terpakai
+        empty = np.flatnonzero(~non_empty)
+        if len(empty):
+            centroids[empty] = data[rng.choice(len(data), len(empty), replace=False)]
+    return centroids
+
+def _default_subquantizers(dim: int) -> int:
+    """Jumlah sub-quantizer default: sub-vektor 8 dimensi (atau pembagi terbesar yang lebih kecil)."""
+    for sub_dim in (8, 4, 2, 1):
+        if dim % sub_dim == 0:
+            return dim // sub_dim
+    return dim
+
+class IVFPQIndex:
+    """
+    Indeks approximate nearest neighbour IVF-PQ untuk embedding chunk ternormalisasi.
+
+    Vektor dikelompokkan ke `nlist` list oleh k-means kasar (IVF). Residual terhadap
+    centroid list-nya dikuantisasi produk (PQ): vektor dibagi menjadi `m` sub-vektor yang
+    masing-masing dikodekan 1 byte. Saat query, hanya `nprobe` list dengan centroid
+    terdekat yang diperiksa, dan skor inner product dihitung dari tabel lookup
+    (q . centroid + jumlah q_j . codebook_j[kode_j]) tanpa membaca vektor aslinya.
+    Kandidat teratas dapat diskor ulang secara exact dari matriks embedding (refine).
+
+    Posting setiap list disimpan berurutan (format CSR): `list_indptr[l]:list_indptr[l+1]`
+    menunjuk ke id chunk dan kode PQ-nya.
+    """
+
+    ARRAY_NAMES = ('centroids', 'codebooks', 'list_indptr', 'list_ids', 'codes')
+
+    def __init__(self, centroids: np.ndarray, codebooks: np.ndarray, list_indptr: np.ndarray,
+                 list_ids: np.ndarray, codes: np.ndarray):
+        self.centroids = centroids
+        self.codebooks = codebooks
+        self.list_indptr = list_indptr
+        self.list_ids = list_ids
+        self.codes = codes
+
+    @classmethod
+    def build(cls, embeddings: np.ndarray, nlist: int = 0, m: int = 0, train_size: int = DEFAULT_TRAIN_SIZE,
+              iterations: int = DEFAULT_KMEANS_ITERATIONS, seed: int = 42) -> "IVFPQIndex":
+        """
+        Melatih centroid IVF dan codebook PQ, lalu mengodekan semua embedding.
+
+        Args:
+            embeddings (np.ndarray): Embedding chunk ternormalisasi (chunk x dimensi).
+            nlist (int): Jumlah list IVF (0 = sekitar akar jumlah chunk).
+            m (int): Jumlah sub-quantizer PQ, harus membagi dimensi (0 = sub-vektor 8 dimensi).
+            train_size (int): Jumlah maksimum vektor sampel untuk pelatihan k-means.
+            iterations (int): Iterasi k-means.
+            seed (int): Seed sampel dan inisialisasi k-means.
+
+        Returns:
+            IVFPQIndex: Indeks yang siap dicari.
+        """
+        num_vectors, dim = embeddings.shape
+        nlist = nlist or max(1, int(round(np.sqrt(num_vectors))))
+        nlist = min(nlist, num_vectors)
+        m = m or _default_subquantizers(dim)
+        if dim % m != 0:
+            raise ValueError(f"Jumlah sub-quantizer {m} harus membagi dimensi embedding {dim}.")
+        sub_dim = dim // m
+
+        rng = np.random.default_rng(seed)
+        sample = np.sort(rng.choice(num_vectors, min(num_vectors, train_size), replace=False))
+        train = np.asarray(embeddings[sample], dtype=np.float32)
+        centroids = kmeans(train, nlist, iterations, rng)
+
+        residuals = train - centroids[_nearest_centroids(train, centroids)]
+        ksub = min(PQ_CENTROIDS, len(train))
+        codebooks = np.stack([
+            kmeans(np.ascontiguousarray(residuals[:, j * sub_dim:(j + 1) * sub_dim]), ksub, iterations, rng)
+            for j in range(m)
+        ])
+
+        # Kodekan semua vektor per blok agar tidak ada salinan float32 seluruh matriks
+        assignment = np.empty(num_vectors, dtype=np.int64)
+        codes = np.empty((num_vectors, m), dtype=np.uint8)
+        for start in range(0, num_vectors, ASSIGN_BLOCK_ROWS):
+            block = np.asarray(embeddings[start:start + ASSIGN_BLOCK_ROWS], dtype=np.float32)
+            block_assignment = _nearest_centroids(block, centroids)
+            block_residuals = block - centroids[block_assignment]
+            assignment[start:start + len(block)] = block_assignment
+            for j in range(m):
+                codes[start:start + len(block), j] = _nearest_centroids(
+                    block_residuals[:, j * sub_dim:(j + 1) * sub_dim], codebooks[j])
+
+        order = np.argsort(assignment, kind='stable')
+        list_indptr = np.zeros(nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignment, minlength=nlist), out=list_indptr[1:])
+        logging.info(f"Indeks IVF-PQ dibangun: {num_vectors} vektor, {nlist} list, {m} sub-quantizer x {ksub} centroid.")
+        return cls(centroids.astype(np.float32), codebooks.astype(np.float32), list_indptr,
+                   order.astype(np.int32), np.ascontiguousarray(codes[order]))
+
+    def params(self) -> dict:
+        """Parameter indeks untuk meta.json."""
+        return {
+            'type': 'ivfpq',
+            'nlist': int(len(self.centroids)),
+            'm': int(self.codebooks.shape[0]),
+            'ksub': int(self.codebooks.shape[1]),
+            'num_vectors': int(len(self.list_ids)),
+        }
+
+    def search(self, query_embedding: np.ndarray, k: int, nprobe: int = DEFAULT_NPROBE,
+               refine_factor: int = DEFAULT_REFINE_FACTOR,
+               embeddings: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Mencari k chunk dengan inner product tertinggi terhadap embedding query.
+
+        Args:
+            query_embedding (np.ndarray): Embedding query ternormalisasi (dimensi,).
+            k (int): Jumlah hasil.
+            nprobe (int): Jumlah list IVF yang diperiksa (lebih besar = recall lebih tinggi, lebih lambat).
+            refine_factor (int): Jika > 0 dan embeddings diberikan, k * refine_factor kandidat
+                teratas menurut PQ diskor ulang secara exact.
+            embeddings (np.ndarray | None): Matriks embedding chunk untuk refine.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (indeks chunk, skor) terurut dari skor tertinggi.
+        """
+        query = np.asarray(query_embedding, dtype=np.float32)
+        coarse_scores = self.centroids @ query
+        nprobe = min(max(nprobe, 1), len(coarse_scores))
+        probed = np.argpartition(-coarse_scores, nprobe - 1)[:nprobe]
+
+        starts, ends = self.list_indptr[probed], self.list_indptr[probed + 1]
+        rows = np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)])
+        if len(rows) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        ids = self.list_ids[rows].astype(np.int64)
+
+        # Tabel lookup inner product: q_j . codebook_j[c] untuk setiap sub-quantizer j dan kode c
+        m, _, sub_dim = self.codebooks.shape
+        table = np.einsum('jcd,jd->jc', self.codebooks, query.reshape(m, sub_dim))
+        approx_scores = table[np.arange(m), self.codes[rows]].sum(axis=1)
+        approx_scores += np.repeat(coarse_scores[probed], ends - starts)
+
+        if refine_factor > 0 and embeddings is not None:
+            ids, _ = select_top_k(ids, approx_scores, k * refine_factor)
+            exact_scores = np.asarray(embeddings[np.sort(ids)], dtype=np.float32) @ query
+            return select_top_k(np.sort(ids), exact_scores, k)
+        return select_top_k(ids, approx_scores, k)
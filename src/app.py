@@ -1,11 +1,21 @@
 import streamlit as st
 import logging
 import asyncio 
-from retriever import DocumentRetriever
+from retriever import FIRST_STAGE_LABELS, DocumentRetriever, format_chunk_source
+from index_store import NATIONAL_LEVELS
+from config import AppConfig
 from generator import LLMGeneratorAsync as LLMGenerator
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# --- CAKUPAN DOKUMEN ---
+# Filter metadata untuk DocumentRetriever.retrieve_chunks (documents, levels, years)
+DOCUMENT_SCOPES = {
+    "Semua dokumen": {},
+    "Hanya Perda Kota Bandung": {"levels": ["perda"]},
+    "Hanya Peraturan Nasional": {"levels": list(NATIONAL_LEVELS)},
+}
+
 # --- KAMUS KONFIGURASI VERSI ---
 # Di sini Anda bisa mendefinisikan semua versi yang ingin diuji.
 RETRIEVER_MODES = {
@@ -28,6 +38,30 @@ RETRIEVER_MODES = {
         "use_reranker": True,
         "top_k": 3,
         "initial_k": 20
+    },
+    "Baseline (BM25 Saja)": {
+        "use_reranker": False,
+        "top_k": 5,
+        "initial_k": 5,
+        "first_stage": "bm25"
+    },
+    "BM25 + Reranker (Seimbang)": {
+        "use_reranker": True,
+        "top_k": 5,
+        "initial_k": 50,
+        "first_stage": "bm25"
+    },
+    "Hybrid + Reranker (Cepat)": {
+        "use_reranker": True,
+        "top_k": 5,
+        "initial_k": 20, # Kandidat TF-IDF + embedding digabung RRF; recall setara initial_k besar
+        "first_stage": "hybrid"
+    },
+    "Cascade Reranker (L-6 → L-12)": {
+        "use_reranker": True,
+        "top_k": 5,
+        "initial_k": 200,
+        "cascade_k": 30 # L-6 menyaring 200 kandidat, L-12 hanya menskor 30 teratas
     }
 }
 
@@ -36,7 +70,11 @@ def load_components():
     """Memuat komponen retriever dan generator yang akan digunakan bersama."""
     logging.info("Memuat komponen: Retriever dan Generator...")
     try:
-        retriever = DocumentRetriever(data_path="data/perda_data.pkl")
+        # Model reranker dimuat di thread latar; mode baseline langsung dapat dipakai.
+        # Retriever dibagi semua sesi, sehingga reranking sesi yang serentak digabung per batch.
+        retriever = DocumentRetriever(data_path="data/perda_index", micro_batching=True,
+                                      warm_up_in_background=True,
+                                      shard_workers=AppConfig.RETRIEVAL_SHARD_WORKERS)
         generator = LLMGenerator()
         return retriever, generator
     except Exception as e:
@@ -45,7 +83,7 @@ def load_components():
 
 retriever, generator = load_components()
 
-async def run_chatbot_async(query, mode_config):
+async def run_chatbot_async(query, mode_config, scope_filters=None):
     """Menjalankan pipeline chatbot menggunakan konfigurasi yang dipilih."""
     if not retriever or not generator:
         st.error("Komponen chatbot tidak berhasil dimuat.")
@@ -55,13 +93,23 @@ async def run_chatbot_async(query, mode_config):
         st.warning("Mohon masukkan pertanyaan.")
         return
 
+    if scope_filters and retriever.scope_size(**scope_filters) == 0:
+        st.warning("Indeks tidak memuat dokumen untuk cakupan yang dipilih. Bangun ulang indeks dari "
+                   "direktori reference/ (subdirektori ikut diproses) atau pilih cakupan lain.")
+        return
+
     with st.spinner("Mencari dokumen relevan dan menghasilkan jawaban..."):
         # 1. Retrieval dengan parameter dinamis dari mode_config
-        retrieved_results = retriever.retrieve_chunks(
+        # Scoring dan reranking berjalan di thread pool retriever, bukan di event loop
+        retrieved_results = await retriever.aretrieve_chunks(
             query, 
             top_k=mode_config["top_k"],
             initial_k=mode_config["initial_k"],
-            use_reranker=mode_config["use_reranker"]
+            use_reranker=mode_config["use_reranker"],
+            return_metadata=True,
+            first_stage=mode_config.get("first_stage", "tfidf"),
+            cascade_k=mode_config.get("cascade_k", 0),
+            **(scope_filters or {})
         )
 
         retrieved_chunks = [result[0] for result in retrieved_results] if retrieved_results else []
@@ -74,10 +122,14 @@ async def run_chatbot_async(query, mode_config):
 
         # 3. Tampilkan referensi dan skornya
         if retrieved_results:
-            score_type = "Relevansi (Reranker)" if mode_config["use_reranker"] else "Relevansi (TF-IDF)"
+            # Tanpa reranker, skor berasal dari tahap pertama mode ini (untuk hybrid: skor RRF)
+            first_stage_label = FIRST_STAGE_LABELS.get(mode_config.get("first_stage", "tfidf"), "TF-IDF")
+            score_type = f"Relevansi ({'Reranker' if mode_config['use_reranker'] else first_stage_label})"
             st.markdown(f"\n**Referensi Dokumen (Metode: {score_type}):**")
-            for i, (chunk, score) in enumerate(retrieved_results):
-                with st.expander(f"Referensi {i+1} | Skor: {score:.4f}"):
+            for i, (chunk, score, metadata) in enumerate(retrieved_results):
+                source = format_chunk_source(metadata)
+                source_label = f" | {source}" if source else ""
+                with st.expander(f"Referensi {i+1} | Skor: {score:.4f}{source_label}"):
                     st.markdown(f"_{chunk}_")
 
 
@@ -95,13 +147,29 @@ mode_selection = st.sidebar.selectbox(
 # Ambil konfigurasi yang dipilih
 selected_config = RETRIEVER_MODES[mode_selection]
 
+scope_selection = st.sidebar.selectbox(
+    "Cakupan dokumen:",
+    options=list(DOCUMENT_SCOPES.keys())
+)
+selected_scope = DOCUMENT_SCOPES[scope_selection]
+
 # Tampilkan detail konfigurasi yang sedang aktif di sidebar
 st.sidebar.markdown("---")
 st.sidebar.markdown(f"**Konfigurasi Aktif:**")
+st.sidebar.markdown(f"🔹 **Tahap Pertama:** `{selected_config.get('first_stage', 'tfidf')}`")
 st.sidebar.markdown(f"🔹 **Reranker Aktif:** `{selected_config['use_reranker']}`")
 st.sidebar.markdown(f"🔹 **Hasil Akhir (top_k):** `{selected_config['top_k']}`")
+st.sidebar.markdown(f"🔹 **Cakupan Dokumen:** `{scope_selection}`")
 if selected_config['use_reranker']:
     st.sidebar.markdown(f"🔹 **Kandidat Awal (initial_k):** `{selected_config['initial_k']}`")
+    reranker_status = "siap" if retriever and retriever.reranker_ready else "sedang dimuat"
+    st.sidebar.markdown(f"🔹 **Status Reranker:** `{reranker_status}`")
+    queue_stats = retriever.rerank_queue_stats() if retriever else None
+    if queue_stats:
+        st.sidebar.markdown(f"🔹 **Antrian Reranker:** `{queue_stats['queue_depth']}` request "
+                            f"(rata-rata {queue_stats['requests_per_batch']} request/batch)")
+    if selected_config.get('cascade_k'):
+        st.sidebar.markdown(f"🔹 **Kandidat Reranker Utama (cascade_k):** `{selected_config['cascade_k']}`")
 st.sidebar.markdown("---")
 
 
@@ -112,4 +180,4 @@ query = st.text_input("Tulis pertanyaan Anda di sini:", key="user_query")
 if st.button("Kirim", type="primary"):
     if query:
         # Jalankan chatbot dengan konfigurasi yang dipilih dari sidebar
-        asyncio.run(run_chatbot_async(query, selected_config))
\ No newline at end of file
+        asyncio.run(run_chatbot_async(query, selected_config, selected_scope))
\ No newline at end of file
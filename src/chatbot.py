@@ -76,7 +76,7 @@
 
 import argparse
 import logging
-from retriever import DocumentRetriever
+from retriever import DocumentRetriever, format_chunk_source
 from generator import LLMGeneratorSync as LLMGenerator
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -84,7 +84,8 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 def main():
     parser = argparse.ArgumentParser(description='Chatbot RAG edukasi sampah berbasis PERDA.')
     parser.add_argument('query', type=str, help='Pertanyaan untuk chatbot.')
-    parser.add_argument('--data-path', type=str, default="data/perda_data.pkl", help='Path file data.')
+    parser.add_argument('--data-path', type=str, default="data/perda_index", help='Path direktori indeks (atau file .pkl lama).')
+    parser.add_argument('--no-reranker', action='store_true', help='Gunakan hasil TF-IDF saja; model reranker tidak dimuat sama sekali.')
     args = parser.parse_args()
 
     logging.info("Menginisialisasi DocumentRetriever...")
@@ -99,7 +100,8 @@ def main():
     # --- PERUBAHAN DI SINI ---
     logging.info(f"Mencari informasi relevan untuk query: '{args.query}'")
     # retrieved_results sekarang berisi (chunk, score)
-    retrieved_results = retriever.retrieve_chunks(args.query, top_k=3)
+    retrieved_results = retriever.retrieve_chunks(args.query, top_k=3, use_reranker=not args.no_reranker,
+                                                  return_metadata=True)
 
     # Ekstrak hanya teks chunk untuk dikirim ke generator
     retrieved_chunks = [result[0] for result in retrieved_results] if retrieved_results else []
@@ -115,8 +117,10 @@ def main():
         print("\n" + "="*50)
         print("Referensi Dokumen (Hasil Reranking):")
         # Tampilkan chunk beserta skornya
-        for i, (chunk, score) in enumerate(retrieved_results):
+        for i, (chunk, score, metadata) in enumerate(retrieved_results):
             print(f"\n--- Chunk {i+1} | Skor Relevansi: {score:.4f} ---")
+            if metadata:
+                print(f"Sumber: {format_chunk_source(metadata)}")
             print(f"{chunk[:250]}...")
     print("="*50 + "\n")
 
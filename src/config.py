@@ -14,6 +14,34 @@ class AppConfig:
     # LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", 0))
     LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", 1024))
 
+    # Cache hasil retrieval (0 menonaktifkan cache)
+    QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", 256))
+    QUERY_CACHE_TTL_SECONDS = float(os.getenv("QUERY_CACHE_TTL_SECONDS", 3600))
+    # Cache skor reranker di disk (SQLite); string kosong menonaktifkan cache
+    RERANKER_SCORE_CACHE_PATH = os.getenv("RERANKER_SCORE_CACHE_PATH", "data/reranker_scores.sqlite")
+    # Batas baris cache skor (semua model); skor yang paling lama ditulis dibuang lebih dulu. 0 = tanpa batas
+    RERANKER_SCORE_CACHE_MAX_ROWS = int(os.getenv("RERANKER_SCORE_CACHE_MAX_ROWS", 1_000_000))
+
+    # Jumlah thread pool DocumentRetriever.aretrieve_chunks (retrieval dari kode async)
+    RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", 2))
+    # Skor tahap pertama per shard di proses worker (indeks dibangun dengan perda_processor.py --shards)
+    RETRIEVAL_SHARD_WORKERS = os.getenv("RETRIEVAL_SHARD_WORKERS", "false").lower() == "true"
+
+    # Reranker CrossEncoder
+    RERANKER_BATCH_SIZE = int(os.getenv("RERANKER_BATCH_SIZE", 16)) # Pasangan per micro-batch
+    # Panjang maksimum (wordpiece) pasangan query-passage. Default mengikuti anggaran chunk perda_processor
+    # (DEFAULT_MAX_CHUNK_TOKENS kata x ~2 wordpiece + 64 untuk query = 512, juga batas posisi model), sehingga
+    # chunk berukuran default tidak terpotong. Nilai lebih kecil memotong ekor chunk panjang demi latensi
+    # (lihat benchmarks/bench_reranker_batching.py); skor cache dipisahkan per nilai.
+    RERANKER_MAX_LENGTH = int(os.getenv("RERANKER_MAX_LENGTH", 512))
+    RERANKER_NUM_THREADS = int(os.getenv("RERANKER_NUM_THREADS", 0)) # 0: default PyTorch
+    RERANKER_BACKEND = os.getenv("RERANKER_BACKEND", "fp32") # "int8": dynamic quantization layer Linear (CPU)
+    # Worker micro-batching lintas request (DocumentRetriever(micro_batching=True))
+    RERANKER_MICRO_BATCH_MAX_PAIRS = int(os.getenv("RERANKER_MICRO_BATCH_MAX_PAIRS", 128)) # Pasangan per batch gabungan
+    RERANKER_MICRO_BATCH_WAIT_MS = float(os.getenv("RERANKER_MICRO_BATCH_WAIT_MS", 5)) # Tunggu request lain (ms)
+    # Reranker ringan untuk mode cascade: menyaring initial_k kandidat menjadi cascade_k sebelum reranker utama
+    RERANKER_CASCADE_MODEL = os.getenv("RERANKER_CASCADE_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+
     # Prompting
     SYSTEM_PROMPT = (
         "Anda adalah seorang profesional di bidang hukum yang sangat menguasai "
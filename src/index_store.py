@@ -0,0 +1,779 @@
+import os
+import re
+import json
+import shutil
+import logging
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from scipy.sparse import csr_matrix
+from ann_index import IVFPQIndex
+
+# Versi format indeks on-disk. Naikkan jika struktur file berubah.
+INDEX_FORMAT_VERSION = 1
+META_FILE = "meta.json"
+# Subdirektori shard (rentang baris chunk) untuk pencarian scatter-gather, lihat shard_search
+SHARDS_DIR = "shards"
+
+# Jenis peraturan untuk filter retrieval, dikenali dari judul dokumen (urutan = prioritas pola)
+REGULATION_LEVEL_PATTERNS = (
+    ('uu', r"undang-?undang"),
+    ('pp', r"peraturan pemerintah"),
+    ('perpres', r"peraturan presiden"),
+    ('permen', r"peraturan menteri"),
+    ('perda', r"peraturan daerah"),
+)
+REGULATION_LEVELS = tuple(level for level, _ in REGULATION_LEVEL_PATTERNS) + ('lainnya',)
+# Peraturan tingkat nasional (semua jenis kecuali perda)
+NATIONAL_LEVELS = ('uu', 'pp', 'perpres', 'permen')
+# Panjang awal teks dokumen yang diperiksa untuk mencari judul peraturan
+TITLE_SEARCH_CHARS = 600
+# Maksimum cakupan filter (kombinasi dokumen) yang baris-barisnya disimpan di memori
+SCOPE_CACHE_SIZE = 64
+
+def describe_document(name: str, text: str = "") -> Dict[str, Any]:
+    """
+    Mengenali jenis peraturan dan tahun sebuah dokumen dari judulnya.
+
+    Judul dicari di awal teks dokumen (mis. "peraturan pemerintah republik indonesia nomor
+    81 tahun 2012 tentang ..."); jika tidak ditemukan, nama file dipakai. Tahun diambil dari
+    nomor peraturan pada judul (antara "nomor" pertama dan "tentang"), termasuk nomor
+    peraturan menteri bergaya "nomor p.70/menlhk/setjen/kum.1/8/2016" yang diakhiri tahunnya.
+
+    Args:
+        name (str): Nama file dokumen.
+        text (str): Teks awal dokumen (mis. chunk pertamanya); boleh kosong.
+
+    Returns:
+        Dict[str, Any]: {'level': salah satu REGULATION_LEVELS, 'year': tahun atau -1}.
+    """
+    title = text[:TITLE_SEARCH_CHARS].lower()
+    # Nama dokumen dapat berupa path relatif (mis. "nasional/UU0232014.pdf")
+    file_name = os.path.splitext(os.path.basename(name))[0].lower()
+    level, level_end = 'lainnya', 0
+    matches = sorted((match.start(), match.end(), level) for level, pattern in REGULATION_LEVEL_PATTERNS
+                     for match in [re.search(pattern, title)] if match)
+    if matches:
+        _, level_end, level = matches[0]
+    else:
+        # Nama file, termasuk singkatan seperti "UU0232014.pdf", "PermenPU3-2013.pdf", "p.70-2.pdf"
+        abbreviation = re.match(r"(uu|pp|perpres|permen|perda|p[._]\d)", file_name)
+        if abbreviation:
+            level = 'permen' if abbreviation.group(1)[1] in '._' else abbreviation.group(1)
+
+    year = -1
+    number = re.search(r"nomor\s+(.{1,80}?)(?:\s+tentang|$)", title[level_end:])
+    candidates = [(r"tahun\s+([12][0-9o]{3})", number.group(1)),
+                  (r"((?:19|20)\d{2})(?!\d)", number.group(1))] if number else []
+    candidates += [(r"tahun\s+((?:19|20)\d{2})", file_name), (r"(?<!\d)((?:19|20)\d{2})(?!\d)", file_name)]
+    for pattern, source in candidates:
+        match = re.search(pattern, source)
+        if match:
+            # OCR kadang membaca angka 0 sebagai huruf o ("2o2o")
+            year = int(match.group(1).replace('o', '0'))
+            break
+    return {'level': level, 'year': year}
+
+def build_document_rows(doc_ids: np.ndarray, num_documents: int,
+                        duplicates: Optional[Dict[str, np.ndarray]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Baris chunk per dokumen dalam format CSR, untuk filter retrieval per dokumen.
+
+    Baris dokumen d adalah rows[indptr[d]:indptr[d+1]] (terurut menaik): chunk dari dokumen
+    itu sendiri ditambah chunk representatif dari near-duplicate yang berasal dari dokumen itu.
+
+    Args:
+        doc_ids (np.ndarray): doc_id setiap chunk.
+        num_documents (int): Jumlah dokumen.
+        duplicates (Dict[str, np.ndarray] | None): Metadata near-duplicate (doc_id dan representative).
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (indptr int64 sepanjang num_documents + 1, rows int32).
+    """
+    docs = np.asarray(doc_ids, dtype=np.int64)
+    rows = np.arange(len(docs), dtype=np.int64)
+    if duplicates:
+        docs = np.concatenate([docs, np.asarray(duplicates['doc_id'], dtype=np.int64)])
+        rows = np.concatenate([rows, np.asarray(duplicates['representative'], dtype=np.int64)])
+    pairs = np.unique(docs * (len(doc_ids) + 1) + rows)
+    docs, rows = pairs // (len(doc_ids) + 1), pairs % (len(doc_ids) + 1)
+    indptr = np.zeros(num_documents + 1, dtype=np.int64)
+    np.cumsum(np.bincount(docs, minlength=num_documents), out=indptr[1:])
+    return indptr, rows.astype(np.int32)
+
+class ChunkStore:
+    """
+    Kumpulan teks chunk yang disimpan sebagai satu blob UTF-8 beserta array offset.
+
+    Berperilaku seperti list read-only (len, indexing, iterasi), tetapi teks hanya
+    di-decode saat diakses sehingga blob dapat di-memory-map dan dibagi antar-proses.
+    """
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self._blob = blob
+        self._offsets = offsets
+
+    @classmethod
+    def from_texts(cls, texts: Sequence[str]) -> "ChunkStore":
+        """Membangun ChunkStore di memori dari daftar teks."""
+        encoded = [text.encode('utf-8') for text in texts]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(blob, offsets)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("Indeks chunk di luar jangkauan.")
+        start, end = self._offsets[i], self._offsets[i + 1]
+        return self._blob[start:end].tobytes().decode('utf-8')
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self[i]
+
+class QueryVectorizer:
+    """
+    Pengganti ringan TfidfVectorizer untuk mentransformasi query saat retrieval.
+
+    Hanya menyimpan vocabulary (terurut, dicari dengan binary search) dan vektor idf,
+    sehingga dapat dimuat via mmap tanpa unpickle objek scikit-learn. Hasil transform
+    sama dengan TfidfVectorizer.transform untuk konfigurasi analyzer yang didukung.
+    """
+
+    def __init__(self, vocabulary: np.ndarray, idf: np.ndarray, token_pattern: str,
+                 lowercase: bool = True, norm: str = 'l2', sublinear_tf: bool = False,
+                 dtype: str = 'float64'):
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.token_pattern = token_pattern
+        self.lowercase = lowercase
+        self.norm = norm
+        self.sublinear_tf = sublinear_tf
+        self.dtype = np.dtype(dtype)
+        self._token_regex = re.compile(token_pattern)
+
+    def tokenize(self, text: str) -> List[str]:
+        """Memecah teks menjadi token dengan aturan yang sama seperti saat indexing."""
+        if self.lowercase:
+            text = text.lower()
+        return self._token_regex.findall(text)
+
+    def lookup(self, tokens: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Memetakan token ke indeks kolom vocabulary.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (indeks kolom terurut, jumlah kemunculan),
+            hanya untuk token yang ada di vocabulary.
+        """
+        counts = Counter(tokens)
+        if not counts or len(self.vocabulary) == 0:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64)
+        terms = np.array(list(counts.keys()))
+        positions = np.searchsorted(self.vocabulary, terms)
+        positions = np.minimum(positions, len(self.vocabulary) - 1)
+        found = self.vocabulary[positions] == terms
+        term_counts = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+        columns, term_counts = positions[found].astype(np.int32), term_counts[found]
+        order = np.argsort(columns)
+        return columns[order], term_counts[order]
+
+    def transform(self, queries: Sequence[str]) -> csr_matrix:
+        """
+        Mentransformasi daftar query menjadi matriks TF-IDF (CSR).
+
+        Args:
+            queries (Sequence[str]): Daftar teks query.
+
+        Returns:
+            csr_matrix: Matriks berukuran (len(queries), ukuran vocabulary).
+        """
+        indptr = [0]
+        indices, data = [], []
+        for query in queries:
+            columns, counts = self.lookup(self.tokenize(query))
+            values = counts.astype(np.float64)
+            if self.sublinear_tf:
+                values = np.log(values) + 1
+            values *= self.idf[columns]
+            if self.norm == 'l2' and len(values):
+                values /= np.sqrt(np.dot(values, values))
+            elif self.norm == 'l1' and len(values):
+                values /= np.abs(values).sum()
+            indices.append(columns)
+            data.append(values.astype(self.dtype))
+            indptr.append(indptr[-1] + len(columns))
+        return csr_matrix(
+            (np.concatenate(data) if data else np.empty(0, dtype=self.dtype),
+             np.concatenate(indices) if indices else np.empty(0, dtype=np.int32),
+             np.array(indptr, dtype=np.int64)),
+            shape=(len(queries), len(self.vocabulary)),
+        )
+
+class ChunkMetadata:
+    """
+    Metadata lokasi chunk (dokumen, halaman, BAB/Pasal, offset karakter) sebagai array paralel.
+
+    Setiap field adalah array NumPy sepanjang jumlah chunk, sehingga penyaringan
+    berdasarkan metadata cukup dilakukan dengan mask array sebelum scoring.
+    Lokasi chunk near-duplicate yang dibuang saat indexing disimpan di `duplicates`
+    (field yang sama ditambah 'representative', terurut berdasarkan representatif).
+    """
+
+    def __init__(self, documents: List[str], arrays: Dict[str, np.ndarray],
+                 duplicates: Optional[Dict[str, np.ndarray]] = None,
+                 document_attributes: Optional[List[Dict[str, Any]]] = None,
+                 document_rows: Optional[Tuple[np.ndarray, np.ndarray]] = None):
+        """
+        Args:
+            documents (List[str]): Nama dokumen, diindeks oleh doc_id.
+            arrays (Dict[str, np.ndarray]): Array metadata paralel per chunk.
+            duplicates (Dict[str, np.ndarray] | None): Metadata near-duplicate yang dibuang.
+            document_attributes (List[Dict[str, Any]] | None): Jenis peraturan dan tahun per
+                dokumen (lihat describe_document); jika None, dikenali dari nama file.
+            document_rows (Tuple[np.ndarray, np.ndarray] | None): Baris chunk per dokumen yang
+                dihitung saat indexing (lihat build_document_rows); jika None, dihitung di sini.
+        """
+        self.documents = documents
+        self.arrays = arrays
+        self.duplicates = duplicates
+        self.document_attributes = document_attributes or [describe_document(name) for name in documents]
+        self.row_indptr, self.rows = document_rows or build_document_rows(arrays['doc_id'], len(documents), duplicates)
+        self._scopes: Dict[Tuple[int, ...], np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.arrays['doc_id'])
+
+    def record(self, i: int) -> dict:
+        """Mengembalikan metadata satu chunk sebagai dict (nama dokumen + seluruh field)."""
+        record = {field: int(values[i]) for field, values in self.arrays.items()}
+        record['document'] = self.documents[record['doc_id']]
+        record['duplicates'] = [self._duplicate_record(j) for j in self._duplicate_rows(i)]
+        return record
+
+    def _duplicate_rows(self, i: int) -> range:
+        """Baris di `duplicates` yang diwakili oleh chunk i (binary search pada array terurut)."""
+        if not self.duplicates:
+            return range(0)
+        representative = self.duplicates['representative']
+        return range(int(np.searchsorted(representative, i, side='left')),
+                     int(np.searchsorted(representative, i, side='right')))
+
+    def _duplicate_record(self, j: int) -> dict:
+        record = {field: int(values[j]) for field, values in self.duplicates.items() if field != 'representative'}
+        record['document'] = self.documents[record['doc_id']]
+        return record
+
+    def document_mask(self, documents: Iterable[str]) -> np.ndarray:
+        """
+        Mask boolean untuk chunk yang berasal dari salah satu dokumen yang diberikan,
+        termasuk chunk yang mewakili duplikat dari dokumen tersebut.
+        """
+        wanted = set(documents)
+        doc_ids = [i for i, name in enumerate(self.documents) if name in wanted]
+        mask = np.isin(self.arrays['doc_id'], doc_ids)
+        if self.duplicates:
+            matched = np.isin(self.duplicates['doc_id'], doc_ids)
+            mask[self.duplicates['representative'][matched]] = True
+        return mask
+
+    def scope_rows(self, documents: Optional[Iterable[str]] = None, levels: Optional[Iterable[str]] = None,
+                   years: Optional[Iterable[int]] = None) -> Optional[np.ndarray]:
+        """
+        Baris chunk (terurut) yang termasuk cakupan filter; semua filter yang diberikan harus
+        dipenuhi dokumen sumbernya. Hasil per kombinasi dokumen disimpan, sehingga cakupan
+        yang sama berikutnya hanya berupa lookup.
+
+        Args:
+            documents (Iterable[str] | None): Nama dokumen yang diizinkan.
+            levels (Iterable[str] | None): Jenis peraturan yang diizinkan (lihat REGULATION_LEVELS).
+            years (Iterable[int] | None): Tahun peraturan yang diizinkan.
+
+        Returns:
+            np.ndarray | None: Indeks baris chunk int64, atau None jika tidak ada filter.
+        """
+        if documents is None and levels is None and years is None:
+            return None
+        wanted_documents = set(documents) if documents is not None else None
+        wanted_levels = {level.lower() for level in levels} if levels is not None else None
+        wanted_years = {int(year) for year in years} if years is not None else None
+        doc_ids = tuple(
+            doc_id for doc_id, (name, attributes) in enumerate(zip(self.documents, self.document_attributes))
+            if (wanted_documents is None or name in wanted_documents)
+            and (wanted_levels is None or attributes['level'] in wanted_levels)
+            and (wanted_years is None or attributes['year'] in wanted_years)
+        )
+        rows = self._scopes.get(doc_ids)
+        if rows is None:
+            rows = np.unique(np.concatenate(
+                [np.empty(0, dtype=np.int64)]
+                + [np.asarray(self.rows[self.row_indptr[d]:self.row_indptr[d + 1]], dtype=np.int64) for d in doc_ids]
+            ))
+            if len(self._scopes) >= SCOPE_CACHE_SIZE:
+                self._scopes.clear()
+            self._scopes[doc_ids] = rows
+        return rows
+
+class BM25Index:
+    """
+    Inverted index BM25 dengan bobot dampak (impact) yang sudah dihitung per posting.
+
+    Posting setiap term disimpan berurutan per term (format CSC): `indptr[t]:indptr[t+1]`
+    menunjuk ke id chunk (terurut menaik) dan bobot BM25 term tersebut di chunk itu,
+    sehingga skor query cukup dijumlahkan tanpa menghitung ulang normalisasi panjang.
+    `max_weights` adalah batas atas bobot setiap term untuk early termination (MaxScore).
+    Kolom term sama dengan vocabulary QueryVectorizer.
+    """
+
+    ARRAY_NAMES = ('indptr', 'docs', 'weights', 'max_weights')
+
+    def __init__(self, indptr: np.ndarray, docs: np.ndarray, weights: np.ndarray, max_weights: np.ndarray,
+                 num_docs: int, k1: float, b: float, avgdl: float):
+        self.indptr = indptr
+        self.docs = docs
+        self.weights = weights
+        self.max_weights = max_weights
+        self.num_docs = num_docs
+        self.k1 = k1
+        self.b = b
+        self.avgdl = avgdl
+
+    @classmethod
+    def from_term_frequencies(cls, term_frequencies, k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        """
+        Membangun indeks BM25 dari matriks frekuensi term (chunk x term).
+
+        Args:
+            term_frequencies (spmatrix): Jumlah kemunculan term per chunk (mis. hasil CountVectorizer).
+            k1 (float): Parameter saturasi frekuensi term.
+            b (float): Parameter normalisasi panjang chunk.
+
+        Returns:
+            BM25Index: Indeks dengan posting terurut per term.
+        """
+        term_frequencies = csr_matrix(term_frequencies, dtype=np.float64, copy=True)
+        # Entri (chunk, term) ganda akan membuat posting berisi chunk yang sama dua kali
+        term_frequencies.sum_duplicates()
+        num_docs = term_frequencies.shape[0]
+        doc_lengths = np.asarray(term_frequencies.sum(axis=1)).ravel()
+        avgdl = float(doc_lengths.mean()) if num_docs else 0.0
+        document_frequency = np.bincount(term_frequencies.indices, minlength=term_frequencies.shape[1])
+        # Varian idf BM25 yang selalu positif (Lucene)
+        idf = np.log(1 + (num_docs - document_frequency + 0.5) / (document_frequency + 0.5))
+
+        tf = term_frequencies.data
+        rows = np.repeat(np.arange(num_docs), np.diff(term_frequencies.indptr))
+        length_norm = k1 * (1 - b + b * doc_lengths[rows] / avgdl) if avgdl else k1
+        weighted = term_frequencies.copy()
+        weighted.data = idf[term_frequencies.indices] * tf * (k1 + 1) / (tf + length_norm)
+
+        postings = weighted.tocsc()
+        postings.sort_indices()
+        weights = postings.data.astype(np.float32)
+        max_weights = np.zeros(postings.shape[1], dtype=np.float32)
+        non_empty = np.diff(postings.indptr) > 0
+        max_weights[non_empty] = np.maximum.reduceat(weights, postings.indptr[:-1][non_empty])
+        return cls(postings.indptr.astype(np.int64), postings.indices.astype(np.int32), weights, max_weights,
+                   num_docs, k1, b, avgdl)
+
+    def params(self) -> dict:
+        """Parameter skalar untuk meta.json."""
+        return {'num_docs': self.num_docs, 'k1': self.k1, 'b': self.b, 'avgdl': self.avgdl}
+
+def shard_ranges(num_chunks: int, num_shards: int) -> List[Tuple[int, int]]:
+    """
+    Membagi baris chunk menjadi num_shards rentang bersebelahan dengan ukuran hampir sama.
+
+    Returns:
+        List[Tuple[int, int]]: (baris awal, baris akhir eksklusif) per shard; shard kosong dibuang.
+    """
+    bounds = np.linspace(0, num_chunks, max(1, num_shards) + 1).round().astype(np.int64)
+    return [(int(start), int(end)) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+def shard_bm25_index(bm25_index: BM25Index, start: int, end: int) -> BM25Index:
+    """
+    Posting BM25 untuk chunk di baris [start, end), dengan id chunk relatif terhadap start.
+
+    Bobot posting tidak dihitung ulang (idf dan panjang rata-rata tetap global), dan
+    max_weights global dipertahankan sehingga urutan term saat scoring sama dengan indeks
+    utuh dan skor setiap chunk identik.
+    """
+    docs = np.asarray(bm25_index.docs)
+    keep = (docs >= start) & (docs < end)
+    terms = np.repeat(np.arange(len(bm25_index.indptr) - 1), np.diff(bm25_index.indptr))
+    indptr = np.zeros(len(bm25_index.indptr), dtype=np.int64)
+    np.cumsum(np.bincount(terms[keep], minlength=len(indptr) - 1), out=indptr[1:])
+    return BM25Index(indptr, (docs[keep] - start).astype(np.int32), np.asarray(bm25_index.weights)[keep],
+                     np.asarray(bm25_index.max_weights), end - start, bm25_index.k1, bm25_index.b, bm25_index.avgdl)
+
+def _save_shards(index_dir: str, matrix: csr_matrix, bm25_index: Optional[BM25Index],
+                 chunk_embeddings: Optional[np.ndarray], num_shards: int) -> List[Tuple[int, int]]:
+    """Menulis array scoring (TF-IDF, BM25, embedding) per rentang baris ke SHARDS_DIR/<nomor>."""
+    ranges = shard_ranges(matrix.shape[0], num_shards)
+    for shard_id, (start, end) in enumerate(ranges):
+        shard_dir = os.path.join(index_dir, SHARDS_DIR, f"{shard_id:02d}")
+        os.makedirs(shard_dir)
+        rows = matrix[start:end]
+        arrays = {
+            'tfidf_data': rows.data,
+            'tfidf_indices': rows.indices.astype(np.int32),
+            'tfidf_indptr': rows.indptr.astype(np.int64),
+        }
+        if bm25_index is not None:
+            shard_bm25 = shard_bm25_index(bm25_index, start, end)
+            for name in BM25Index.ARRAY_NAMES:
+                arrays[f"bm25_{name}"] = getattr(shard_bm25, name)
+        if chunk_embeddings is not None:
+            arrays['embeddings'] = np.asarray(chunk_embeddings[start:end], dtype=np.float16)
+        for name, array in arrays.items():
+            np.save(os.path.join(shard_dir, f"{name}.npy"), array)
+    return ranges
+
+def _is_scoring_array(name: str) -> bool:
+    """True untuk array scoring yang pada indeks sharded hanya disimpan per shard."""
+    return name.startswith(('tfidf_', 'bm25_')) or name == 'embeddings'
+
+def _shard_arrays(index_dir: str, meta: dict, names: Sequence[str], mmap_mode: Optional[str]) -> List[Dict[str, np.ndarray]]:
+    """Array bernama names dari setiap shard, berurutan sesuai rentang barisnya."""
+    return [
+        {name: np.load(os.path.join(index_dir, SHARDS_DIR, f"{shard_id:02d}", f"{name}.npy"), mmap_mode=mmap_mode)
+         for name in names}
+        for shard_id in range(len(meta['shards']))
+    ]
+
+def _merge_shards(index_dir: str, meta: dict, kind: str, mmap_mode: Optional[str]):
+    """
+    Menggabungkan array scoring per shard menjadi array utuh di memori, untuk indeks sharded
+    yang dimuat tanpa worker shard (array utuh tidak disimpan; lihat save_index).
+
+    Args:
+        index_dir (str): Direktori indeks.
+        meta (dict): Isi meta.json indeks.
+        kind (str): 'tfidf', 'bm25', atau 'embeddings'.
+        mmap_mode (str | None): Mode mmap untuk membaca array shard.
+
+    Returns:
+        csr_matrix | BM25Index | np.ndarray: Array scoring untuk semua baris chunk.
+    """
+    if kind == 'embeddings':
+        return np.concatenate([shard['embeddings'] for shard in _shard_arrays(index_dir, meta, ['embeddings'], mmap_mode)])
+    if kind == 'tfidf':
+        shards = _shard_arrays(index_dir, meta, ['tfidf_data', 'tfidf_indices', 'tfidf_indptr'], mmap_mode)
+        indptr, offset = [np.zeros(1, dtype=np.int64)], 0
+        for shard in shards:
+            indptr.append(np.asarray(shard['tfidf_indptr'][1:]) + offset)
+            offset += int(shard['tfidf_indptr'][-1])
+        return csr_matrix((np.concatenate([shard['tfidf_data'] for shard in shards]),
+                           np.concatenate([shard['tfidf_indices'] for shard in shards]),
+                           np.concatenate(indptr)), shape=tuple(meta['shape']), copy=False)
+    # BM25: posting setiap term digabung sesuai urutan shard, sehingga id chunk tetap terurut
+    shards = _shard_arrays(index_dir, meta, [f"bm25_{name}" for name in BM25Index.ARRAY_NAMES], mmap_mode)
+    num_terms = len(shards[0]['bm25_indptr']) - 1
+    terms = np.concatenate([np.repeat(np.arange(num_terms), np.diff(shard['bm25_indptr'])) for shard in shards])
+    docs = np.concatenate([shard['bm25_docs'] + start for shard, (start, _) in zip(shards, meta['shards'])])
+    weights = np.concatenate([shard['bm25_weights'] for shard in shards])
+    order = np.argsort(terms, kind='stable')
+    indptr = np.zeros(num_terms + 1, dtype=np.int64)
+    np.cumsum(np.bincount(terms, minlength=num_terms), out=indptr[1:])
+    return BM25Index(indptr, docs[order].astype(np.int32), weights[order],
+                     np.asarray(shards[0]['bm25_max_weights']), **meta['bm25'])
+
+def _scoring_in_shards(index_dir: str, meta: dict) -> bool:
+    """True jika array scoring indeks hanya tersedia per shard."""
+    return bool(meta.get('shards')) and not os.path.exists(os.path.join(index_dir, "tfidf_data.npy"))
+
+def _check_vectorizer(vectorizer) -> None:
+    """Memastikan konfigurasi TfidfVectorizer dapat direproduksi oleh QueryVectorizer."""
+    unsupported = (
+        vectorizer.analyzer != 'word'
+        or tuple(vectorizer.ngram_range) != (1, 1)
+        or vectorizer.preprocessor is not None
+        or vectorizer.tokenizer is not None
+        or vectorizer.stop_words is not None
+        or vectorizer.strip_accents is not None
+        or vectorizer.binary
+        or not vectorizer.use_idf
+    )
+    if unsupported:
+        raise ValueError("Konfigurasi TfidfVectorizer tidak didukung oleh format indeks mmap.")
+
+def save_index(index_dir: str, chunks: Sequence[str], vectorizer, tfidf_matrix,
+               documents: Optional[List[str]] = None,
+               chunk_metadata: Optional[Dict[str, np.ndarray]] = None,
+               duplicate_metadata: Optional[Dict[str, np.ndarray]] = None,
+               bm25_index: Optional[BM25Index] = None,
+               chunk_embeddings: Optional[np.ndarray] = None,
+               embedding_model: Optional[str] = None,
+               ann_index: Optional[IVFPQIndex] = None,
+               document_attributes: Optional[List[Dict[str, Any]]] = None,
+               num_shards: int = 1) -> None:
+    """
+    Menyimpan indeks TF-IDF ke direktori dalam format yang dapat di-memory-map.
+
+    Isi direktori: array CSR (data/indices/indptr), vektor idf, vocabulary terurut,
+    blob teks chunk beserta offset, dan meta.json. Penulisan dilakukan ke direktori
+    sementara lalu di-rename agar pembaca tidak pernah melihat indeks setengah jadi.
+
+    Args:
+        index_dir (str): Direktori tujuan indeks.
+        chunks (Sequence[str]): Teks chunk, urutannya sama dengan baris matriks.
+        vectorizer (TfidfVectorizer): Vectorizer yang sudah di-fit.
+        tfidf_matrix (csr_matrix): Matriks TF-IDF hasil fit_transform.
+        documents (List[str] | None): Nama dokumen sumber, diindeks oleh doc_id.
+        chunk_metadata (Dict[str, np.ndarray] | None): Array metadata paralel per chunk.
+        duplicate_metadata (Dict[str, np.ndarray] | None): Metadata chunk near-duplicate yang
+            dibuang, dengan field 'representative' terurut (lihat ChunkMetadata).
+        bm25_index (BM25Index | None): Inverted index BM25 dengan kolom term yang sama dengan vectorizer.
+        chunk_embeddings (np.ndarray | None): Embedding chunk ternormalisasi (chunk x dimensi),
+            disimpan sebagai float16.
+        embedding_model (str | None): Nama model SentenceTransformer yang menghasilkan embedding.
+        ann_index (IVFPQIndex | None): Indeks ANN atas chunk_embeddings.
+        document_attributes (List[Dict[str, Any]] | None): Jenis peraturan dan tahun per dokumen
+            (lihat describe_document), untuk filter retrieval.
+        num_shards (int): Jika lebih dari 1, array scoring (TF-IDF, BM25, embedding) hanya
+            ditulis per rentang baris chunk ke SHARDS_DIR untuk pencarian paralel (lihat
+            shard_search.ShardedSearcher); loader menggabungkannya jika dimuat utuh.
+    """
+    _check_vectorizer(vectorizer)
+
+    tmp_dir = f"{index_dir.rstrip(os.sep)}.tmp"
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+
+    matrix = csr_matrix(tfidf_matrix)
+    matrix.sort_indices()
+    chunk_store = ChunkStore.from_texts(chunks)
+    arrays = {
+        'tfidf_data': matrix.data,
+        'tfidf_indices': matrix.indices.astype(np.int32),
+        'tfidf_indptr': matrix.indptr.astype(np.int64),
+        'idf': vectorizer.idf_,
+        # get_feature_names_out terurut sesuai indeks kolom (urutan leksikografis)
+        'vocabulary': np.asarray(vectorizer.get_feature_names_out(), dtype=str),
+        'chunks_blob': chunk_store._blob,
+        'chunks_offsets': chunk_store._offsets,
+    }
+    for field, values in (chunk_metadata or {}).items():
+        arrays[f"meta_{field}"] = values
+    for field, values in (duplicate_metadata or {}).items():
+        arrays[f"dup_{field}"] = values
+    if chunk_metadata:
+        # Baris per dokumen dihitung sekali di sini agar filter saat query cukup berupa lookup
+        arrays['scope_indptr'], arrays['scope_rows'] = build_document_rows(
+            chunk_metadata['doc_id'], len(documents or []), duplicate_metadata)
+    if bm25_index is not None:
+        for name in BM25Index.ARRAY_NAMES:
+            arrays[f"bm25_{name}"] = getattr(bm25_index, name)
+    if chunk_embeddings is not None:
+        arrays['embeddings'] = np.asarray(chunk_embeddings, dtype=np.float16)
+    if ann_index is not None:
+        for name in IVFPQIndex.ARRAY_NAMES:
+            arrays[f"ann_{name}"] = getattr(ann_index, name)
+    ranges = None
+    if num_shards > 1:
+        # Array scoring hanya disimpan per shard (tanpa salinan utuh); lihat _merge_shards
+        ranges = _save_shards(tmp_dir, matrix, bm25_index, chunk_embeddings, num_shards)
+        arrays = {name: array for name, array in arrays.items() if not _is_scoring_array(name)}
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), array)
+
+    meta = {
+        'format_version': INDEX_FORMAT_VERSION,
+        'num_chunks': len(chunk_store),
+        'shape': list(matrix.shape),
+        'documents': list(documents or []),
+        'metadata_fields': list(chunk_metadata or {}),
+        'duplicate_fields': list(duplicate_metadata or {}),
+        'document_attributes': document_attributes,
+        'document_rows': bool(chunk_metadata),
+        'bm25': bm25_index.params() if bm25_index is not None else None,
+        'embeddings': {'model': embedding_model, 'dim': int(chunk_embeddings.shape[1])} if chunk_embeddings is not None else None,
+        'ann': ann_index.params() if ann_index is not None else None,
+        'shards': ranges,
+        'vectorizer': {
+            'token_pattern': vectorizer.token_pattern,
+            'lowercase': vectorizer.lowercase,
+            'norm': vectorizer.norm,
+            'sublinear_tf': vectorizer.sublinear_tf,
+            'dtype': np.dtype(matrix.dtype).name,
+        },
+    }
+    with open(os.path.join(tmp_dir, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+
+    # Ganti indeks lama; pembaca yang masih memetakan file lama tetap aman (inode tetap hidup)
+    old_dir = f"{index_dir.rstrip(os.sep)}.old"
+    if os.path.exists(index_dir):
+        if os.path.exists(old_dir):
+            shutil.rmtree(old_dir)
+        os.rename(index_dir, old_dir)
+    os.rename(tmp_dir, index_dir)
+    if os.path.exists(old_dir):
+        shutil.rmtree(old_dir)
+
+def load_index(index_dir: str, mmap_mode: str = 'r',
+               scoring: bool = True) -> Tuple[ChunkStore, QueryVectorizer, Optional[csr_matrix]]:
+    """
+    Memuat indeks TF-IDF dari direktori dengan memory-mapping.
+
+    Pada indeks sharded, matriks TF-IDF utuh digabung dari shard di memori.
+
+    Args:
+        index_dir (str): Direktori indeks yang ditulis oleh save_index.
+        mmap_mode (str): Mode mmap untuk np.load ('r' berbagi page cache antar-proses).
+        scoring (bool): Jika False, matriks TF-IDF tidak dimuat (None), mis. karena scoring
+            dilayani worker shard.
+
+    Returns:
+        Tuple[ChunkStore, QueryVectorizer, csr_matrix | None]: Chunks, vectorizer query, dan matriks TF-IDF.
+    """
+    with open(os.path.join(index_dir, META_FILE), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('format_version') != INDEX_FORMAT_VERSION:
+        raise ValueError(f"Versi format indeks tidak didukung: {meta.get('format_version')}")
+
+    def load(name: str) -> np.ndarray:
+        return np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode=mmap_mode)
+
+    chunks = ChunkStore(load('chunks_blob'), load('chunks_offsets'))
+    vectorizer = QueryVectorizer(load('vocabulary'), load('idf'), **meta['vectorizer'])
+    if not scoring:
+        tfidf_matrix = None
+    elif _scoring_in_shards(index_dir, meta):
+        tfidf_matrix = _merge_shards(index_dir, meta, 'tfidf', mmap_mode)
+    else:
+        tfidf_matrix = csr_matrix(
+            (load('tfidf_data'), load('tfidf_indices'), load('tfidf_indptr')),
+            shape=tuple(meta['shape']), copy=False,
+        )
+    logging.debug(f"Indeks mmap dimuat dari {index_dir}: {meta['num_chunks']} chunks.")
+    return chunks, vectorizer, tfidf_matrix
+
+def load_chunk_metadata(index_dir: str, mmap_mode: str = 'r') -> Optional[ChunkMetadata]:
+    """
+    Memuat metadata chunk dari direktori indeks.
+
+    Args:
+        index_dir (str): Direktori indeks yang ditulis oleh save_index.
+        mmap_mode (str): Mode mmap untuk np.load.
+
+    Returns:
+        ChunkMetadata | None: Metadata chunk, atau None jika indeks tidak menyimpannya.
+    """
+    with open(os.path.join(index_dir, META_FILE), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    if not meta.get('metadata_fields'):
+        return None
+    arrays = {
+        field: np.load(os.path.join(index_dir, f"meta_{field}.npy"), mmap_mode=mmap_mode)
+        for field in meta['metadata_fields']
+    }
+    duplicates = {
+        field: np.load(os.path.join(index_dir, f"dup_{field}.npy"), mmap_mode=mmap_mode)
+        for field in meta.get('duplicate_fields', [])
+    }
+    document_rows = None
+    if meta.get('document_rows'):
+        document_rows = tuple(np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode=mmap_mode)
+                              for name in ('scope_indptr', 'scope_rows'))
+    return ChunkMetadata(meta['documents'], arrays, duplicates or None, meta.get('document_attributes'), document_rows)
+
+def load_bm25_index(index_dir: str, mmap_mode: str = 'r') -> Optional[BM25Index]:
+    """
+    Memuat inverted index BM25 dari direktori indeks (digabung dari shard pada indeks sharded).
+
+    Args:
+        index_dir (str): Direktori indeks yang ditulis oleh save_index.
+        mmap_mode (str): Mode mmap untuk np.load.
+
+    Returns:
+        BM25Index | None: Indeks BM25, atau None jika indeks tidak menyimpannya.
+    """
+    with open(os.path.join(index_dir, META_FILE), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    if not meta.get('bm25'):
+        return None
+    if _scoring_in_shards(index_dir, meta):
+        return _merge_shards(index_dir, meta, 'bm25', mmap_mode)
+    arrays = {
+        name: np.load(os.path.join(index_dir, f"bm25_{name}.npy"), mmap_mode=mmap_mode)
+        for name in BM25Index.ARRAY_NAMES
+    }
+    return BM25Index(**arrays, **meta['bm25'])
+
+def load_chunk_embeddings(index_dir: str, mmap_mode: str = 'r') -> Optional[Tuple[np.ndarray, str]]:
+    """
+    Memuat matriks embedding chunk (float16) dari direktori indeks (digabung dari shard
+    pada indeks sharded).
+
+    Args:
+        index_dir (str): Direktori indeks yang ditulis oleh save_index.
+        mmap_mode (str): Mode mmap untuk np.load.
+
+    Returns:
+        Tuple[np.ndarray, str] | None: (embedding chunk x dimensi, nama model), atau None
+        jika indeks tidak menyimpan embedding.
+    """
+    with open(os.path.join(index_dir, META_FILE), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    if not meta.get('embeddings'):
+        return None
+    if _scoring_in_shards(index_dir, meta):
+        embeddings = _merge_shards(index_dir, meta, 'embeddings', mmap_mode)
+    else:
+        embeddings = np.load(os.path.join(index_dir, "embeddings.npy"), mmap_mode=mmap_mode)
+    return embeddings, meta['embeddings']['model']
+
+def load_ann_index(index_dir: str, mmap_mode: str = 'r') -> Optional[IVFPQIndex]:
+    """
+    Memuat indeks ANN IVF-PQ dari direktori indeks (array di-memory-map).
+
+    Args:
+        index_dir (str): Direktori indeks yang ditulis oleh save_index.
+        mmap_mode (str): Mode mmap untuk np.load.
+
+    Returns:
+        IVFPQIndex | None: Indeks ANN, atau None jika indeks tidak menyimpannya.
+    """
+    with open(os.path.join(index_dir, META_FILE), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    if not meta.get('ann'):
+        return None
+    arrays = {
+        name: np.load(os.path.join(index_dir, f"ann_{name}.npy"), mmap_mode=mmap_mode)
+        for name in IVFPQIndex.ARRAY_NAMES
+    }
+    return IVFPQIndex(**arrays)
+
+def load_shard(shard_dir: str, meta: dict, mmap_mode: str = 'r') -> Tuple[csr_matrix, Optional[BM25Index], Optional[np.ndarray]]:
+    """
+    Memuat array scoring satu shard (ditulis save_index dengan num_shards > 1).
+
+    Args:
+        shard_dir (str): Direktori shard, mis. <indeks>/shards/00.
+        meta (dict): Isi meta.json indeks induknya.
+        mmap_mode (str): Mode mmap untuk np.load.
+
+    Returns:
+        Tuple[csr_matrix, BM25Index | None, np.ndarray | None]: Matriks TF-IDF, indeks BM25,
+        dan embedding untuk baris shard (indeks baris relatif terhadap awal shard).
+    """
+    def load(name: str) -> np.ndarray:
+        return np.load(os.path.join(shard_dir, f"{name}.npy"), mmap_mode=mmap_mode)
+
+    indptr = load('tfidf_indptr')
+    tfidf_matrix = csr_matrix((load('tfidf_data'), load('tfidf_indices'), indptr),
+                              shape=(len(indptr) - 1, meta['shape'][1]), copy=False)
+    bm25_index = None
+    if meta.get('bm25'):
+        arrays = {name: load(f"bm25_{name}") for name in BM25Index.ARRAY_NAMES}
+        bm25_index = BM25Index(**arrays, **dict(meta['bm25'], num_docs=tfidf_matrix.shape[0]))
+    embeddings = load('embeddings') if meta.get('embeddings') else None
+    return tfidf_matrix, bm25_index, embeddings
@@ -5,12 +5,19 @@ import joblib # Untuk serialisasi model atau data
 import nltk # Natural Language Toolkit untuk tokenisasi
 from nltk.tokenize import word_tokenize
 from nltk.corpus import stopwords
-from sklearn.feature_extraction.text import TfidfVectorizer # TF-IDF untuk indexing teks
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer # TF-IDF untuk indexing teks
 import os
 import argparse # Untuk parsing argumen CLI
 import logging # Logging untuk pelacakan proses
+import hashlib # Hash konten file untuk manifest indeks inkremental
+import json # Laporan waktu per tahap build indeks
+import time
+import zlib # Hash shingle yang stabil antar-proses untuk MinHash
 import numpy as np
-from typing import List, Tuple, Optional
+from index_store import BM25Index, describe_document, save_index # Format indeks on-disk yang dapat di-memory-map
+from ann_index import IVFPQIndex # Indeks approximate nearest neighbour untuk embedding
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Tuple, Optional, Union
 
 # --- Konfigurasi Logging Default ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -23,27 +30,222 @@ except LookupError:
     nltk.download('stopwords')
     stopwords_id = set(stopwords.words('indonesian'))
 
-def extract_text_from_pdf(pdf_path: str) -> Optional[str]:
+# Versi format manifest. Naikkan nilai ini jika logika ekstraksi/praproses/chunking berubah
+# agar cache chunks lama tidak dipakai lagi.
+MANIFEST_VERSION = 5
+
+# Dokumen dengan jumlah halaman di atas nilai ini dipecah per rentang halaman saat ekstraksi paralel
+DEFAULT_PAGES_PER_TASK = 50
+
+# --- Pola Regex Praproses (dikompilasi sekali, diterapkan per halaman) ---
+# Header/footer dan URL JDIH dihapus dalam satu lintasan
+HEADER_FOOTER_PATTERN = re.compile(
+    r'WALI KOTA BANDUNG.*?\n|https://jdih\.bandung\.go\.id/.*?\n|LEMBARAN DAERAH KOTA BANDUNG.*'
+)
+# Awal bagian penjelasan di akhir dokumen; semua teks setelahnya diabaikan
+EXPLANATION_PATTERN = re.compile(r'Penjelasan\nAtas')
+# Karakter akhir halaman sebelumnya yang ikut dicocokkan, untuk judul penjelasan yang terpotong batas halaman
+EXPLANATION_CARRY_CHARS = len("Penjelasan\nAtas") - 1
+WHITESPACE_PATTERN = re.compile(r'\s+')
+NON_ALNUM_PATTERN = re.compile(r'[^a-z0-9\s.,]')
+
+# --- Pola Struktur Dokumen (dicocokkan per baris pada teks mentah, sebelum lowercase) ---
+BAB_HEADING_PATTERN = re.compile(r'^BAB\s+([IVXLCDM]+)(\s+[^a-z]*)?$')
+PASAL_HEADING_PATTERN = re.compile(r'^Pasal\s+(\d+)([A-Z]?)$')
+SECTION_HEADING_PATTERN = re.compile(r'^(Bagian|Paragraf)\s+\S+$')
+AYAT_PATTERN = re.compile(r'^\((\d+)\)')
+# Butir daftar ("1. Sampah adalah ...", "a. memasukkan ..."): batas pemecahan cadangan di dalam ayat
+ITEM_PATTERN = re.compile(r'^(\d+|[a-z])\.\s')
+# Nomor halaman ("- 4 -") dan penanda lanjutan di kaki halaman ("BAB III . . .", "Pasal 5 . . .")
+NOISE_LINE_PATTERN = re.compile(r'^-\s*\d+\s*-$|^(\S+\s+){0,4}\S*\s*(\.\s?\.\s?\.|…)$')
+
+# --- Batas Ukuran Chunk ---
+# Reranker CrossEncoder (ms-marco-MiniLM) memotong pasangan (query, chunk) pada 512 wordpiece
+# (AppConfig.RERANKER_MAX_LENGTH); chunk dibatasi agar pasangan muat tanpa terpotong.
+RERANKER_MAX_SEQ_LENGTH = 512
+QUERY_TOKEN_RESERVE = 64 # Wordpiece yang disisakan untuk query dan token spesial
+WORDPIECES_PER_TOKEN = 2.0 # Perkiraan wordpiece per kata Bahasa Indonesia pada vocabulary BERT bahasa Inggris
+DEFAULT_MAX_CHUNK_TOKENS = int((RERANKER_MAX_SEQ_LENGTH - QUERY_TOKEN_RESERVE) / WORDPIECES_PER_TOKEN)
+DEFAULT_CHUNK_OVERLAP = 32 # Overlap token saat satu ayat/bagian harus dipecah per jendela
+TITLE_MAX_TOKENS = 12 # Batas panjang judul BAB/Bagian yang dipakai sebagai prefix konteks
+
+# --- Deduplikasi Near-Duplicate (MinHash/LSH) ---
+DEFAULT_DEDUP_THRESHOLD = 0.8 # Jaccard shingle minimum agar dua chunk dianggap duplikat
+SHINGLE_SIZE = 5 # Jumlah kata per shingle
+MINHASH_PERMUTATIONS = 128
+LSH_BANDS = 16 # 16 band x 8 baris: peluang menjadi kandidat ~50% pada Jaccard 0.7
+MINHASH_PRIME = (1 << 31) - 1
+MINHASH_SEED = 42
+
+# --- Kebijakan Token Berangka untuk TF-IDF ---
+# 'keep': pola default scikit-learn; 'drop_numbers': buang token yang seluruhnya angka
+# (nomor halaman, tahun, nomor pasal); 'drop_alnum': buang semua token yang mengandung angka
+DIGIT_TOKEN_PATTERNS = {
+    'keep': r"(?u)\b\w\w+\b",
+    'drop_numbers': r"(?u)\b(?!\d+\b)\w\w+\b",
+    'drop_alnum': r"(?u)\b(?:[^\W\d]|_){2,}\b",
+}
+
+# --- Embedding Dense untuk Retrieval Hybrid ---
+# Model yang sama dengan evaluasi semantic similarity di 2_calculate_metrics.py (multibahasa)
+DEFAULT_EMBEDDING_MODEL = 'paraphrase-multilingual-MiniLM-L12-v2'
+DEFAULT_EMBEDDING_BATCH_SIZE = 64
+
+# Tahap pipeline (urutan laporan) dan satuan item yang dihitung di setiap tahap
+STAGE_ITEM_UNITS = {
+    'hashing': 'files',
+    'extraction': 'pages',
+    'cleaning': 'lines',
+    'chunking': 'chunks',
+    'deduplication': 'chunks',
+    'vectorizing': 'chunks',
+    'bm25': 'chunks',
+    'embedding': 'chunks',
+    'ann': 'vectors',
+    'serialization': 'chunks',
+}
+
+# Halaman PDF: (nomor halaman 1-based, teks)
+Page = Tuple[int, str]
+# Baris dokumen yang sudah dibersihkan: (nomor halaman, teks baris, offset awal, offset akhir)
+DocumentLine = Tuple[int, str, int, int]
+
+# Nama dan dtype array metadata chunk; disimpan sebagai array paralel di indeks.
+# Nilai -1 berarti tidak diketahui (mis. chunk sebelum BAB/Pasal pertama).
+CHUNK_METADATA_DTYPES = {
+    'doc_id': np.int32,
+    'page_start': np.int32,
+    'page_end': np.int32,
+    'bab': np.int16,
+    'pasal': np.int32,
+    'char_start': np.int64,
+    'char_end': np.int64,
+    'n_tokens': np.int32, # Jumlah token (kata) chunk, dihitung sekali saat chunking
+}
+
+class ChunkRecord(NamedTuple):
+    """Satu chunk beserta lokasinya di dokumen sumber (sebelum diringkas menjadi array)."""
+    text: str
+    page_start: int
+    page_end: int
+    bab: int
+    pasal: int
+    char_start: int # Offset karakter di teks mentah dokumen (lihat extract_text_from_pdf)
+    char_end: int
+    n_tokens: int
+
+class PipelineStats:
+    """
+    Pencatat waktu, jumlah item, dan byte per tahap pipeline ingestion.
+    
+    Tahap streaming diukur dengan membungkus iteratornya (lihat timed). Karena tahap
+    saling bertumpuk (chunking menarik baris dari cleaning, yang menarik halaman dari
+    ekstraksi), waktu yang dicatat per tahap adalah waktu eksklusif tahap itu sendiri.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self._nested_seconds = 0.0
+
+    def add(self, stage: str, seconds: float, items: int = 0, nbytes: int = 0):
+        """Menambahkan waktu, jumlah item, dan byte ke sebuah tahap."""
+        entry = self.stages.setdefault(stage, {'seconds': 0.0, 'items': 0, 'bytes': 0})
+        entry['seconds'] += seconds
+        entry['items'] += items
+        entry['bytes'] += nbytes
+
+    def merge(self, other: "PipelineStats"):
+        """Menggabungkan statistik dari proses lain (mis. task ekstraksi per rentang halaman)."""
+        for stage, entry in other.stages.items():
+            self.add(stage, entry['seconds'], entry['items'], entry['bytes'])
+
+    def timed(self, stage: str, iterable: Iterable, nbytes: Callable[[Any], int]) -> Iterator:
+        """
+        Meneruskan item dari iterable sambil mencatat waktu eksklusif setiap next().
+        
+        Args:
+            stage (str): Nama tahap.
+            iterable (Iterable): Iterator tahap yang diukur.
+            nbytes (Callable): Fungsi ukuran byte per item.
+        """
+        iterator = iter(iterable)
+        exhausted = object()
+        while True:
+            nested_before = self._nested_seconds
+            start = time.perf_counter()
+            item = next(iterator, exhausted)
+            elapsed = time.perf_counter() - start
+            # Waktu tahap di hulu (yang juga dibungkus timed) tidak dihitung dua kali
+            nested = self._nested_seconds - nested_before
+            self._nested_seconds = nested_before + elapsed
+            if item is exhausted:
+                self.add(stage, elapsed - nested)
+                return
+            self.add(stage, elapsed - nested, 1, nbytes(item))
+            yield item
+
+def count_pdf_pages(pdf_path: str) -> int:
+    """
+    Menghitung jumlah halaman sebuah file PDF.
+    
+    Args:
+        pdf_path (str): Path ke file PDF.
+    
+    Returns:
+        int: Jumlah halaman, atau 0 jika file gagal dibuka.
+    """
+    try:
+        with fitz.open(pdf_path) as doc:
+            return doc.page_count
+    except Exception as e:
+        logging.error(f"Gagal membuka PDF {pdf_path}: {e}")
+        return 0
+
+def iter_pdf_pages(pdf_path: str, page_range: Optional[Tuple[int, int]] = None) -> Iterator[Page]:
+    """
+    Mengekstrak teks PDF halaman demi halaman menggunakan PyMuPDF (fitz).
+    
+    Hanya satu halaman yang berada di memori pada satu waktu, sehingga dokumen
+    ratusan halaman dapat diproses tanpa membangun seluruh teks sekaligus.
+    
+    Args:
+        pdf_path (str): Path ke file PDF.
+        page_range (Tuple[int, int] | None): Rentang halaman [awal, akhir) yang diekstrak.
+            Jika None, seluruh halaman diekstrak.
+    
+    Yields:
+        Page: (nomor halaman 1-based, teks mentah); halaman tanpa teks dilewati.
+    """
+    if not os.path.exists(pdf_path):
+        logging.error(f"File tidak ditemukan di: {pdf_path}")
+        return
+    with fitz.open(pdf_path) as doc:
+        start, stop = page_range if page_range else (0, doc.page_count)
+        for page_number in range(start, min(stop, doc.page_count)):
+            page_text = doc[page_number].get_text("text")
+            if page_text:
+                yield page_number + 1, page_text
+
+def extract_text_from_pdf(pdf_path: str, page_range: Optional[Tuple[int, int]] = None) -> Optional[str]:
     """
-    Mengekstrak teks dari file PDF menggunakan PyMuPDF (fitz).
+    Mengekstrak seluruh teks dari file PDF menggunakan PyMuPDF (fitz).
     
     Args:
         pdf_path (str): Path ke file PDF.
+        page_range (Tuple[int, int] | None): Rentang halaman [awal, akhir) yang diekstrak.
+            Jika None, seluruh halaman diekstrak.
     
     Returns:
-        str | None: Seluruh teks dari PDF, atau None jika gagal.
+        str | None: Teks dari PDF (atau dari rentang halaman), atau None jika gagal.
     """
     try:
         if not os.path.exists(pdf_path):
             logging.error(f"File tidak ditemukan di: {pdf_path}")
             return None
-        doc = fitz.open(pdf_path)
-        text = ""
-        for page in doc:
-            page_text = page.get_text("text")
-            if page_text:
-                text += page_text
-        doc.close()
+        text = "".join(page_text for _, page_text in iter_pdf_pages(pdf_path, page_range))
+        if page_range is not None:
+            # Rentang halaman boleh kosong; validasi dilakukan setelah semua rentang digabung
+            return text
         if not text.strip():
             logging.warning("Dokumen PDF tampaknya kosong atau tidak berisi teks yang dapat diekstrak.")
             return None
@@ -52,117 +254,418 @@ def extract_text_from_pdf(pdf_path: str) -> Optional[str]:
         logging.error(f"Error saat memproses PDF: {e}")
         return None
 
-def preprocess_text(text: str) -> str:
+def normalize_text(text: str) -> str:
     """
-    Membersihkan teks mentah dari hasil ekstraksi PDF.
-    - Menghapus header/footer, footnote
-    - Menghapus referensi hukum yang berulang
-    - Mengubah ke lowercase, menghapus spasi berlebih, dll.
-    - Menghapus stopwords
+    Normalisasi teks untuk indexing: spasi berlebih dihapus, lowercase,
+    dan karakter non-alfanumerik (kecuali titik dan koma) dibuang.
     
     Args:
         text (str): Teks mentah.
     
     Returns:
-        str: Teks yang telah dibersihkan.
+        str: Teks yang telah dinormalisasi.
+    """
+    text = WHITESPACE_PATTERN.sub(' ', text).strip()
+    return NON_ALNUM_PATTERN.sub('', text.lower())
+
+def truncate_at_explanation(page_text: str) -> Tuple[str, bool]:
     """
-    # Menghapus header/footer dan URL
-    text = re.sub(r'WALI KOTA BANDUNG.*?\n', '', text, flags=re.DOTALL)
-    text = re.sub(r'https://jdih\.bandung\.go\.id/.*?\n', '', text)
-    text = re.sub(r'LEMBARAN DAERAH KOTA BANDUNG.*', '', text)
-    text = re.sub(r'Penjelasan\nAtas.*', '', text, flags=re.DOTALL) # Menghapus penjelasan di akhir dokumen
+    Memotong teks halaman mulai dari bagian penjelasan di akhir dokumen.
     
-    # Menghilangkan baris kosong dan spasi berlebih
-    text = re.sub(r'\n\s*\n', '\n', text)
-    text = re.sub(r'\s+', ' ', text).strip()
+    Returns:
+        Tuple[str, bool]: Teks halaman (terpotong jika perlu), dan True jika bagian
+        penjelasan ditemukan (halaman berikutnya tidak perlu diproses).
+    """
+    explanation = EXPLANATION_PATTERN.search(page_text)
+    if explanation:
+        return page_text[:explanation.start()], True
+    return page_text, False
+
+def iter_document_pages(pages: Iterable[Page]) -> Iterator[Page]:
+    """
+    Meneruskan halaman mentah hingga bagian penjelasan (eksklusif).
     
-    # Mengubah ke lowercase dan menghapus karakter non-alfanumerik
-    text = text.lower()
-    text = re.sub(r'[^a-z0-9\s.,]', '', text)
+    Judul penjelasan juga dicari melintasi batas halaman (akhir halaman sebelumnya
+    digabung dengan awal halaman berikutnya), sehingga setiap halaman baru diteruskan
+    setelah halaman berikutnya dibaca.
     
+    Args:
+        pages (Iterable[Page]): (nomor halaman, teks mentah) per halaman.
+    
+    Yields:
+        Page: Halaman mentah yang merupakan bagian batang tubuh dokumen.
+    """
+    previous: Optional[Page] = None
+    for page_number, page_text in pages:
+        if previous is not None:
+            previous_number, previous_text = previous
+            tail_start = max(len(previous_text) - EXPLANATION_CARRY_CHARS, 0)
+            explanation = EXPLANATION_PATTERN.search(previous_text[tail_start:] + page_text[:EXPLANATION_CARRY_CHARS])
+            if explanation and tail_start + explanation.start() < len(previous_text):
+                yield previous_number, previous_text[:tail_start + explanation.start()]
+                return
+            yield previous
+        page_text, reached_explanation = truncate_at_explanation(page_text)
+        if reached_explanation:
+            yield page_number, page_text
+            return
+        previous = page_number, page_text
+    if previous is not None:
+        yield previous
+
+def clean_page(page_text: str) -> Tuple[str, bool]:
+    """
+    Membersihkan teks mentah satu halaman hasil ekstraksi PDF.
+    - Menghapus header/footer dan URL
+    - Memotong teks mulai dari bagian penjelasan di akhir dokumen
+    - Mengubah ke lowercase, menghapus spasi berlebih dan karakter non-alfanumerik
+    
+    Args:
+        page_text (str): Teks mentah satu halaman.
+    
+    Returns:
+        Tuple[str, bool]: Teks yang telah dibersihkan, dan True jika bagian
+        penjelasan ditemukan (halaman berikutnya tidak perlu diproses).
+    """
+    text = HEADER_FOOTER_PATTERN.sub('', page_text)
+    text, reached_explanation = truncate_at_explanation(text)
+    text = normalize_text(text)
+
     # Menghapus stopwords (opsional, dapat diaktifkan/dinonaktifkan)
     # tokens = word_tokenize(text)
     # filtered_tokens = [word for word in tokens if word not in stopwords_id]
     # text = ' '.join(filtered_tokens)
+
+    return text, reached_explanation
+
+def iter_clean_pages(pages: Iterable[Page]) -> Iterator[Page]:
+    """
+    Tahap pembersihan streaming: membersihkan halaman satu per satu.
+    
+    Args:
+        pages (Iterable[Page]): (nomor halaman, teks mentah) per halaman.
     
-    return text
+    Yields:
+        Page: (nomor halaman, teks yang telah dibersihkan); halaman kosong dilewati.
+    """
+    # Header/footer dihapus lebih dulu seperti clean_page, lalu dipotong di bagian penjelasan
+    pages = ((page_number, HEADER_FOOTER_PATTERN.sub('', page_text)) for page_number, page_text in pages)
+    for page_number, page_text in iter_document_pages(pages):
+        cleaned_text = normalize_text(page_text)
+        if cleaned_text:
+            yield page_number, cleaned_text
 
-def chunk_text_by_structure(text: str) -> List[str]:
+def preprocess_text(text: str) -> str:
     """
-    Membagi teks menjadi chunks berdasarkan struktur dokumen (Bab, Pasal).
+    Membersihkan teks mentah dari hasil ekstraksi PDF.
+    Versi non-streaming dari iter_clean_pages untuk teks yang sudah utuh di memori.
     
     Args:
-        text (str): Teks yang sudah dibersihkan.
+        text (str): Teks mentah.
     
     Returns:
-        List[str]: List berisi potongan teks (chunk) per struktur.
+        str: Teks yang telah dibersihkan.
+    """
+    return ' '.join(page_text for _, page_text in iter_clean_pages([(1, text)]))
+
+def _roman_to_int(numeral: str) -> int:
+    """Mengonversi angka Romawi (mis. 'XIV') menjadi integer; -1 jika tidak valid."""
+    values = {'i': 1, 'v': 5, 'x': 10, 'l': 50, 'c': 100, 'd': 500, 'm': 1000}
+    numeral = numeral.lower()
+    total = 0
+    for i, char in enumerate(numeral):
+        if char not in values:
+            return -1
+        value = values[char]
+        if i + 1 < len(numeral) and values.get(numeral[i + 1], 0) > value:
+            total -= value
+        else:
+            total += value
+    return total if numeral else -1
+
+def _is_next_number(number: int, current: int) -> bool:
+    """
+    True jika number adalah nomor judul berikutnya yang wajar setelah current.
+    Satu nomor boleh terlewat (mis. judul terpotong saat ekstraksi); untuk celah yang
+    lebih besar, iter_line_chunks menyinkronkan ulang penomoran Pasal.
+    """
+    return max(current, 0) < number <= max(current, 0) + 2
+
+class _ChunkPacker:
+    """
+    Menyusun chunk dari potongan-potongan teks (mis. ayat) dengan batas token.
+    
+    Potongan dimasukkan secara berurutan dan digabung secara greedy selama total
+    token (termasuk prefix konteks) tidak melebihi max_tokens. Potongan yang
+    sendirinya melebihi batas dipecah per jendela token dengan overlap. Chunk
+    dikeluarkan begitu penuh sehingga memori hanya menampung satu chunk.
     """
-    # Pola regex untuk menemukan judul Bab dan Pasal
-    structure_pattern = r'(BAB\s+[IVXLCDM]+\s+|Pasal\s+\d+)'
+
+    def __init__(self, max_tokens: int, overlap: int):
+        self.max_tokens = max_tokens
+        self.overlap = overlap
+        self.prefix: List[str] = []
+        self.bab = -1
+        self.pasal = -1
+        # Token (kata) dari potongan yang sudah lengkap dan potongan yang sedang diisi,
+        # masing-masing dengan halaman serta offset karakter baris asalnya
+        self.done: List[Tuple[str, int, int, int]] = []
+        self.piece: List[Tuple[str, int, int, int]] = []
+
+    def set_context(self, prefix: List[str], bab: int, pasal: int):
+        """Mengatur prefix konteks (mis. judul BAB dan nomor Pasal) untuk unit berikutnya."""
+        self.prefix = prefix[:max(self.max_tokens // 4, 1)]
+        self.bab, self.pasal = bab, pasal
+
+    @property
+    def budget(self) -> int:
+        return max(self.max_tokens - len(self.prefix), 1)
+
+    def add_line(self, words: List[str], page_number: int, char_start: int, char_end: int) -> Iterator[ChunkRecord]:
+        """Menambahkan satu baris ke potongan yang sedang diisi."""
+        self.piece.extend((word, page_number, char_start, char_end) for word in words)
+        if len(self.done) + len(self.piece) <= self.budget:
+            return
+        # Potongan baru tidak muat: keluarkan potongan-potongan sebelumnya sebagai satu chunk
+        if self.done:
+            yield self._make_record(self.done)
+            self.done = []
+        # Potongan tunggal melebihi batas: pecah per jendela token dengan overlap
+        step = max(self.budget - self.overlap, 1)
+        while len(self.piece) > self.budget:
+            yield self._make_record(self.piece[:self.budget])
+            del self.piece[:step]
+
+    def end_piece(self):
+        """Menandai batas potongan (mis. awal ayat baru)."""
+        self.done.extend(self.piece)
+        self.piece = []
+
+    def flush(self) -> Iterator[ChunkRecord]:
+        """Mengeluarkan sisa token sebagai chunk terakhir dari unit saat ini."""
+        self.end_piece()
+        if self.done:
+            yield self._make_record(self.done)
+        self.done = []
+
+    def _make_record(self, words: List[Tuple[str, int, int, int]]) -> ChunkRecord:
+        tokens = self.prefix + [word for word, _, _, _ in words]
+        return ChunkRecord(
+            ' '.join(tokens), words[0][1], words[-1][1], self.bab, self.pasal, words[0][2], words[-1][3], len(tokens),
+        )
+
+def iter_document_lines(pages: Iterable[Page]) -> Iterator[DocumentLine]:
+    """
+    Tahap pembersihan regex: memecah halaman mentah menjadi baris, lalu menghapus
+    header/footer, nomor halaman, dan penanda lanjutan di kaki halaman.
     
-    # Memisahkan teks berdasarkan pola tersebut
-    parts = re.split(structure_pattern, text)
+    Args:
+        pages (Iterable[Page]): Halaman mentah berurutan (lihat iter_document_pages).
     
-    chunks = []
-    current_chunk_title = ""
-    current_chunk_content = ""
+    Yields:
+        DocumentLine: Baris yang tersisa (huruf asli, belum dinormalisasi) beserta
+        offset karakternya di teks mentah dokumen.
+    """
+    page_offset = 0
+    for page_number, page_text in pages:
+        line_offset = page_offset
+        for raw_line in page_text.splitlines(keepends=True):
+            line_start, line_end = line_offset, line_offset + len(raw_line)
+            line_offset = line_end
+            line = HEADER_FOOTER_PATTERN.sub('', raw_line).strip()
+            if line and not NOISE_LINE_PATTERN.match(line):
+                yield page_number, line, line_start, line_end
+
+        # Offset karakter mengacu pada teks mentah dokumen (halaman digabung tanpa pemisah)
+        page_offset += len(page_text)
+
+def iter_structural_chunks(pages: Iterable[Page], max_tokens: int = None,
+                           overlap: int = DEFAULT_CHUNK_OVERLAP) -> Iterator[ChunkRecord]:
+    """
+    Chunker hierarkis BAB/Pasal/ayat untuk halaman mentah (lihat iter_line_chunks).
     
-    for part in parts:
-        if re.match(structure_pattern, part):
-            # Jika ini judul baru, simpan chunk sebelumnya jika ada
-            if current_chunk_content:
-                chunks.append(f"{current_chunk_title.strip()} {current_chunk_content.strip()}")
-            current_chunk_title = part
-            current_chunk_content = ""
-        else:
-            current_chunk_content += part
+    Args:
+        pages (Iterable[Page]): Halaman mentah berurutan (lihat iter_document_pages).
+        max_tokens (int): Batas token (kata) per chunk, termasuk prefix konteks.
+        overlap (int): Overlap token saat satu potongan harus dipecah per jendela.
     
-    # Simpan chunk terakhir
-    if current_chunk_content:
-        chunks.append(f"{current_chunk_title.strip()} {current_chunk_content.strip()}")
+    Yields:
+        ChunkRecord: Chunk yang sudah dinormalisasi beserta metadata lokasinya.
+    """
+    return iter_line_chunks(iter_document_lines(pages), max_tokens, overlap)
 
-    # Jika struktur tidak terdeteksi, fallback ke chunking berbasis token
-    if len(chunks) < 2:
-        logging.warning("Struktur dokumen tidak terdeteksi. Menggunakan chunking berbasis token.")
-        return chunk_text_by_token(text, chunk_size=300, overlap=50)
-        
-    return chunks
+def iter_line_chunks(lines: Iterable[DocumentLine], max_tokens: int = None,
+                     overlap: int = DEFAULT_CHUNK_OVERLAP) -> Iterator[ChunkRecord]:
+    """
+    Chunker hierarkis BAB/Pasal/ayat yang bekerja pada teks mentah (sebelum normalisasi).
+    
+    Judul dikenali per baris dengan huruf aslinya ("BAB II", "Pasal 12", "Bagian
+    Kedua", "(3)") dan penomoran yang berurutan, sehingga rujukan di dalam kalimat
+    tidak memicu pemisahan. Jika beberapa judul Pasal berturut-turut hilang saat
+    ekstraksi, penomoran disinkronkan ulang pada judul Pasal maju pertama setelah BAB
+    baru, atau pada judul yang melanjutkan judul maju di luar urutan sebelumnya
+    (mis. "Pasal 9" setelah "Pasal 8" yang ditolak). Setiap Pasal menjadi satu unit; unit yang melebihi
+    max_tokens dipecah pada batas ayat atau butir daftar, lalu per jendela token
+    jika satu ayat/butir pun masih terlalu panjang. Setiap chunk diawali prefix konteks (judul BAB dan
+    nomor Pasal). Teks sebelum BAB/Pasal pertama (judul, konsiderans) dan dokumen
+    tanpa struktur dipecah per jendela token dengan batas yang sama.
+    
+    Args:
+        lines (Iterable[DocumentLine]): Baris yang sudah dibersihkan (lihat iter_document_lines).
+        max_tokens (int): Batas token (kata) per chunk, termasuk prefix konteks.
+        overlap (int): Overlap token saat satu potongan harus dipecah per jendela.
+    
+    Yields:
+        ChunkRecord: Chunk yang sudah dinormalisasi beserta metadata lokasinya.
+    """
+    max_tokens = max_tokens or DEFAULT_MAX_CHUNK_TOKENS
+    packer = _ChunkPacker(max_tokens, min(overlap, max_tokens // 2))
+    current_bab, current_pasal, current_ayat = -1, -1, 0
+    # Sinkronisasi ulang penomoran Pasal: judul maju di luar urutan terakhir yang ditolak,
+    # dan apakah BAB baru dimulai sejak Pasal terakhir
+    skipped_pasal, bab_started = -1, False
+    bab_title: List[str] = []
+    section_title: List[str] = []
+    # Baris judul BAB/Bagian beserta judulnya dikumpulkan sampai Pasal berikutnya
+    collecting: Optional[str] = None
 
-def chunk_text_by_token(text: str, chunk_size: int = 300, overlap: int = 50) -> List[str]:
+    def start_pasal(number: int) -> Iterator[ChunkRecord]:
+        nonlocal current_pasal, current_ayat, collecting, section_title, skipped_pasal, bab_started
+        yield from packer.flush()
+        current_pasal, current_ayat, collecting = number, 0, None
+        skipped_pasal, bab_started = -1, False
+        prefix = bab_title + section_title + ['pasal', str(number)]
+        section_title = []
+        packer.set_context(prefix, current_bab, current_pasal)
+
+    for page_number, line, line_start, line_end in lines:
+        bab_match = BAB_HEADING_PATTERN.match(line)
+        pasal_match = PASAL_HEADING_PATTERN.match(line)
+        if bab_match and _is_next_number(_roman_to_int(bab_match.group(1)), current_bab):
+            yield from packer.flush()
+            current_bab = _roman_to_int(bab_match.group(1))
+            bab_title, section_title, collecting = normalize_text(line).split(), [], 'bab'
+            bab_started = True
+            packer.set_context(bab_title, current_bab, current_pasal)
+            continue
+        if pasal_match:
+            number = int(pasal_match.group(1))
+            # "Pasal 5A" (sisipan perubahan) mengikuti Pasal 5
+            inserted = pasal_match.group(2) and number == current_pasal
+            # Judul maju di luar urutan diterima sebagai Pasal pertama BAB baru, atau jika
+            # melanjutkan judul maju yang sebelumnya ditolak (beberapa judul hilang)
+            resync = number > current_pasal and (
+                bab_started or (skipped_pasal >= 0 and _is_next_number(number, skipped_pasal)))
+            if inserted or _is_next_number(number, current_pasal) or resync:
+                yield from start_pasal(number)
+                continue
+            if number > current_pasal:
+                skipped_pasal = number
+        if SECTION_HEADING_PATTERN.match(line) and current_pasal >= 0:
+            yield from packer.flush()
+            section_title, collecting = normalize_text(line).split(), 'section'
+            continue
+
+        words = normalize_text(line).split()
+        if not words:
+            continue
+        if collecting == 'bab' and len(bab_title) < TITLE_MAX_TOKENS:
+            # Judul BAB (mis. "KETENTUAN PIDANA") menjadi konteks semua Pasal di BAB tersebut
+            bab_title = bab_title + words
+            packer.set_context(bab_title, current_bab, current_pasal)
+            continue
+        if collecting == 'section' and len(section_title) < TITLE_MAX_TOKENS:
+            section_title = section_title + words
+            continue
+
+        ayat_match = AYAT_PATTERN.match(line)
+        if ayat_match and current_pasal >= 0 and int(ayat_match.group(1)) == current_ayat + 1:
+            current_ayat += 1
+            packer.end_piece()
+        elif ITEM_PATTERN.match(line):
+            packer.end_piece()
+        yield from packer.add_line(words, page_number, line_start, line_end)
+
+    yield from packer.flush()
+
+def chunk_text_by_structure(text: str, max_tokens: int = None) -> List[str]:
     """
-    Membagi teks panjang menjadi beberapa potongan (chunk) dengan overlap token.
-    Ini adalah metode fallback jika chunking struktural gagal.
+    Membagi teks mentah menjadi chunks berdasarkan struktur dokumen (BAB, Pasal, ayat).
     
     Args:
-        text (str): Teks yang ingin dipecah.
+        text (str): Teks mentah hasil ekstraksi (belum dinormalisasi).
+        max_tokens (int): Batas token per chunk.
     
     Returns:
-        List[str]: List berisi potongan teks (chunk).
+        List[str]: List berisi potongan teks (chunk) per struktur.
     """
+    return [record.text for record in iter_structural_chunks([(1, text)], max_tokens=max_tokens)]
+
+def _word_tokenize(text: str) -> List[str]:
+    """word_tokenize dengan unduhan otomatis resource 'punkt' jika belum tersedia."""
     try:
-        tokens = word_tokenize(text)
+        return word_tokenize(text)
     except LookupError:
         logging.warning("NLTK 'punkt' resource not found. Downloading...")
         nltk.download('punkt')
-        tokens = word_tokenize(text)
+        return word_tokenize(text)
+
+def iter_token_chunks(texts: Iterable[str], chunk_size: int = 300, overlap: int = 50) -> Iterator[str]:
+    """
+    Chunking streaming berbasis token NLTK dengan overlap.
     
-    chunks = []
+    Args:
+        texts (Iterable[str]): Potongan teks berurutan (mis. halaman yang sudah dibersihkan).
+        chunk_size (int): Jumlah token per chunk.
+        overlap (int): Jumlah token yang tumpang tindih antar chunk.
     
+    Yields:
+        str: Potongan teks (chunk).
+    """
     if chunk_size <= overlap:
         logging.error("chunk_size harus lebih besar dari overlap.")
-        return []
+        return
+
+    step = chunk_size - overlap
+    buffer: List[str] = []
+    for text in texts:
+        buffer.extend(_word_tokenize(text))
+        while len(buffer) >= chunk_size:
+            yield ' '.join(buffer[:chunk_size])
+            del buffer[:step]
 
-    for i in range(0, len(tokens), chunk_size - overlap):
-        chunk = ' '.join(tokens[i:i + chunk_size])
-        chunks.append(chunk)
-    return chunks
+    # Sisa token di akhir dokumen, dengan langkah yang sama seperti jendela sebelumnya
+    while buffer:
+        yield ' '.join(buffer[:chunk_size])
+        del buffer[:step]
 
-def create_tfidf_index(chunks: List[str]) -> Tuple[TfidfVectorizer, np.ndarray]:
+def chunk_text_by_token(text: str, chunk_size: int = 300, overlap: int = 50) -> List[str]:
+    """
+    Membagi teks panjang menjadi beberapa potongan (chunk) dengan overlap token.
+    Ini adalah metode fallback jika chunking struktural gagal.
+    
+    Args:
+        text (str): Teks yang ingin dipecah.
+    
+    Returns:
+        List[str]: List berisi potongan teks (chunk).
+    """
+    return list(iter_token_chunks([text], chunk_size=chunk_size, overlap=overlap))
+
+def create_tfidf_index(chunks: List[str], min_df: Union[int, float] = 1, max_df: Union[int, float] = 1.0,
+                       max_features: Optional[int] = None, digit_tokens: str = 'keep',
+                       dtype: str = 'float64') -> Tuple[TfidfVectorizer, np.ndarray]:
     """
     Membuat indeks TF-IDF dari daftar chunk teks.
     
     Args:
         chunks (List[str]): Potongan teks.
+        min_df (int | float): Term yang muncul di lebih sedikit chunk (jumlah, atau proporsi
+            jika float) dibuang dari vocabulary, mis. hapax dan artefak OCR.
+        max_df (int | float): Term yang muncul di lebih banyak chunk dari ini dibuang.
+        max_features (int | None): Batas ukuran vocabulary (term dengan frekuensi tertinggi).
+        digit_tokens (str): Kebijakan token berangka (lihat DIGIT_TOKEN_PATTERNS).
+        dtype (str): Tipe nilai matriks ('float64' atau 'float32').
     
     Returns:
         Tuple[vectorizer, matrix]: TF-IDF vectorizer dan matriksnya.
@@ -170,45 +673,629 @@ def create_tfidf_index(chunks: List[str]) -> Tuple[TfidfVectorizer, np.ndarray]:
     if not chunks:
         logging.warning("Tidak ada chunks untuk diindeks.")
         return None, None
-    vectorizer = TfidfVectorizer()
+    vectorizer = TfidfVectorizer(
+        min_df=min_df, max_df=max_df, max_features=max_features,
+        token_pattern=DIGIT_TOKEN_PATTERNS[digit_tokens], dtype=np.dtype(dtype).type,
+    )
     tfidf_matrix = vectorizer.fit_transform(chunks)
+    # Atribut cache ini berisi id() objek Python sehingga berbeda di setiap proses;
+    # dihapus agar file indeks yang diserialisasi deterministik antar-run.
+    if hasattr(vectorizer, '_stop_words_id'):
+        del vectorizer._stop_words_id
+    # Daftar term yang dipangkas min_df/max_df/max_features hanya untuk introspeksi dan
+    # bisa jauh lebih besar dari vocabulary; tidak perlu ikut diserialisasi.
+    if hasattr(vectorizer, 'stop_words_'):
+        del vectorizer.stop_words_
     return vectorizer, tfidf_matrix
 
-def analyze_chunks(chunks: List[str]):
+def create_bm25_index(chunks: List[str], vectorizer: TfidfVectorizer, k1: float = 1.5, b: float = 0.75) -> BM25Index:
+    """
+    Membuat inverted index BM25 dengan tokenisasi dan vocabulary yang sama dengan TF-IDF.
+    
+    Args:
+        chunks (List[str]): Potongan teks.
+        vectorizer (TfidfVectorizer): Vectorizer TF-IDF yang sudah di-fit.
+        k1 (float): Parameter saturasi frekuensi term BM25.
+        b (float): Parameter normalisasi panjang chunk BM25.
+    
+    Returns:
+        BM25Index: Indeks BM25 (kolom term = kolom matriks TF-IDF).
+    """
+    counter = CountVectorizer(vocabulary=vectorizer.vocabulary_, token_pattern=vectorizer.token_pattern,
+                              lowercase=vectorizer.lowercase)
+    return BM25Index.from_term_frequencies(counter.transform(chunks), k1, b)
+
+def create_chunk_embeddings(chunks: List[str], model_name: str = DEFAULT_EMBEDDING_MODEL,
+                            batch_size: int = DEFAULT_EMBEDDING_BATCH_SIZE) -> Optional[np.ndarray]:
+    """
+    Menghitung embedding dense ternormalisasi untuk setiap chunk (sekali saat ingest).
+    
+    Args:
+        chunks (List[str]): Potongan teks.
+        model_name (str): Nama model SentenceTransformer.
+        batch_size (int): Ukuran batch encoding.
+    
+    Returns:
+        np.ndarray | None: Embedding float16 (chunk x dimensi), atau None jika model gagal dimuat.
+    """
+    try:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(model_name)
+    except Exception as e:
+        logging.warning(f"Gagal memuat model embedding {model_name}: {e}. Indeks dibuat tanpa embedding.")
+        return None
+    embeddings = model.encode(chunks, batch_size=batch_size, normalize_embeddings=True,
+                              convert_to_numpy=True, show_progress_bar=False)
+    return np.asarray(embeddings, dtype=np.float16)
+
+def analyze_chunks(chunks: List[str], n_tokens: Optional[np.ndarray] = None) -> dict:
     """
     Menganalisis statistik dasar dari chunks yang dibuat.
     
     Args:
         chunks (List[str]): Potongan teks hasil pemrosesan.
+        n_tokens (np.ndarray | None): Jumlah token per chunk yang sudah dihitung saat
+            chunking (metadata 'n_tokens'). Jika None, dihitung dari teks chunk.
+    
+    Returns:
+        dict: Statistik token (total, rata-rata, minimum, maksimum).
     """
     if not chunks:
         logging.info("Tidak ada chunks untuk dianalisis.")
-        return
+        return {}
     
-    chunk_lengths = [len(word_tokenize(chunk)) for chunk in chunks]
-    if not chunk_lengths:
-        logging.info("Tidak ada chunks untuk dianalisis.")
-        return
-
-    avg_length = sum(chunk_lengths) / len(chunks)
+    if n_tokens is None:
+        n_tokens = np.array([len(chunk.split()) for chunk in chunks], dtype=np.int64)
+    token_stats = {
+        'total': int(n_tokens.sum()),
+        'mean': round(float(n_tokens.mean()), 2),
+        'min': int(n_tokens.min()),
+        'max': int(n_tokens.max()),
+    }
     
     logging.info("\n--- Analisis Chunks ---")
     logging.info(f"Total chunks: {len(chunks)}")
-    logging.info(f"Rata-rata token per chunk: {avg_length:.2f}")
+    logging.info(f"Rata-rata token per chunk: {token_stats['mean']:.2f} (min {token_stats['min']}, maks {token_stats['max']})")
     logging.info("\n3 Sample Chunk Pertama:")
     for i, chunk in enumerate(chunks[:3]):
-        logging.info(f"Chunk {i+1} (panjang {len(word_tokenize(chunk))} token):\n{chunk[:200]}...")
+        logging.info(f"Chunk {i+1} (panjang {n_tokens[i]} token):\n{chunk[:200]}...")
+    return token_stats
+
+def _utf8_size(text: str) -> int:
+    return len(text.encode('utf-8'))
+
+def chunk_document_pages(pdf_file: str, pages: Iterable[Page],
+                         max_tokens: int = DEFAULT_MAX_CHUNK_TOKENS,
+                         stats: Optional[PipelineStats] = None) -> Optional[dict]:
+    """
+    Menjalankan pembersihan dan chunking hierarkis untuk halaman-halaman mentah satu dokumen.
+    
+    Args:
+        pdf_file (str): Nama file PDF (untuk logging).
+        pages (Iterable[Page]): Halaman mentah (lihat iter_document_pages).
+        max_tokens (int): Batas token per chunk.
+        stats (PipelineStats | None): Statistik tahap sebelumnya (mis. ekstraksi) yang
+            dilanjutkan dengan tahap cleaning dan chunking.
+    
+    Returns:
+        dict | None: {'chunks': List[str], 'metadata': Dict[str, np.ndarray], 'stats': dict}
+        dengan metadata berupa array paralel (tanpa doc_id) dan statistik per tahap,
+        atau None jika dokumen harus dilewati.
+    """
+    stats = stats or PipelineStats()
+    lines = stats.timed('cleaning', iter_document_lines(pages), lambda line: _utf8_size(line[1]))
+    records = list(stats.timed('chunking', iter_line_chunks(lines, max_tokens), lambda record: _utf8_size(record.text)))
+    if not records:
+        logging.warning(f"Melewatkan file {pdf_file} karena tidak dapat mengekstrak teks.")
+        return None
+    metadata = {
+        field: np.array([getattr(record, field) for record in records], dtype=dtype)
+        for field, dtype in CHUNK_METADATA_DTYPES.items() if field != 'doc_id'
+    }
+    return {'chunks': [record.text for record in records], 'metadata': metadata, 'stats': stats.stages}
+
+def process_document(pdf_path: str, max_tokens: int = DEFAULT_MAX_CHUNK_TOKENS) -> Optional[dict]:
+    """
+    Pipeline streaming lengkap (ekstraksi -> chunking hierarkis -> normalisasi) untuk satu file PDF.
+    
+    Args:
+        pdf_path (str): Path ke file PDF.
+        max_tokens (int): Batas token per chunk.
+    
+    Returns:
+        dict | None: Chunks dan metadata dokumen (lihat chunk_document_pages),
+        atau None jika dokumen harus dilewati.
+    """
+    pdf_file = os.path.basename(pdf_path)
+    logging.info(f"Memproses file: {pdf_file}")
+
+    try:
+        # Halaman diekstrak satu per satu; struktur dikenali sebelum teks dinormalisasi
+        stats = PipelineStats()
+        pages = stats.timed('extraction', iter_pdf_pages(pdf_path), lambda page: _utf8_size(page[1]))
+        return chunk_document_pages(pdf_file, iter_document_pages(pages), max_tokens, stats)
+    except Exception as e:
+        logging.error(f"Error saat memproses PDF {pdf_file}: {e}")
+        return None
+
+def extract_page_range(pdf_path: str, page_range: Tuple[int, int]) -> Tuple[List[Page], bool, PipelineStats]:
+    """
+    Mengekstrak satu rentang halaman (task worker ekstraksi paralel).
+    
+    Args:
+        pdf_path (str): Path ke file PDF.
+        page_range (Tuple[int, int]): Rentang halaman [awal, akhir).
+    
+    Returns:
+        Tuple[List[Page], bool, PipelineStats]: Halaman mentah (terpotong di bagian penjelasan),
+        True jika bagian penjelasan ditemukan di rentang ini, dan statistik ekstraksi.
+    """
+    stats = PipelineStats()
+    pages = []
+    for page_number, page_text in stats.timed('extraction', iter_pdf_pages(pdf_path, page_range), lambda page: _utf8_size(page[1])):
+        page_text, reached_explanation = truncate_at_explanation(page_text)
+        pages.append((page_number, page_text))
+        if reached_explanation:
+            return pages, True, stats
+    return pages, False, stats
+
+def _split_page_ranges(page_count: int, pages_per_task: int) -> List[Tuple[int, int]]:
+    """Membagi halaman [0, page_count) menjadi rentang berukuran maksimal pages_per_task."""
+    return [(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)]
+
+def process_documents_parallel(pdf_paths: List[str], workers: int,
+                               pages_per_task: int = DEFAULT_PAGES_PER_TASK,
+                               max_tokens: int = DEFAULT_MAX_CHUNK_TOKENS) -> List[Optional[dict]]:
+    """
+    Memproses banyak PDF secara paralel menggunakan process pool.
+    
+    Dokumen kecil diproses utuh dalam satu task. Dokumen besar (lebih dari
+    pages_per_task halaman) diekstrak per rentang halaman secara paralel, lalu
+    halamannya digabung sesuai urutan sebelum chunking, sehingga hasilnya
+    identik dengan pemrosesan serial.
+    
+    Args:
+        pdf_paths (List[str]): Daftar path PDF, dalam urutan yang diinginkan.
+        workers (int): Jumlah proses worker.
+        pages_per_task (int): Batas halaman per task ekstraksi.
+        max_tokens (int): Batas token per chunk.
+    
+    Returns:
+        List[dict | None]: Hasil process_document per dokumen, urutannya sama dengan pdf_paths.
+    """
+    results: List[Optional[dict]] = [None] * len(pdf_paths)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        document_futures = {}
+        range_futures = {}
+        for i, pdf_path in enumerate(pdf_paths):
+            page_count = count_pdf_pages(pdf_path)
+            if page_count > pages_per_task:
+                logging.info(f"Memproses file: {os.path.basename(pdf_path)} ({page_count} halaman, dipecah per {pages_per_task} halaman)")
+                range_futures[i] = [
+                    executor.submit(extract_page_range, pdf_path, page_range)
+                    for page_range in _split_page_ranges(page_count, pages_per_task)
+                ]
+            else:
+                document_futures[i] = executor.submit(process_document, pdf_path, max_tokens)
+
+        # Gabungkan halaman per rentang sesuai urutan (berhenti di bagian penjelasan), lalu lanjutkan chunking
+        for i, futures in range_futures.items():
+            pages: List[Page] = []
+            stats = PipelineStats()
+            try:
+                for future in futures:
+                    range_pages, reached_explanation, range_stats = future.result()
+                    pages.extend(range_pages)
+                    stats.merge(range_stats)
+                    if reached_explanation:
+                        break
+            except Exception as e:
+                logging.error(f"Error saat memproses PDF {os.path.basename(pdf_paths[i])}: {e}")
+                continue
+            # Judul penjelasan yang terpotong di batas halaman (juga antar-rentang) dipotong di sini
+            pages = list(iter_document_pages(pages))
+            document_futures[i] = executor.submit(chunk_document_pages, os.path.basename(pdf_paths[i]), pages, max_tokens, stats)
+
+        # Kegagalan satu dokumen (mis. worker mati) hanya melewatkan dokumen tersebut
+        for i, future in document_futures.items():
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                logging.error(f"Error saat memproses PDF {os.path.basename(pdf_paths[i])}: {e}")
+
+    return results
+
+def compute_file_hash(file_path: str, block_size: int = 1 << 20) -> str:
+    """
+    Menghitung hash SHA-256 dari isi sebuah file.
+    
+    Args:
+        file_path (str): Path ke file.
+        block_size (int): Ukuran blok baca dalam byte.
+    
+    Returns:
+        str: Hash SHA-256 dalam format heksadesimal.
+    """
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+def default_manifest_path(output_path: str) -> str:
+    """Lokasi default manifest, diletakkan di samping output (mis. data/perda_index_manifest.pkl)."""
+    return f"{os.path.splitext(output_path.rstrip(os.sep))[0]}_manifest.pkl"
+
+def default_report_path(output_path: str) -> str:
+    """Lokasi default laporan build, diletakkan di samping output (mis. data/perda_index_report.json)."""
+    return f"{os.path.splitext(output_path.rstrip(os.sep))[0]}_report.json"
+
+def _path_size(path: str) -> int:
+    """Ukuran file, atau total ukuran isi direktori, dalam byte."""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+def _summarize_stage(stage: str, entry: Dict[str, float]) -> dict:
+    """Melengkapi statistik satu tahap dengan throughput (item/detik dan MB/detik)."""
+    seconds = entry['seconds']
+    return {
+        'seconds': round(seconds, 4),
+        'items': int(entry['items']),
+        'unit': STAGE_ITEM_UNITS.get(stage, 'items'),
+        'bytes': int(entry['bytes']),
+        'items_per_sec': round(entry['items'] / seconds, 2) if seconds > 0 else None,
+        'mb_per_sec': round(entry['bytes'] / seconds / 1e6, 3) if seconds > 0 else None,
+    }
+
+def build_report(pdf_files: List[str], documents: Dict[str, dict], processed_files: List[str],
+                 build_stats: PipelineStats, wall_seconds: float, token_stats: dict, settings: dict) -> dict:
+    """
+    Menyusun laporan build: waktu, jumlah item, byte, dan throughput per tahap dan per PDF.
+    
+    Waktu tahap per dokumen adalah waktu kerja (dijumlahkan antar-worker jika paralel),
+    sedangkan wall_seconds adalah waktu total build.
+    
+    Args:
+        pdf_files (List[str]): Semua dokumen di indeks.
+        documents (Dict[str, dict]): Entri manifest per file (berisi 'stats' hasil pemrosesan).
+        processed_files (List[str]): Dokumen yang diproses pada build ini (sisanya dari cache).
+        build_stats (PipelineStats): Statistik tahap global (hashing, deduplikasi, vectorizing, serialisasi).
+        wall_seconds (float): Waktu total build.
+        token_stats (dict): Statistik token chunks (lihat analyze_chunks).
+        settings (dict): Pengaturan build.
+    
+    Returns:
+        dict: Laporan yang dapat diserialisasi ke JSON.
+    """
+    total_stats = PipelineStats()
+    total_stats.merge(build_stats)
+    processed = set(processed_files)
+    document_reports = {}
+    for pdf_file in pdf_files:
+        entry = documents[pdf_file]
+        stages = entry.get('stats') or {}
+        if pdf_file in processed:
+            for stage, stage_entry in stages.items():
+                total_stats.add(stage, stage_entry['seconds'], stage_entry['items'], stage_entry['bytes'])
+        seconds = sum(stage_entry['seconds'] for stage_entry in stages.values())
+        pages = int(stages.get('extraction', {}).get('items', 0))
+        document_reports[pdf_file] = {
+            'cached': pdf_file not in processed,
+            'file_bytes': entry.get('size', 0),
+            'pages': pages,
+            'chunks': len(entry.get('chunks') or []),
+            'tokens': int(entry['metadata']['n_tokens'].sum()) if entry.get('metadata') else 0,
+            'seconds': round(seconds, 4),
+            'pages_per_sec': round(pages / seconds, 2) if seconds > 0 else None,
+            'stages': {stage: _summarize_stage(stage, stage_entry) for stage, stage_entry in stages.items()},
+        }
+
+    stage_order = [stage for stage in STAGE_ITEM_UNITS if stage in total_stats.stages]
+    return {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'settings': settings,
+        'wall_seconds': round(wall_seconds, 4),
+        'documents_total': len(pdf_files),
+        'documents_processed': len(processed_files),
+        'tokens': token_stats,
+        'stages': {stage: _summarize_stage(stage, total_stats.stages[stage]) for stage in stage_order},
+        'documents': document_reports,
+    }
+
+def save_report(report_path: str, report: dict):
+    """
+    Menyimpan laporan build sebagai JSON dan mencatat tahap serta dokumen paling lambat.
+    
+    Args:
+        report_path (str): Path file laporan.
+        report (dict): Laporan dari build_report.
+    """
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    if report['stages']:
+        slowest_stage = max(report['stages'], key=lambda stage: report['stages'][stage]['seconds'])
+        logging.info(f"Tahap paling lambat: {slowest_stage} ({report['stages'][slowest_stage]['seconds']:.2f} detik).")
+    processed = {name: doc for name, doc in report['documents'].items() if not doc['cached']}
+    if processed:
+        slowest_document = max(processed, key=lambda name: processed[name]['seconds'])
+        logging.info(f"Dokumen paling lambat: {slowest_document} ({processed[slowest_document]['seconds']:.2f} detik).")
+    logging.info(f"Laporan build disimpan ke {report_path}")
+
+def load_manifest(manifest_path: str, settings: Optional[dict] = None) -> Tuple[Dict[str, dict], Optional[dict]]:
+    """
+    Memuat manifest indeks inkremental.
+    
+    Manifest memetakan nama file PDF ke hash kontennya beserta chunks hasil
+    pemrosesan terakhir, dan menyimpan signature build (opsi tingkat indeks) dari
+    indeks yang terakhir ditulis. Manifest dengan versi atau pengaturan chunking berbeda,
+    atau yang gagal dimuat, diabaikan sehingga semua dokumen diproses ulang.
+    
+    Args:
+        manifest_path (str): Path ke file manifest.
+        settings (dict | None): Pengaturan pemrosesan yang memengaruhi hasil chunks.
+    
+    Returns:
+        Tuple[Dict[str, dict], dict | None]: Entri manifest per nama file PDF dan signature
+        build indeks terakhir (None jika tidak ada).
+    """
+    if not os.path.exists(manifest_path):
+        return {}, None
+    try:
+        manifest = joblib.load(manifest_path)
+    except Exception as e:
+        logging.warning(f"Gagal memuat manifest {manifest_path}: {e}. Semua dokumen akan diproses ulang.")
+        return {}, None
+    if manifest.get('version') != MANIFEST_VERSION:
+        logging.info("Versi manifest berbeda. Semua dokumen akan diproses ulang.")
+        return {}, None
+    if manifest.get('settings') != (settings or {}):
+        logging.info("Pengaturan chunking berubah. Semua dokumen akan diproses ulang.")
+        return {}, None
+    return manifest.get('documents', {}), manifest.get('index_settings')
+
+def save_manifest(manifest_path: str, documents: Dict[str, dict], settings: Optional[dict] = None,
+                  index_settings: Optional[dict] = None):
+    """
+    Menyimpan manifest indeks inkremental.
+    
+    Args:
+        manifest_path (str): Path ke file manifest.
+        documents (Dict[str, dict]): Entri manifest per nama file PDF.
+        settings (dict | None): Pengaturan pemrosesan yang memengaruhi hasil chunks.
+        index_settings (dict | None): Signature build, yaitu opsi yang hanya memengaruhi
+            indeks (vocabulary, dtype, dsb.), bukan chunks per dokumen.
+    """
+    joblib.dump({'version': MANIFEST_VERSION, 'settings': settings or {}, 'index_settings': index_settings,
+                 'documents': documents}, manifest_path)
+
+def build_signature(args: argparse.Namespace) -> dict:
+    """
+    Signature build: semua opsi tingkat indeks. Jika berbeda dari manifest, indeks ditulis
+    ulang dari chunks yang di-cache meskipun tidak ada dokumen yang berubah.
+    """
+    return {
+        'min_df': args.min_df,
+        'max_df': args.max_df,
+        'max_features': args.max_features,
+        'digit_tokens': args.digit_tokens,
+        'dtype': args.dtype,
+        'dedup_threshold': None if args.no_dedup else args.dedup_threshold,
+        'bm25': None if args.no_bm25 else {'k1': args.bm25_k1, 'b': args.bm25_b},
+        # main menggantinya dengan None jika embedding gagal dibuat, agar build berikutnya mencoba lagi
+        'embedding_model': args.embedding_model if args.embeddings else None,
+        'ann': {'lists': args.ann_lists, 'subquantizers': args.ann_subquantizers} if args.ann else None,
+        'shards': args.shards,
+    }
+
+def list_pdf_files(pdf_dir: str) -> List[str]:
+    """
+    Mencari semua file PDF di pdf_dir, termasuk di subdirektorinya (mis. reference/ yang
+    berisi Perda Kota Bandung dan reference/nasional/ untuk peraturan nasional).
+
+    Args:
+        pdf_dir (str): Direktori input.
+
+    Returns:
+        List[str]: Path relatif terhadap pdf_dir dengan pemisah '/', terurut agar hasil
+        indeks deterministik (serial maupun paralel). Path ini menjadi nama dokumen di indeks.
+    """
+    pdf_files = []
+    for root, _, files in os.walk(pdf_dir):
+        for file_name in files:
+            if file_name.lower().endswith('.pdf'):
+                relative_path = os.path.relpath(os.path.join(root, file_name), pdf_dir)
+                pdf_files.append(relative_path.replace(os.sep, '/'))
+    return sorted(pdf_files)
+
+def _file_fingerprint(pdf_path: str, cached_entry: Optional[dict]) -> Tuple[str, int, int]:
+    """
+    Mengembalikan (hash, ukuran, mtime_ns) file. Hash dari manifest dipakai ulang
+    jika ukuran dan mtime tidak berubah sehingga file besar tidak perlu dibaca ulang.
+    """
+    stat = os.stat(pdf_path)
+    if cached_entry and cached_entry.get('size') == stat.st_size and cached_entry.get('mtime_ns') == stat.st_mtime_ns:
+        return cached_entry['sha256'], stat.st_size, stat.st_mtime_ns
+    return compute_file_hash(pdf_path), stat.st_size, stat.st_mtime_ns
+
+def merge_documents(pdf_files: List[str], documents: Dict[str, dict]) -> Tuple[List[str], Dict[str, np.ndarray]]:
+    """
+    Menggabungkan chunks dan metadata per dokumen menjadi daftar chunk global.
+    
+    Args:
+        pdf_files (List[str]): Nama file sesuai urutan indeks; posisinya menjadi doc_id.
+        documents (Dict[str, dict]): Entri manifest per file (berisi 'chunks' dan 'metadata').
+    
+    Returns:
+        Tuple[List[str], Dict[str, np.ndarray]]: Semua chunks dan array metadata paralel.
+    """
+    all_chunks: List[str] = []
+    metadata_parts: Dict[str, List[np.ndarray]] = {field: [] for field in CHUNK_METADATA_DTYPES}
+    for doc_id, pdf_file in enumerate(pdf_files):
+        entry = documents[pdf_file]
+        if not entry['chunks']:
+            continue
+        all_chunks.extend(entry['chunks'])
+        metadata_parts['doc_id'].append(np.full(len(entry['chunks']), doc_id, dtype=CHUNK_METADATA_DTYPES['doc_id']))
+        for field, values in entry['metadata'].items():
+            metadata_parts[field].append(values)
+
+    chunk_metadata = {
+        field: np.concatenate(parts) if parts else np.empty(0, dtype=CHUNK_METADATA_DTYPES[field])
+        for field, parts in metadata_parts.items()
+    }
+    return all_chunks, chunk_metadata
+
+def _shingle_hashes(text: str, size: int = SHINGLE_SIZE) -> np.ndarray:
+    """Hash CRC32 dari shingle kata (n-gram kata) unik sebuah chunk."""
+    words = text.split()
+    shingles = {' '.join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+    return np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+
+def compute_minhash_signatures(shingle_sets: List[np.ndarray], num_perm: int = MINHASH_PERMUTATIONS,
+                               seed: int = MINHASH_SEED) -> np.ndarray:
+    """
+    Menghitung signature MinHash untuk setiap himpunan hash shingle.
+    
+    Args:
+        shingle_sets (List[np.ndarray]): Hash shingle per chunk (lihat _shingle_hashes).
+        num_perm (int): Jumlah fungsi hash (panjang signature).
+        seed (int): Seed koefisien hash agar signature deterministik antar-run.
+    
+    Returns:
+        np.ndarray: Matriks signature berukuran (jumlah chunk, num_perm).
+    """
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, MINHASH_PRIME, size=num_perm).astype(np.uint64)
+    b = rng.randint(0, MINHASH_PRIME, size=num_perm).astype(np.uint64)
+    signatures = np.full((len(shingle_sets), num_perm), MINHASH_PRIME, dtype=np.uint64)
+    for i, hashes in enumerate(shingle_sets):
+        if len(hashes):
+            # a, x < 2^31 sehingga a * x + b tidak overflow pada uint64
+            values = (np.outer(hashes % MINHASH_PRIME, a) + b) % MINHASH_PRIME
+            signatures[i] = values.min(axis=0)
+    return signatures
+
+def find_near_duplicates(chunks: List[str], threshold: float = DEFAULT_DEDUP_THRESHOLD,
+                         num_perm: int = MINHASH_PERMUTATIONS, bands: int = LSH_BANDS) -> np.ndarray:
+    """
+    Mengelompokkan chunk yang hampir sama dengan MinHash/LSH.
+    
+    Pasangan kandidat dari bucket LSH diverifikasi dengan Jaccard eksak atas shingle,
+    lalu setiap chunk ditempelkan ke representatif pertama (urutan indeks) yang cukup
+    mirip, sehingga setiap duplikat dijamin mirip dengan representatifnya sendiri.
+    
+    Args:
+        chunks (List[str]): Teks chunk.
+        threshold (float): Jaccard minimum agar dianggap duplikat.
+        num_perm (int): Panjang signature MinHash.
+        bands (int): Jumlah band LSH (num_perm harus habis dibagi bands).
+    
+    Returns:
+        np.ndarray: Indeks representatif untuk setiap chunk (bernilai dirinya sendiri jika unik).
+    """
+    rows = num_perm // bands
+    shingle_sets = [_shingle_hashes(chunk) for chunk in chunks]
+    signatures = compute_minhash_signatures(shingle_sets, num_perm)
+
+    candidates: Dict[int, set] = {}
+    for band in range(bands):
+        buckets: Dict[bytes, List[int]] = {}
+        band_signatures = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        for i in range(len(chunks)):
+            buckets.setdefault(band_signatures[i].tobytes(), []).append(i)
+        for members in buckets.values():
+            for i in members[1:]:
+                candidates.setdefault(i, set()).update(j for j in members if j < i)
+
+    representative = np.arange(len(chunks), dtype=np.int64)
+    for i in sorted(candidates):
+        current = set(shingle_sets[i].tolist())
+        for j in sorted(candidates[i]):
+            if representative[j] != j:
+                continue
+            other = set(shingle_sets[j].tolist())
+            if len(current & other) / len(current | other) >= threshold:
+                representative[i] = j
+                break
+    return representative
 
-def main():
+def deduplicate_chunks(chunks: List[str], chunk_metadata: Dict[str, np.ndarray],
+                       threshold: float = DEFAULT_DEDUP_THRESHOLD) -> Tuple[List[str], Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+    """
+    Menghapus chunk near-duplicate dan menyimpan lokasinya sebagai rujukan balik.
+    
+    Args:
+        chunks (List[str]): Semua chunks (lihat merge_documents).
+        chunk_metadata (Dict[str, np.ndarray]): Array metadata paralel untuk chunks.
+        threshold (float): Jaccard minimum agar dianggap duplikat.
+    
+    Returns:
+        Tuple: (chunks unik, metadata chunks unik, metadata duplikat). Metadata duplikat
+        berisi field yang sama ditambah 'representative', yaitu indeks chunk unik yang
+        mewakilinya, terurut berdasarkan representatif.
+    """
+    representative = find_near_duplicates(chunks, threshold)
+    is_kept = representative == np.arange(len(chunks))
+    # Indeks baru setiap representatif setelah chunk duplikat dibuang
+    new_index = np.cumsum(is_kept) - 1
+
+    kept_chunks = [chunk for chunk, kept in zip(chunks, is_kept) if kept]
+    kept_metadata = {field: values[is_kept] for field, values in chunk_metadata.items()}
+    duplicate_rows = np.flatnonzero(~is_kept)
+    duplicate_rows = duplicate_rows[np.argsort(new_index[representative[duplicate_rows]], kind='stable')]
+    duplicate_metadata = {field: values[duplicate_rows] for field, values in chunk_metadata.items()}
+    duplicate_metadata['representative'] = new_index[representative[duplicate_rows]].astype(np.int32)
+
+    num_clusters = len(np.unique(duplicate_metadata['representative']))
+    reduction = 100.0 * len(duplicate_rows) / len(chunks) if chunks else 0.0
+    logging.info(
+        f"Deduplikasi: {len(chunks)} -> {len(kept_chunks)} chunks "
+        f"({len(duplicate_rows)} duplikat dalam {num_clusters} klaster, berkurang {reduction:.1f}%)."
+    )
+    return kept_chunks, kept_metadata, duplicate_metadata
+
+def _df_value(value: str) -> Union[int, float]:
+    """Argumen min_df/max_df: bilangan bulat berarti jumlah chunk, pecahan berarti proporsi."""
+    return float(value) if '.' in value else int(value)
+
+def main(argv: Optional[List[str]] = None):
     """
     Fungsi utama untuk menjalankan pipeline pemrosesan PDF.
     Skrip ini sekarang menerima direktori berisi file PDF.
+
+    Args:
+        argv (List[str] | None): Argumen baris perintah (default: sys.argv).
     """
     parser = argparse.ArgumentParser(description='Script untuk memproses dokumen PERDA dan membuat TF-IDF index.')
-    parser.add_argument('pdf_dir', type=str, help='Path ke direktori yang berisi file PDF PERDA.')
-    parser.add_argument('--output', type=str, default="data/perda_data.pkl", help='Lokasi file output pickle.')
+    parser.add_argument('pdf_dir', type=str, help='Path ke direktori yang berisi file PDF PERDA (subdirektori ikut diproses).')
+    parser.add_argument('--output', type=str, default="data/perda_index", help='Lokasi output: direktori indeks mmap, atau file .pkl untuk format pickle lama.')
+    parser.add_argument('--workers', type=int, default=1, help='Jumlah proses worker untuk ekstraksi dan chunking paralel (default: 1, serial).')
+    parser.add_argument('--pages-per-task', type=int, default=DEFAULT_PAGES_PER_TASK, help='PDF dengan halaman lebih banyak dari ini diekstrak per rentang halaman secara paralel.')
+    parser.add_argument('--max-chunk-tokens', type=int, default=DEFAULT_MAX_CHUNK_TOKENS, help='Batas token per chunk (disesuaikan dengan panjang input maksimum reranker).')
+    parser.add_argument('--manifest', type=str, default=None, help='Lokasi manifest indeks inkremental (default: <output>_manifest.pkl).')
+    parser.add_argument('--min-df', type=_df_value, default=1, help='Buang term dengan document frequency di bawah nilai ini (int: jumlah chunk, float: proporsi).')
+    parser.add_argument('--max-df', type=_df_value, default=1.0, help='Buang term dengan document frequency di atas nilai ini (int: jumlah chunk, float: proporsi).')
+    parser.add_argument('--max-features', type=int, default=None, help='Batas ukuran vocabulary TF-IDF.')
+    parser.add_argument('--digit-tokens', type=str, default='keep', choices=list(DIGIT_TOKEN_PATTERNS), help='Kebijakan token berangka di vocabulary TF-IDF.')
+    parser.add_argument('--dtype', type=str, default='float64', choices=['float64', 'float32'], help='Tipe nilai matriks TF-IDF (float32 menghemat separuh memori data).')
+    parser.add_argument('--no-bm25', action='store_true', help='Jangan bangun inverted index BM25.')
+    parser.add_argument('--bm25-k1', type=float, default=1.5, help='Parameter k1 BM25.')
+    parser.add_argument('--bm25-b', type=float, default=0.75, help='Parameter b BM25.')
+    parser.add_argument('--embedding-model', type=str, default=DEFAULT_EMBEDDING_MODEL, help='Model SentenceTransformer untuk embedding chunk (retrieval hybrid).')
+    parser.add_argument('--embedding-batch-size', type=int, default=DEFAULT_EMBEDDING_BATCH_SIZE, help='Ukuran batch encoding embedding.')
+    parser.add_argument('--embeddings', action=argparse.BooleanOptionalAction, default=False, help='Hitung embedding chunk untuk retrieval hybrid (memuat/mengunduh --embedding-model; default: tidak).')
+    parser.add_argument('--ann', action='store_true', help='Bangun indeks ANN IVF-PQ atas embedding chunk (untuk korpus besar).')
+    parser.add_argument('--ann-lists', type=int, default=0, help='Jumlah list IVF (0: sekitar akar jumlah chunk).')
+    parser.add_argument('--ann-subquantizers', type=int, default=0, help='Jumlah sub-quantizer PQ, harus membagi dimensi embedding (0: sub-vektor 8 dimensi).')
+    parser.add_argument('--shards', type=int, default=1, help='Jumlah shard array scoring untuk pencarian paralel per proses (DocumentRetriever shard_workers=True).')
+    parser.add_argument('--report', type=str, default=None, help='Lokasi laporan waktu per tahap (default: <output>_report.json).')
+    parser.add_argument('--full-rebuild', action='store_true', help='Abaikan manifest dan proses ulang semua dokumen.')
+    parser.add_argument('--dedup-threshold', type=float, default=DEFAULT_DEDUP_THRESHOLD, help='Jaccard minimum (shingle 5 kata) agar dua chunk dianggap near-duplicate.')
+    parser.add_argument('--no-dedup', action='store_true', help='Nonaktifkan penghapusan chunk near-duplicate.')
     parser.add_argument('--log-level', type=str, default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], help='Atur level logging.')
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     logging.getLogger().setLevel(getattr(logging, args.log_level.upper()))
     
@@ -218,59 +1305,161 @@ def main():
 
     logging.info(f"Memulai proses persiapan data dari direktori: {args.pdf_dir}...")
     
-    all_chunks: List[str] = []
-    
-    pdf_files = [f for f in os.listdir(args.pdf_dir) if f.endswith('.pdf')]
+    pdf_files = list_pdf_files(args.pdf_dir)
     if not pdf_files:
         logging.error("Tidak ada file PDF yang ditemukan di direktori tersebut.")
         return
         
     logging.info(f"Ditemukan {len(pdf_files)} file PDF untuk diproses.")
     
+    build_start = time.perf_counter()
+    build_stats = PipelineStats()
+
+    # Bandingkan hash konten dengan manifest untuk menentukan dokumen yang perlu diproses ulang
+    stage_start = time.perf_counter()
+    manifest_path = args.manifest or default_manifest_path(args.output)
+    chunking_settings = {'max_chunk_tokens': args.max_chunk_tokens}
+    index_settings = build_signature(args)
+    cached_documents, cached_index_settings = {}, None
+    if not args.full_rebuild:
+        cached_documents, cached_index_settings = load_manifest(manifest_path, chunking_settings)
+    documents: Dict[str, dict] = {}
+    pending_files: List[str] = []
     for pdf_file in pdf_files:
-        pdf_path = os.path.join(args.pdf_dir, pdf_file)
-        logging.info(f"Memproses file: {pdf_file}")
-        
-        # 1. Ekstrak teks dari PDF
-        raw_text = extract_text_from_pdf(pdf_path)
-        if raw_text is None:
-            logging.warning(f"Melewatkan file {pdf_file} karena tidak dapat mengekstrak teks.")
-            continue
-        
-        # 2. Praproses teks
-        cleaned_text = preprocess_text(raw_text)
-        
-        # 3. Potong teks menjadi chunks
-        document_chunks = chunk_text_by_structure(cleaned_text)
-        if not document_chunks:
-            logging.warning(f"Melewatkan file {pdf_file} karena gagal membagi dokumen menjadi chunks.")
-            continue
-            
-        all_chunks.extend(document_chunks)
+        cached_entry = cached_documents.get(pdf_file)
+        sha256, size, mtime_ns = _file_fingerprint(os.path.join(args.pdf_dir, pdf_file), cached_entry)
+        if cached_entry and cached_entry.get('sha256') == sha256:
+            documents[pdf_file] = dict(cached_entry, size=size, mtime_ns=mtime_ns)
+        else:
+            documents[pdf_file] = {'sha256': sha256, 'size': size, 'mtime_ns': mtime_ns, 'chunks': [], 'metadata': None}
+            pending_files.append(pdf_file)
+    build_stats.add('hashing', time.perf_counter() - stage_start, len(pdf_files),
+                    sum(entry['size'] for entry in documents.values()))
+
+    deleted_files = sorted(set(cached_documents) - set(pdf_files))
+    logging.info(
+        f"Manifest: {len(pdf_files) - len(pending_files)} dokumen tidak berubah, "
+        f"{len(pending_files)} baru/berubah, {len(deleted_files)} dihapus."
+    )
+    for pdf_file in deleted_files:
+        logging.info(f"Menghapus dokumen dari indeks: {pdf_file}")
+
+    if not pending_files and not deleted_files and os.path.exists(args.output):
+        if cached_index_settings == index_settings:
+            logging.info(f"Tidak ada perubahan dokumen. Indeks {args.output} sudah terbaru.")
+            return
+        logging.info("Opsi indeks berubah. Indeks dibangun ulang dari chunks yang di-cache.")
+
+    pdf_paths = [os.path.join(args.pdf_dir, pdf_file) for pdf_file in pending_files]
+    if args.workers > 1 and pdf_paths:
+        logging.info(f"Menggunakan {args.workers} proses worker.")
+        document_results = process_documents_parallel(pdf_paths, args.workers, args.pages_per_task, args.max_chunk_tokens)
+    else:
+        document_results = [process_document(pdf_path, args.max_chunk_tokens) for pdf_path in pdf_paths]
+
+    for pdf_file, document_result in zip(pending_files, document_results):
+        # Dokumen yang gagal diproses tetap dicatat (tanpa chunks) agar tidak diproses ulang selama isinya sama
+        if document_result:
+            documents[pdf_file].update(document_result)
+
+    # Gabungkan chunks dari cache dan hasil baru sesuai urutan file
+    all_chunks, chunk_metadata = merge_documents(pdf_files, documents)
+    # Jenis peraturan dan tahun per dokumen (dari judul di chunk pertama) untuk filter retrieval
+    document_attributes = [
+        describe_document(pdf_file, documents[pdf_file]['chunks'][0] if documents[pdf_file]['chunks'] else "")
+        for pdf_file in pdf_files
+    ]
     
     if not all_chunks:
         logging.error("Tidak ada chunks yang dihasilkan dari semua dokumen. Proses dihentikan.")
         return
 
-    # 4. Analisis statistik chunks
-    analyze_chunks(all_chunks)
+    # Buang chunk near-duplicate (boilerplate yang disalin antar-regulasi); lokasinya disimpan sebagai rujukan balik
+    duplicate_metadata = None
+    if not args.no_dedup:
+        stage_start = time.perf_counter()
+        num_chunks, chunk_bytes = len(all_chunks), sum(_utf8_size(chunk) for chunk in all_chunks)
+        all_chunks, chunk_metadata, duplicate_metadata = deduplicate_chunks(all_chunks, chunk_metadata, args.dedup_threshold)
+        build_stats.add('deduplication', time.perf_counter() - stage_start, num_chunks, chunk_bytes)
+
+    # 4. Analisis statistik chunks (jumlah token sudah dihitung saat chunking)
+    token_stats = analyze_chunks(all_chunks, chunk_metadata['n_tokens'])
     
     # 5. Buat indeks TF-IDF dari semua chunks
-    vectorizer, tfidf_matrix = create_tfidf_index(all_chunks)
+    stage_start = time.perf_counter()
+    vectorizer, tfidf_matrix = create_tfidf_index(all_chunks, args.min_df, args.max_df, args.max_features,
+                                                  args.digit_tokens, args.dtype)
+    build_stats.add('vectorizing', time.perf_counter() - stage_start, len(all_chunks),
+                    sum(_utf8_size(chunk) for chunk in all_chunks))
     if vectorizer is None or tfidf_matrix is None:
         logging.error("Gagal membuat TF-IDF index.")
         return
+
+    # 5b. Inverted index BM25 sebagai alternatif tahap pertama
+    bm25_index = None
+    if not args.no_bm25:
+        stage_start = time.perf_counter()
+        bm25_index = create_bm25_index(all_chunks, vectorizer, args.bm25_k1, args.bm25_b)
+        build_stats.add('bm25', time.perf_counter() - stage_start, len(all_chunks), int(bm25_index.docs.nbytes + bm25_index.weights.nbytes))
+
+    # 5c. Embedding dense chunk untuk retrieval hybrid (dihitung sekali, disimpan float16)
+    chunk_embeddings = None
+    if args.embeddings:
+        stage_start = time.perf_counter()
+        chunk_embeddings = create_chunk_embeddings(all_chunks, args.embedding_model, args.embedding_batch_size)
+        if chunk_embeddings is not None:
+            build_stats.add('embedding', time.perf_counter() - stage_start, len(all_chunks), int(chunk_embeddings.nbytes))
+
+    # 5d. Indeks ANN IVF-PQ (opsional) agar pencarian embedding tidak linear terhadap jumlah chunk
+    ann_index = None
+    if args.ann and chunk_embeddings is not None:
+        stage_start = time.perf_counter()
+        ann_index = IVFPQIndex.build(chunk_embeddings, args.ann_lists, args.ann_subquantizers)
+        build_stats.add('ann', time.perf_counter() - stage_start, len(all_chunks), int(ann_index.codes.nbytes))
         
-    # 6. Simpan hasil ke dalam file pickle
-    processed_data = {
-        'chunks': all_chunks,
-        'vectorizer': vectorizer,
-        'tfidf_matrix': tfidf_matrix
+    # 6. Simpan hasil: direktori indeks mmap (default) atau file pickle lama (*.pkl)
+    stage_start = time.perf_counter()
+    if args.output.endswith('.pkl'):
+        processed_data = {
+            'chunks': all_chunks,
+            'vectorizer': vectorizer,
+            'tfidf_matrix': tfidf_matrix,
+            'documents': pdf_files,
+            'chunk_metadata': chunk_metadata,
+            'duplicate_metadata': duplicate_metadata,
+            'bm25_index': bm25_index,
+            'chunk_embeddings': chunk_embeddings,
+            'embedding_model': args.embedding_model if chunk_embeddings is not None else None,
+            'ann_index': ann_index,
+            'document_attributes': document_attributes
+        }
+        joblib.dump(processed_data, args.output)
+        if args.shards > 1:
+            logging.warning("Format pickle tidak mendukung shard. Opsi --shards diabaikan.")
+    else:
+        save_index(args.output, all_chunks, vectorizer, tfidf_matrix,
+                   documents=pdf_files, chunk_metadata=chunk_metadata,
+                   duplicate_metadata=duplicate_metadata, bm25_index=bm25_index,
+                   chunk_embeddings=chunk_embeddings, embedding_model=args.embedding_model,
+                   ann_index=ann_index, document_attributes=document_attributes, num_shards=args.shards)
+    build_stats.add('serialization', time.perf_counter() - stage_start, len(all_chunks), _path_size(args.output))
+    # Model embedding hanya dicatat jika embedding benar-benar ditulis
+    index_settings['embedding_model'] = args.embedding_model if chunk_embeddings is not None else None
+    save_manifest(manifest_path, documents, chunking_settings, index_settings)
+
+    # Opsi laporan = signature build (yang sudah ditulis ke manifest) ditambah opsi eksekusi dan ukuran hasil
+    report_settings = {
+        **chunking_settings, **index_settings,
+        'workers': args.workers, 'pages_per_task': args.pages_per_task,
+        # Parameter ANN yang benar-benar dipakai (bisa berbeda dari opsi, mis. jumlah list dibatasi)
+        'ann': ann_index.params() if ann_index is not None else None,
+        'vocabulary_size': len(vectorizer.vocabulary_), 'nnz': int(tfidf_matrix.nnz),
     }
-    
-    joblib.dump(processed_data, args.output)
+    report = build_report(pdf_files, documents, pending_files, build_stats,
+                          time.perf_counter() - build_start, token_stats, report_settings)
+    save_report(args.report or default_report_path(args.output), report)
     logging.info(f"\nProses selesai. Data berhasil disimpan ke {args.output}")
-    logging.info(f"Ukuran TF-IDF matrix: {tfidf_matrix.shape}")
+    logging.info(f"Ukuran TF-IDF matrix: {tfidf_matrix.shape}, nnz {tfidf_matrix.nnz}, dtype {tfidf_matrix.dtype}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
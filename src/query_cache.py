@@ -0,0 +1,120 @@
+import copy
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+def normalize_query(query: str, lowercase: bool = True) -> str:
+    """
+    Normalisasi query untuk kunci cache: spasi diseragamkan dan (opsional) huruf kecil.
+
+    TF-IDF/BM25 mengabaikan huruf besar dan spasi, dan reranker ms-marco-MiniLM memakai
+    tokenizer uncased, sehingga query yang hanya berbeda pada hal ini memberi hasil sama.
+    Model embedding retrieval hybrid membedakan huruf besar, sehingga untuk tahap tersebut
+    huruf tidak boleh diseragamkan (lowercase=False).
+
+    Args:
+        query (str): Query mentah.
+        lowercase (bool): Jika True, query juga diubah menjadi huruf kecil.
+
+    Returns:
+        str: Query ternormalisasi.
+    """
+    if lowercase:
+        query = query.lower()
+    return " ".join(query.split())
+
+class QueryResultCache:
+    """
+    Cache hasil retrieval berukuran terbatas dengan eviction LRU dan TTL.
+
+    Aman dipakai dari beberapa thread (mis. sesi Streamlit). Entri yang umurnya melebihi
+    ttl_seconds dianggap tidak ada dan dibuang saat diakses. Nilai disalin (deepcopy) saat
+    disimpan dan diambil, sehingga pemanggil yang mengubah hasilnya (mis. dict metadata)
+    tidak mengubah isi cache.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: Optional[float] = 3600,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            max_entries (int): Jumlah entri maksimum; 0 menonaktifkan cache.
+            ttl_seconds (float | None): Umur maksimum entri dalam detik; None berarti tanpa TTL.
+            clock (Callable[[], float]): Sumber waktu (dapat diganti untuk pengujian).
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Mengambil nilai untuk key dan menandainya sebagai yang terakhir dipakai.
+
+        Args:
+            key (Hashable): Kunci cache.
+
+        Returns:
+            Any | None: Salinan nilai tersimpan, atau None jika tidak ada atau sudah kedaluwarsa.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, stored_at = entry
+            if self.ttl_seconds is not None and self._clock() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(value)
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Menyimpan nilai; entri yang paling lama tidak dipakai dibuang jika cache penuh.
+
+        Args:
+            key (Hashable): Kunci cache.
+            value (Any): Nilai yang disimpan.
+        """
+        if self.max_entries <= 0:
+            return
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (value, self._clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Mengosongkan cache (statistik tetap dipertahankan)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Statistik cache.
+
+        Returns:
+            Dict[str, int]: Jumlah entri, hits, misses, evictions, dan expirations.
+        """
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
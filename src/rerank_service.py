@@ -0,0 +1,234 @@
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future, TimeoutError
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from reranking import predict_bucketed, raise_if_cancelled
+
+# Interval pemeriksaan sinyal pembatalan saat menunggu hasil di predict (detik)
+CANCEL_POLL_SECONDS = 0.05
+
+class _RerankRequest:
+    """Satu permintaan reranking yang menunggu di antrian MicroBatchReranker."""
+
+    __slots__ = ('pairs', 'future', 'timings', 'cancel_event')
+
+    def __init__(self, pairs: Sequence[Sequence[str]], cancel_event: Optional[threading.Event] = None):
+        self.pairs = pairs
+        self.future: Future = Future()
+        self.timings: List[Dict[str, float]] = []
+        self.cancel_event = cancel_event
+
+    def start(self) -> bool:
+        """Menandai request mulai diskor; False jika sudah dibatalkan (request dibuang dari batch)."""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            self.future.cancel()
+        return self.future.set_running_or_notify_cancel()
+
+class MicroBatchReranker:
+    """
+    Worker reranking bersama yang menggabungkan pasangan dari beberapa request serentak.
+
+    Setiap pemanggil (mis. sesi Streamlit) memasukkan pasangan [query, passage]-nya ke antrian
+    dan menunggu Future. Satu thread worker mengambil request pertama, lalu menunggu paling
+    lama max_wait_ms untuk request lain hingga total max_batch_pairs pasangan, dan menskor
+    semuanya sekaligus dengan predict_bucketed. Dengan begitu request serentak berbagi batch
+    (padding lebih sedikit, satu model aktif) alih-alih berebut CPU.
+
+    Request yang dibatalkan (cancel_event di-set) sebelum batch-nya dibentuk dibuang dari
+    batch, dan pemanggilnya langsung menerima CancelledError.
+    """
+
+    _STOP = object()
+
+    def __init__(self, model, max_batch_pairs: int = 128, max_wait_ms: float = 5.0, batch_size: int = 16):
+        """
+        Args:
+            model: Model dengan method predict (mis. CrossEncoder).
+            max_batch_pairs (int): Batas jumlah pasangan per batch gabungan. Request yang lebih
+                besar tetap diproses utuh dalam batch-nya sendiri.
+            max_wait_ms (float): Waktu tunggu maksimum request lain setelah request pertama tiba.
+            batch_size (int): Ukuran micro-batch model di dalam batch gabungan.
+        """
+        self.model = model
+        self.max_batch_pairs = max(1, max_batch_pairs)
+        self.max_wait_seconds = max(0.0, max_wait_ms) / 1000
+        self.batch_size = batch_size
+        self._queue: "queue.Queue" = queue.Queue()
+        # Request yang tidak muat di batch sebelumnya; diproses pertama pada batch berikutnya
+        self._carry: Optional[_RerankRequest] = None
+        self._lock = threading.Lock()
+        self._pending_requests = 0
+        self._pending_pairs = 0
+        self._closed = False
+        self.requests = 0
+        self.batches = 0
+        self.pairs = 0
+        self.max_queue_depth = 0
+        self._worker = threading.Thread(target=self._run, name="rerank-micro-batch", daemon=True)
+        self._worker.start()
+
+    @property
+    def queue_depth(self) -> int:
+        """Jumlah request yang sedang menunggu di antrian (belum masuk batch)."""
+        with self._lock:
+            return self._pending_requests
+
+    def submit(self, pairs: Sequence[Sequence[str]],
+               cancel_event: Optional[threading.Event] = None) -> Future:
+        """
+        Memasukkan pasangan ke antrian tanpa menunggu hasilnya.
+
+        Args:
+            pairs (Sequence[Sequence[str]]): Pasangan [query, passage].
+            cancel_event (threading.Event | None): Jika di-set sebelum batch-nya dibentuk,
+                request dibuang dan Future dibatalkan.
+
+        Returns:
+            Future: Menghasilkan np.ndarray skor float32, sejajar dengan pairs.
+
+        Raises:
+            RuntimeError: Jika worker sudah dihentikan dengan close.
+        """
+        return self._submit(pairs, cancel_event).future
+
+    def predict(self, pairs: Sequence[Sequence[str]],
+                timings: Optional[List[Dict[str, float]]] = None,
+                cancel_event: Optional[threading.Event] = None) -> np.ndarray:
+        """
+        Menskor pasangan lewat worker dan menunggu hasilnya.
+
+        Args:
+            pairs (Sequence[Sequence[str]]): Pasangan [query, passage].
+            timings (List[Dict[str, float]] | None): Jika diberikan, diisi waktu per micro-batch
+                dari batch gabungan yang memuat pasangan ini (lihat predict_bucketed).
+            cancel_event (threading.Event | None): Sinyal pembatalan, diperiksa selama menunggu;
+                pemanggil tidak menunggu batch yang sedang berjalan setelah sinyal di-set.
+
+        Returns:
+            np.ndarray: Skor float32, sejajar dengan pairs.
+
+        Raises:
+            CancelledError: Jika cancel_event di-set sebelum skor tersedia.
+            RuntimeError: Jika worker sudah dihentikan dengan close.
+        """
+        raise_if_cancelled(cancel_event)
+        request = self._submit(pairs, cancel_event)
+        if cancel_event is None:
+            scores = request.future.result()
+        else:
+            while True:
+                try:
+                    scores = request.future.result(timeout=CANCEL_POLL_SECONDS)
+                    break
+                except TimeoutError:
+                    if cancel_event.is_set():
+                        # Dibuang dari antrian jika belum masuk batch; hasil batch yang sedang berjalan diabaikan
+                        request.future.cancel()
+                        raise_if_cancelled(cancel_event)
+        if timings is not None:
+            timings.extend(request.timings)
+        return scores
+
+    def _submit(self, pairs: Sequence[Sequence[str]],
+                cancel_event: Optional[threading.Event] = None) -> _RerankRequest:
+        request = _RerankRequest(pairs, cancel_event)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("MicroBatchReranker sudah dihentikan (close).")
+            if not pairs:
+                request.future.set_result(np.empty(0, dtype=np.float32))
+                return request
+            self._pending_requests += 1
+            self._pending_pairs += len(pairs)
+            self.max_queue_depth = max(self.max_queue_depth, self._pending_requests)
+            # Di dalam lock agar tidak ada request yang masuk antrian setelah sinyal berhenti
+            self._queue.put(request)
+        return request
+
+    def _collect(self, first: _RerankRequest) -> List[_RerankRequest]:
+        """Mengumpulkan request yang tiba dalam jendela tunggu, hingga batas jumlah pasangan."""
+        batch, num_pairs = [first], len(first.pairs)
+        deadline = time.monotonic() + self.max_wait_seconds
+        while num_pairs < self.max_batch_pairs:
+            remaining = deadline - time.monotonic()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is self._STOP:
+                # Kembalikan sinyal berhenti agar loop utama berhenti setelah batch ini
+                self._queue.put(request)
+                break
+            if num_pairs + len(request.pairs) > self.max_batch_pairs:
+                # Request yang tidak muat menjadi awal batch berikutnya (urutan FIFO tetap)
+                self._carry = request
+                break
+            batch.append(request)
+            num_pairs += len(request.pairs)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            first, self._carry = self._carry or self._queue.get(), None
+            if first is self._STOP:
+                return
+            batch = self._collect(first)
+            with self._lock:
+                self._pending_requests -= len(batch)
+                self._pending_pairs -= sum(len(request.pairs) for request in batch)
+            batch = [request for request in batch if request.start()]
+            if not batch:
+                continue
+            all_pairs = [pair for request in batch for pair in request.pairs]
+            timings: List[Dict[str, float]] = []
+            try:
+                scores = predict_bucketed(self.model, all_pairs, self.batch_size, timings)
+            except Exception as e:
+                logging.error(f"Reranking batch gabungan ({len(batch)} request) gagal: {e}")
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            with self._lock:
+                self.requests += len(batch)
+                self.batches += 1
+                self.pairs += len(all_pairs)
+            offset = 0
+            for request in batch:
+                request.timings = timings
+                request.future.set_result(scores[offset:offset + len(request.pairs)])
+                offset += len(request.pairs)
+            logging.debug(f"Batch reranking gabungan: {len(batch)} request, {len(all_pairs)} pasangan.")
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Statistik worker.
+
+        Returns:
+            Dict[str, float]: Antrian saat ini (request dan pasangan), antrian maksimum, jumlah
+            request, batch, dan pasangan yang sudah diskor, serta rata-rata request per batch.
+        """
+        with self._lock:
+            return {
+                'queue_depth': self._pending_requests,
+                'queued_pairs': self._pending_pairs,
+                'max_queue_depth': self.max_queue_depth,
+                'requests': self.requests,
+                'batches': self.batches,
+                'pairs': self.pairs,
+                'requests_per_batch': round(self.requests / self.batches, 2) if self.batches else 0.0,
+            }
+
+    def close(self) -> None:
+        """
+        Menghentikan worker setelah request yang sudah mengantri selesai diproses.
+        Setelah itu submit dan predict melempar RuntimeError.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(self._STOP)
+        self._worker.join()
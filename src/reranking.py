@@ -0,0 +1,123 @@
+import time
+import logging
+import threading
+from concurrent.futures import CancelledError
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+
+# Backend inferensi reranker: 'fp32' (model asli) atau 'int8' (dynamic quantization PyTorch)
+RERANKER_BACKENDS = ('fp32', 'int8')
+
+def configure_torch_threads(num_threads: int) -> None:
+    """
+    Membatasi jumlah thread intra-op PyTorch yang dipakai reranker di CPU.
+
+    Args:
+        num_threads (int): Jumlah thread; 0 atau negatif berarti memakai default PyTorch.
+    """
+    if num_threads <= 0:
+        return
+    try:
+        import torch
+        torch.set_num_threads(num_threads)
+        logging.info(f"Thread PyTorch dibatasi menjadi {num_threads}.")
+    except ImportError:
+        logging.warning("PyTorch tidak tersedia; batas thread reranker diabaikan.")
+
+def resolve_backend(backend: str) -> str:
+    """
+    Memvalidasi nama backend reranker; backend yang tidak dikenal diganti 'fp32'.
+
+    Args:
+        backend (str): Nama backend (lihat RERANKER_BACKENDS).
+
+    Returns:
+        str: Backend yang dipakai.
+    """
+    backend = (backend or 'fp32').lower()
+    if backend not in RERANKER_BACKENDS:
+        logging.warning(f"Backend reranker '{backend}' tidak dikenal. Menggunakan fp32.")
+        return 'fp32'
+    return backend
+
+def backend_model_key(model_name: str, backend: str, max_length: Optional[int] = None) -> str:
+    """
+    Nama model untuk cache skor: skor model int8 sedikit berbeda dari fp32, dan skor dengan
+    batas pemotongan (max_length) berbeda juga berbeda, sehingga tidak boleh saling memakai skor.
+
+    Args:
+        model_name (str): Nama model CrossEncoder.
+        backend (str): Backend yang dipakai.
+        max_length (int | None): max_length CrossEncoder (panjang maksimum pasangan dalam token).
+
+    Returns:
+        str: model_name untuk fp32, atau "model_name@backend" untuk backend lain, diikuti
+        "@max_length=N" jika max_length diberikan.
+    """
+    key = model_name if backend == 'fp32' else f"{model_name}@{backend}"
+    return key if max_length is None else f"{key}@max_length={max_length}"
+
+def quantize_int8(model):
+    """
+    Dynamic quantization int8 untuk semua layer Linear CrossEncoder (in-place).
+
+    Bobot Linear disimpan sebagai int8 dan aktivasi dikuantisasi saat inferensi, sehingga
+    perkalian matriks transformer memakai kernel int8 di CPU. Embedding dan LayerNorm tetap fp32.
+
+    Args:
+        model: CrossEncoder yang sudah dimuat (atribut model berisi modul PyTorch-nya).
+
+    Returns:
+        CrossEncoder yang sama, dengan layer Linear terkuantisasi.
+    """
+    import torch
+    from torch.ao.quantization import quantize_dynamic
+    quantize_dynamic(model.model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model
+
+def raise_if_cancelled(cancel_event: Optional[threading.Event]) -> None:
+    """Melempar CancelledError jika cancel_event sudah di-set (pembatalan kooperatif)."""
+    if cancel_event is not None and cancel_event.is_set():
+        raise CancelledError()
+
+def predict_bucketed(model, pairs: Sequence[Sequence[str]], batch_size: int,
+                     timings: Optional[List[Dict[str, float]]] = None,
+                     cancel_event: Optional[threading.Event] = None) -> np.ndarray:
+    """
+    Menjalankan model.predict per micro-batch pasangan yang panjangnya serupa.
+
+    Pasangan diurutkan berdasarkan panjang teks (proxy jumlah token) sehingga setiap
+    batch hanya di-padding ke pasangan terpanjang di batch itu, bukan ke pasangan
+    terpanjang dari campuran acak. Skor dikembalikan sesuai urutan pairs semula.
+
+    Args:
+        model: Model dengan method predict(pairs, batch_size=..., show_progress_bar=...)
+            (mis. CrossEncoder).
+        pairs (Sequence[Sequence[str]]): Pasangan [query, passage].
+        batch_size (int): Jumlah pasangan per micro-batch.
+        timings (List[Dict[str, float]] | None): Jika diberikan, diisi satu entri per
+            batch: jumlah pasangan, panjang karakter maksimum, dan durasi dalam detik.
+        cancel_event (threading.Event | None): Jika di-set, CancelledError dilempar sebelum
+            batch berikutnya dijalankan.
+
+    Returns:
+        np.ndarray: Skor float32, sejajar dengan pairs.
+    """
+    scores = np.empty(len(pairs), dtype=np.float32)
+    if not pairs:
+        return scores
+    lengths = np.array([len(query) + len(passage) for query, passage in pairs])
+    order = np.argsort(-lengths, kind='stable')
+    batch_size = max(1, batch_size)
+    for start in range(0, len(order), batch_size):
+        raise_if_cancelled(cancel_event)
+        batch = order[start:start + batch_size]
+        batch_start = time.perf_counter()
+        scores[batch] = model.predict([pairs[i] for i in batch], batch_size=len(batch), show_progress_bar=False)
+        if timings is not None:
+            timings.append({
+                'pairs': len(batch),
+                'max_chars': int(lengths[batch[0]]),
+                'seconds': time.perf_counter() - batch_start,
+            })
+    return scores
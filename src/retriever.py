@@ -1,119 +1,1006 @@
 import os
+import time
 import joblib
+import asyncio
 import logging
-from typing import List, Optional, Tuple
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
-from sentence_transformers import CrossEncoder
+from index_store import (META_FILE, BM25Index, ChunkMetadata, QueryVectorizer, load_ann_index, load_bm25_index,
+                         load_chunk_embeddings, load_chunk_metadata, load_index)
+from ann_index import DEFAULT_NPROBE, DEFAULT_REFINE_FACTOR, IVFPQIndex
+from config import AppConfig
+from query_cache import QueryResultCache, normalize_query
+from score_cache import RerankerScoreCache, chunk_key
+from rerank_service import MicroBatchReranker
+from reranking import (backend_model_key, configure_torch_threads, predict_bucketed, quantize_int8, raise_if_cancelled,
+                       resolve_backend)
+from shard_search import ShardedSearcher
+from scoring import bm25_top_k, dense_top_k, reciprocal_rank_fusion, select_top_k, tfidf_top_k, tfidf_top_k_batch
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+RERANKER_MODEL = 'cross-encoder/ms-marco-MiniLM-L-12-v2'
+
+# Metode retrieval tahap pertama yang didukung retrieve_chunks
+FIRST_STAGES = ('tfidf', 'bm25', 'hybrid')
+# Nama tampilan metode tahap pertama (log dan label skor di aplikasi)
+FIRST_STAGE_LABELS = {'tfidf': "TF-IDF", 'bm25': "BM25", 'hybrid': "Hybrid (TF-IDF + embedding)"}
+
+def format_chunk_source(metadata: Optional[Dict[str, Any]]) -> str:
+    """
+    Membuat label sumber yang mudah dibaca dari metadata chunk.
+
+    Args:
+        metadata (Dict[str, Any] | None): Metadata dari DocumentRetriever.get_chunk_metadata.
+
+    Returns:
+        str: Label seperti "UU Nomor 18 Tahun 2008.pdf, hal. 3-4, Pasal 12", atau string kosong.
+    """
+    if not metadata:
+        return ""
+    parts = [metadata['document']]
+    if metadata['page_start'] == metadata['page_end']:
+        parts.append(f"hal. {metadata['page_start']}")
+    else:
+        parts.append(f"hal. {metadata['page_start']}-{metadata['page_end']}")
+    if metadata['pasal'] >= 0:
+        parts.append(f"Pasal {metadata['pasal']}")
+    label = ", ".join(parts)
+    if metadata.get('duplicates'):
+        other_documents = sorted({duplicate['document'] for duplicate in metadata['duplicates']} - {metadata['document']})
+        also_in = f": {'; '.join(other_documents)}" if other_documents else ""
+        label += f" (+{len(metadata['duplicates'])} salinan serupa{also_in})"
+    return label
+
+class _IndexState:
+    """
+    Data satu versi indeks yang dimuat retriever.
+
+    Objek ini tidak diubah setelah dimuat: muat ulang membuat objek baru lalu menggantinya
+    dengan satu assignment, dan setiap query mengambil referensinya sekali di awal, sehingga
+    query yang berjalan bersamaan dengan muat ulang tetap melihat satu versi indeks utuh.
+    """
+
+    __slots__ = ('chunks', 'vectorizer', 'tfidf_matrix', 'chunk_metadata', 'bm25_index', 'chunk_embeddings',
+                 'embedding_model_name', 'ann_index', 'index_version', 'shard_searcher')
+
+    def __init__(self, index_version: Optional[tuple] = None):
+        self.chunks: Sequence[str] = []
+        self.vectorizer: Optional[Union[QueryVectorizer, TfidfVectorizer]] = None
+        self.tfidf_matrix: Optional[np.ndarray] = None
+        self.chunk_metadata: Optional[ChunkMetadata] = None
+        self.bm25_index: Optional[BM25Index] = None
+        self.chunk_embeddings: Optional[np.ndarray] = None
+        self.embedding_model_name: Optional[str] = None
+        self.ann_index: Optional[IVFPQIndex] = None
+        self.index_version = index_version
+        self.shard_searcher: Optional[ShardedSearcher] = None
+
+    @property
+    def ready(self) -> bool:
+        """True jika data minimum untuk retrieval TF-IDF tersedia (di proses ini atau di worker shard)."""
+        return (bool(len(self.chunks)) and self.vectorizer is not None
+                and (self.tfidf_matrix is not None or self.shard_searcher is not None))
+
+    @property
+    def has_bm25(self) -> bool:
+        """True jika indeks BM25 tersedia (di proses ini atau di worker shard)."""
+        return self.bm25_index is not None or (self.shard_searcher is not None and self.shard_searcher.has_bm25)
+
+    @property
+    def has_embeddings(self) -> bool:
+        """True jika embedding chunk tersedia (di proses ini atau di worker shard)."""
+        return self.chunk_embeddings is not None or (
+            self.shard_searcher is not None and self.shard_searcher.embedding_model is not None)
+
+def _index_attribute(name: str) -> property:
+    """Atribut read-only DocumentRetriever yang dibaca dari versi indeks saat ini."""
+    return property(lambda self: getattr(self._state, name))
+
 class DocumentRetriever:
     """
     Kelas untuk mengambil dokumen relevan dengan logika reranking yang dapat dikonfigurasi.
     """
 
-    def __init__(self, data_path: str = "data/perda_data.pkl"):
+    # Data indeks versi saat ini (lihat _IndexState); query memakai snapshot self._state
+    chunks = _index_attribute('chunks')
+    vectorizer = _index_attribute('vectorizer')
+    tfidf_matrix = _index_attribute('tfidf_matrix')
+    chunk_metadata = _index_attribute('chunk_metadata')
+    bm25_index = _index_attribute('bm25_index')
+    chunk_embeddings = _index_attribute('chunk_embeddings')
+    embedding_model_name = _index_attribute('embedding_model_name')
+    ann_index = _index_attribute('ann_index')
+    index_version = _index_attribute('index_version')
+    shard_searcher = _index_attribute('shard_searcher')
+
+    def __init__(self, data_path: str = "data/perda_index", ann_nprobe: int = DEFAULT_NPROBE,
+                 ann_refine_factor: int = DEFAULT_REFINE_FACTOR,
+                 cache_size: int = AppConfig.QUERY_CACHE_SIZE,
+                 cache_ttl_seconds: Optional[float] = AppConfig.QUERY_CACHE_TTL_SECONDS,
+                 score_cache_path: Optional[str] = AppConfig.RERANKER_SCORE_CACHE_PATH,
+                 cascade_model: Optional[str] = AppConfig.RERANKER_CASCADE_MODEL,
+                 reranker_backend: str = AppConfig.RERANKER_BACKEND,
+                 micro_batching: bool = False,
+                 warm_up_in_background: bool = False,
+                 shard_workers: bool = False):
+        """
+        Model (embedding query dan reranker) tidak dimuat di sini, melainkan saat pertama
+        kali dibutuhkan atau oleh warm_up, sehingga retrieval baseline dapat langsung
+        dilayani. Rincian waktu startup tersedia di startup_timings.
+
+        Args:
+            data_path (str): Direktori indeks mmap atau file pickle format lama.
+            ann_nprobe (int): Jumlah list IVF yang diperiksa saat indeks ANN dipakai
+                (lebih besar = recall lebih tinggi, lebih lambat).
+            ann_refine_factor (int): Kelipatan kandidat ANN yang diskor ulang secara exact
+                (0 = pakai skor PQ saja).
+            cache_size (int): Jumlah maksimum hasil query yang di-cache (0 = tanpa cache).
+            cache_ttl_seconds (float | None): Umur maksimum hasil di cache dalam detik.
+            score_cache_path (str | None): File SQLite cache skor reranker per (query, chunk);
+                None atau string kosong menonaktifkan cache.
+            cascade_model (str | None): Reranker ringan untuk mode cascade (lihat cascade_k pada
+                retrieve_chunks); None atau string kosong menonaktifkan cascade.
+            reranker_backend (str): 'fp32' atau 'int8' (dynamic quantization, lebih cepat di CPU
+                dengan skor yang sedikit berbeda); berlaku untuk reranker utama dan cascade.
+            micro_batching (bool): Jika True, reranking dari request serentak (beberapa thread)
+                digabung oleh satu worker per model (lihat rerank_service.MicroBatchReranker),
+                dengan batas AppConfig.RERANKER_MICRO_BATCH_MAX_PAIRS dan
+                AppConfig.RERANKER_MICRO_BATCH_WAIT_MS.
+            warm_up_in_background (bool): Jika True, model langsung dimuat dan dipanaskan di
+                thread latar (lihat warm_up).
+            shard_workers (bool): Jika True dan indeks memiliki shard (perda_processor.py
+                --shards), tahap pertama diskor paralel per shard di proses worker
+                (lihat shard_search.ShardedSearcher) dengan hasil identik, dan array scoring
+                utuh tidak dimuat di proses ini. Pencarian embedding pada mode ini selalu exact
+                (indeks ANN tidak dipakai). Tanpa worker shard, array scoring indeks sharded
+                digabung dari shard di memori.
+        """
+        # Waktu (detik) setiap langkah startup: indeks, cache skor, impor, muat dan pemanasan model
+        self.startup_timings: Dict[str, float] = {}
+        start = time.perf_counter()
         self.data_path = data_path
-        self.chunks: List[str] = []
-        self.vectorizer: Optional[TfidfVectorizer] = None
-        self.tfidf_matrix: Optional[np.ndarray] = None
+        self.ann_nprobe = ann_nprobe
+        self.ann_refine_factor = ann_refine_factor
+        self.shard_workers = shard_workers
+        self._state = _IndexState()
+        # Mencegah beberapa query memuat ulang indeks yang sama secara bersamaan
+        self._reload_lock = threading.Lock()
+        self.query_cache = QueryResultCache(cache_size, cache_ttl_seconds)
         self._load_data()
+        self.startup_timings['index'] = time.perf_counter() - start
 
-        try:
-            # Tetap muat model reranker, penggunaannya akan bersifat opsional
-            self.reranker = CrossEncoder('cross-encoder/ms-marco-MiniLM-L-12-v2')
-            logging.info("Model CrossEncoder (reranker) berhasil dimuat.")
-        except Exception as e:
-            logging.error(f"Gagal memuat model CrossEncoder: {e}")
-            self.reranker = None
+        # Model dimuat lazily; setiap jenis model punya lock sendiri agar query hybrid tidak
+        # menunggu reranker yang sedang dimuat di thread latar
+        self.cascade_model_name = cascade_model or None
+        self.reranker_backend = resolve_backend(reranker_backend)
+        self.micro_batching = micro_batching
+        # Worker micro-batching per model (kunci: id model), dibuat saat reranker dimuat
+        self._rerank_services: Dict[int, MicroBatchReranker] = {}
+        self._reranker = None
+        self._cascade_reranker = None
+        self._rerankers_loaded = False
+        self._reranker_lock = threading.Lock()
+        # Reranker cascade hanya dimuat saat query pertama dengan cascade_k > 0
+        self._cascade_loaded = False
+        self._cascade_lock = threading.Lock()
+        self._embedding_model = None
+        self._embedding_model_loaded_name: Optional[str] = None
+        self._embedding_lock = threading.Lock()
+        self._warm_up_thread: Optional[threading.Thread] = None
+        # Thread pool untuk aretrieve_chunks, dibuat saat pertama kali dipakai
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+        self.rerank_batch_size = AppConfig.RERANKER_BATCH_SIZE
+        start = time.perf_counter()
+        self.score_cache: Optional[RerankerScoreCache] = None
+        self.cascade_score_cache: Optional[RerankerScoreCache] = None
+        if score_cache_path:
+            try:
+                self.score_cache = RerankerScoreCache(
+                    score_cache_path, backend_model_key(RERANKER_MODEL, self.reranker_backend, AppConfig.RERANKER_MAX_LENGTH),
+                    AppConfig.RERANKER_SCORE_CACHE_MAX_ROWS)
+                if self.cascade_model_name:
+                    # File yang sama; skor dipisahkan oleh nama model, backend, dan max_length
+                    self.cascade_score_cache = RerankerScoreCache(
+                        score_cache_path,
+                        backend_model_key(self.cascade_model_name, self.reranker_backend, AppConfig.RERANKER_MAX_LENGTH),
+                        AppConfig.RERANKER_SCORE_CACHE_MAX_ROWS)
+            except Exception as e:
+                logging.warning(f"Cache skor reranker tidak dapat dibuka ({score_cache_path}): {e}")
+        self.startup_timings['score_cache'] = time.perf_counter() - start
+        logging.info(f"Retriever siap untuk retrieval tanpa reranker ({self._format_startup_timings()}).")
+
+        if warm_up_in_background:
+            self.warm_up()
 
     def __str__(self) -> str:
-        is_reranker_loaded = "Yes" if self.reranker else "No"
+        is_reranker_loaded = "Yes" if self._reranker else "No"
         return f"<DocumentRetriever | chunks: {len(self.chunks)} | Reranker Loaded: {is_reranker_loaded}>"
 
-    def _load_data(self):
-        # ... (fungsi ini tidak berubah, sama seperti sebelumnya) ...
+    def _format_startup_timings(self) -> str:
+        """Ringkasan startup_timings untuk log, mis. "index 120 ms, score_cache 3 ms"."""
+        return ", ".join(f"{step} {seconds * 1000:.0f} ms" for step, seconds in self.startup_timings.items())
+
+    def _import_sentence_transformers(self):
+        """Mengimpor sentence_transformers saat pertama kali dibutuhkan (impor PyTorch memakan beberapa detik)."""
+        start = time.perf_counter()
+        import sentence_transformers
+        self.startup_timings.setdefault('import_sentence_transformers', time.perf_counter() - start)
+        return sentence_transformers
+
+    def _load_cross_encoder(self, model_name: str, timing_key: str):
+        """Memuat sebuah CrossEncoder; None jika gagal."""
+        start = time.perf_counter()
+        try:
+            # max_length: batas panjang pasangan query-chunk (lihat AppConfig.RERANKER_MAX_LENGTH)
+            model = self._import_sentence_transformers().CrossEncoder(model_name, max_length=AppConfig.RERANKER_MAX_LENGTH)
+            if self.reranker_backend == 'int8':
+                quantize_int8(model)
+            logging.info(f"Model CrossEncoder {model_name} ({self.reranker_backend}) berhasil dimuat.")
+        except Exception as e:
+            logging.error(f"Gagal memuat model CrossEncoder {model_name}: {e}")
+            model = None
+        self.startup_timings[timing_key] = time.perf_counter() - start
+        return model
+
+    def _start_rerank_service(self, model) -> None:
+        """Membuat worker micro-batching untuk model jika micro-batching aktif."""
+        if self.micro_batching and model is not None:
+            self._rerank_services[id(model)] = MicroBatchReranker(
+                model, AppConfig.RERANKER_MICRO_BATCH_MAX_PAIRS,
+                AppConfig.RERANKER_MICRO_BATCH_WAIT_MS, self.rerank_batch_size)
+
+    def _load_rerankers(self) -> None:
+        """Memuat reranker utama tepat sekali, aman dipanggil dari beberapa thread."""
+        if self._rerankers_loaded:
+            return
+        with self._reranker_lock:
+            if self._rerankers_loaded:
+                return
+            self._reranker = self._load_cross_encoder(RERANKER_MODEL, 'reranker')
+            if self._reranker is not None:
+                configure_torch_threads(AppConfig.RERANKER_NUM_THREADS)
+            self._start_rerank_service(self._reranker)
+            self._rerankers_loaded = True
+
+    def _load_cascade_reranker(self) -> None:
+        """Memuat reranker cascade tepat sekali, aman dipanggil dari beberapa thread."""
+        if self._cascade_loaded:
+            return
+        with self._cascade_lock:
+            if self._cascade_loaded:
+                return
+            if self.cascade_model_name:
+                self._cascade_reranker = self._load_cross_encoder(self.cascade_model_name, 'cascade_reranker')
+                self._start_rerank_service(self._cascade_reranker)
+            self._cascade_loaded = True
+
+    @property
+    def reranker(self):
+        """CrossEncoder utama, dimuat saat pertama kali diakses (None jika gagal dimuat)."""
+        self._load_rerankers()
+        return self._reranker
+
+    @property
+    def cascade_reranker(self):
+        """
+        CrossEncoder cascade, dimuat saat pertama kali diakses, yaitu oleh query pertama
+        dengan cascade_k > 0 (None jika dinonaktifkan atau gagal dimuat).
+        """
+        self._load_cascade_reranker()
+        return self._cascade_reranker
+
+    def rerank_queue_stats(self) -> Optional[Dict[str, float]]:
+        """
+        Statistik worker micro-batching reranker utama (lihat MicroBatchReranker.stats).
+
+        Returns:
+            Dict[str, float] | None: Statistik, atau None jika micro-batching tidak aktif
+            atau reranker belum dimuat.
+        """
+        service = self._rerank_services.get(id(self._reranker)) if self._reranker is not None else None
+        return service.stats() if service is not None else None
+
+    @property
+    def reranker_ready(self) -> bool:
+        """True jika pemuatan reranker sudah selesai (berhasil atau gagal); tidak memicu pemuatan."""
+        return self._rerankers_loaded
+
+    @property
+    def embedding_model(self):
+        """
+        Encoder query SentenceTransformer, dimuat saat pertama kali diakses.
+
+        Encoder query harus model yang sama dengan yang menghasilkan embedding chunk, sehingga
+        model dimuat ulang jika indeks baru memakai model lain. None jika indeks tidak
+        memiliki embedding atau model gagal dimuat.
+        """
+        return self._embedding_model_for(self._state)
+
+    def _embedding_model_for(self, state: _IndexState):
+        """Encoder query untuk embedding chunk pada versi indeks state (lihat embedding_model)."""
+        if not state.has_embeddings or not state.embedding_model_name:
+            return None
+        with self._embedding_lock:
+            if self._embedding_model_loaded_name != state.embedding_model_name:
+                start = time.perf_counter()
+                try:
+                    self._embedding_model = self._import_sentence_transformers().SentenceTransformer(state.embedding_model_name)
+                    logging.info(f"Model embedding {state.embedding_model_name} berhasil dimuat.")
+                except Exception as e:
+                    logging.error(f"Gagal memuat model embedding {state.embedding_model_name}: {e}")
+                    self._embedding_model = None
+                # Nama dicatat juga saat gagal agar pemuatan tidak diulang di setiap query
+                self._embedding_model_loaded_name = state.embedding_model_name
+                self.startup_timings['embedding_model'] = time.perf_counter() - start
+            return self._embedding_model
+
+    def warm_up(self, background: bool = True) -> Optional[threading.Thread]:
+        """
+        Memuat model embedding dan reranker lebih awal, lalu menjalankan satu prediksi
+        pemanasan per reranker, agar query pertama tidak menanggung waktu muat model.
+
+        Args:
+            background (bool): Jika True, pemanasan berjalan di thread daemon dan retrieval
+                tanpa reranker tetap dapat dilayani selama model dimuat. Query dengan reranker
+                yang datang saat itu menunggu hingga reranker siap.
+
+        Returns:
+            threading.Thread | None: Thread pemanasan, atau None jika dijalankan langsung.
+        """
+        if not background:
+            self._warm_up()
+            return None
+        if self._warm_up_thread is None or not self._warm_up_thread.is_alive():
+            self._warm_up_thread = threading.Thread(target=self._warm_up, name="retriever-warm-up", daemon=True)
+            self._warm_up_thread.start()
+        return self._warm_up_thread
+
+    def _warm_up(self) -> None:
+        """Isi warm_up: muat semua model dan jalankan prediksi pemanasan."""
+        # Mengakses property memicu pemuatan model
+        self.embedding_model
+        # Reranker cascade tidak dipanaskan: dimuat saat query cascade pertama
+        chunks = self._state.chunks
+        if self.reranker is not None and len(chunks):
+            start = time.perf_counter()
+            try:
+                # Lewat _predict agar dengan micro-batching model hanya dipanggil dari thread worker,
+                # tidak bersamaan dengan batch query yang sudah berjalan
+                self._predict(self.reranker, [["pemanasan", chunks[0]]])
+            except Exception as e:
+                logging.warning(f"Prediksi pemanasan reranker gagal: {e}")
+            self.startup_timings['reranker_warm_up'] = time.perf_counter() - start
+        logging.info(f"Pemanasan model selesai ({self._format_startup_timings()}).")
+
+    def _load_data(self) -> None:
+        """Memuat indeks dari disk lalu mengganti versi indeks yang dipakai query sekaligus."""
+        state = self._load_state()
+        previous, self._state = self._state, state
+        if previous.shard_searcher is not None:
+            previous.shard_searcher.close()
+
+    def _load_state(self) -> _IndexState:
+        """
+        Memuat data retriever. Direktori dianggap indeks mmap (ditulis perda_processor.py),
+        sedangkan file dianggap pickle format lama.
+
+        Returns:
+            _IndexState: Versi indeks yang dimuat (tanpa chunks jika gagal dimuat).
+        """
+        state = _IndexState(self._index_version())
         if not os.path.exists(self.data_path):
             logging.error(f"File data tidak ditemukan: {self.data_path}.")
-            return
+            return state
         
         try:
-            data = joblib.load(self.data_path)
-            self.chunks = data.get('chunks', [])
-            self.vectorizer = data.get('vectorizer')
-            self.tfidf_matrix = data.get('tfidf_matrix')
+            if os.path.isdir(self.data_path):
+                if self.shard_workers:
+                    state.shard_searcher = self._start_shard_searcher()
+                # Dengan worker shard, array scoring utuh (TF-IDF, BM25, embedding) tidak dimuat di proses ini
+                scoring = state.shard_searcher is None
+                # Array di-memory-map: startup instan dan halaman dibagi antar-proses lewat page cache
+                state.chunks, state.vectorizer, state.tfidf_matrix = load_index(self.data_path, scoring=scoring)
+                state.chunk_metadata = load_chunk_metadata(self.data_path)
+                if scoring:
+                    state.bm25_index = load_bm25_index(self.data_path)
+                    # Embedding float16 di-memory-map; tidak ada salinan float32 di memori
+                    embeddings = load_chunk_embeddings(self.data_path)
+                    if embeddings is not None:
+                        state.chunk_embeddings, state.embedding_model_name = embeddings
+                        state.ann_index = load_ann_index(self.data_path)
+                else:
+                    state.embedding_model_name = state.shard_searcher.embedding_model
+            else:
+                data = joblib.load(self.data_path)
+                state.chunks = data.get('chunks', [])
+                state.vectorizer = data.get('vectorizer')
+                state.tfidf_matrix = data.get('tfidf_matrix')
+                if data.get('chunk_metadata'):
+                    state.chunk_metadata = ChunkMetadata(data.get('documents', []), data['chunk_metadata'],
+                                                         data.get('duplicate_metadata'), data.get('document_attributes'))
+                state.bm25_index = data.get('bm25_index')
+                if data.get('chunk_embeddings') is not None:
+                    state.chunk_embeddings = data['chunk_embeddings']
+                    state.embedding_model_name = data.get('embedding_model')
+                    state.ann_index = data.get('ann_index')
             
-            if not self.chunks or self.vectorizer is None or self.tfidf_matrix is None:
+            if not state.ready:
                 logging.error("Data yang dimuat tidak lengkap.")
-                self.chunks, self.vectorizer, self.tfidf_matrix = [], None, None
-                return
+                self._discard_state(state)
+                return state
 
-            logging.info(f"Data retriever (TF-IDF) berhasil dimuat. Total chunks: {len(self.chunks)}")
+            first_stages = ", ".join(
+                ["TF-IDF"] + (["BM25"] if state.has_bm25 else [])
+                + (["embedding"] if state.has_embeddings else [])
+                + (["ANN IVF-PQ"] if state.ann_index is not None else [])
+                + ([f"{len(state.shard_searcher)} shard"] if state.shard_searcher is not None else [])
+            )
+            logging.info(f"Data retriever ({first_stages}) berhasil dimuat. Total chunks: {len(state.chunks)}")
         except Exception as e:
             logging.error(f"Gagal memuat data dari {self.data_path}: {e}")
-            self.chunks, self.vectorizer, self.tfidf_matrix = [], None, None
+            self._discard_state(state)
+        return state
+
+    @staticmethod
+    def _discard_state(state: _IndexState) -> None:
+        """Mengosongkan versi indeks yang gagal dimuat dan menghentikan worker shard-nya."""
+        if state.shard_searcher is not None:
+            state.shard_searcher.close()
+            state.shard_searcher = None
+        state.chunks, state.vectorizer, state.tfidf_matrix = [], None, None
+
+    def _start_shard_searcher(self) -> Optional[ShardedSearcher]:
+        """Menjalankan proses worker per shard; jika gagal (None), scoring dilakukan di proses ini."""
+        try:
+            return ShardedSearcher(self.data_path)
+        except ValueError as e:
+            logging.warning(f"{e} Scoring tahap pertama dilakukan tanpa shard.")
+        except Exception as e:
+            logging.error(f"Gagal menjalankan worker shard: {e}. Scoring tahap pertama dilakukan tanpa shard.")
+        return None
+
+    def _index_version(self) -> Optional[tuple]:
+        """
+        Versi indeks di disk: inode, waktu modifikasi, dan ukuran meta.json (atau file pickle).
+
+        save_index menulis direktori baru lalu me-rename-nya, sehingga setiap build
+        menghasilkan versi yang berbeda.
+        """
+        path = os.path.join(self.data_path, META_FILE) if os.path.isdir(self.data_path) else self.data_path
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _refresh_if_index_changed(self) -> None:
+        """Memuat ulang indeks dan mengosongkan cache query jika file indeks berubah."""
+        if self._index_version() == self._state.index_version:
+            return
+        with self._reload_lock:
+            # Query lain mungkin sudah memuat ulang indeks selama menunggu lock
+            if self._index_version() != self._state.index_version:
+                logging.info(f"Indeks {self.data_path} berubah. Memuat ulang data dan mengosongkan cache query.")
+                self._load_data()
+                self.query_cache.clear()
+
+    def _rerank_candidates(self, state: _IndexState, queries: Sequence[str], candidate_lists: Sequence[np.ndarray],
+                           cascade_k: int = 0, cancel_event: Optional[threading.Event] = None,
+                           timings: Optional[List[Dict[str, float]]] = None) -> List[Tuple[List[int], np.ndarray]]:
+        """
+        Reranking kandidat tahap pertama untuk satu atau beberapa query.
+
+        Jika cascade_k > 0 dan reranker cascade tersedia, semua kandidat lebih dulu diskor
+        oleh reranker ringan, dan hanya cascade_k kandidat teratas per query yang diskor
+        ulang oleh reranker utama.
+
+        Args:
+            state (_IndexState): Versi indeks yang dipakai query.
+            queries (Sequence[str]): Pertanyaan.
+            candidate_lists (Sequence[np.ndarray]): Indeks chunk kandidat per query.
+            cascade_k (int): Jumlah kandidat per query yang diteruskan ke reranker utama (0 = tanpa cascade).
+            cancel_event (threading.Event | None): Sinyal pembatalan (lihat retrieve_chunks).
+            timings (List[Dict[str, float]] | None): Jika diberikan, diisi waktu per micro-batch
+                kedua tahap untuk panggilan ini saja (lihat reranking.predict_bucketed).
+
+        Returns:
+            List[Tuple[List[int], np.ndarray]]: (indeks chunk, skor reranker utama) per query,
+            belum diurutkan berdasarkan skor.
+        """
+        candidate_lists = [np.asarray(candidates) for candidates in candidate_lists]
+        # Query yang kandidatnya tidak lebih dari cascade_k langsung diskor reranker utama
+        filtered = [q for q, candidates in enumerate(candidate_lists) if 0 < cascade_k < len(candidates)]
+        if filtered and self.cascade_reranker is not None:
+            pairs = [(queries[q], i) for q in filtered for i in candidate_lists[q].tolist()]
+            cascade_scores = self._rerank(state, pairs, self.cascade_reranker, self.cascade_score_cache,
+                                          cancel_event, timings)
+            offset = 0
+            for q in filtered:
+                scores = cascade_scores[offset:offset + len(candidate_lists[q])]
+                offset += len(candidate_lists[q])
+                candidate_lists[q] = select_top_k(candidate_lists[q], scores, cascade_k)[0]
+            logging.info(f"Reranker cascade menyaring {len(pairs)} kandidat menjadi "
+                         f"{len(filtered) * cascade_k} untuk reranker utama.")
+
+        pairs = [(query, i) for query, candidates in zip(queries, candidate_lists) for i in candidates.tolist()]
+        scores = self._rerank(state, pairs, self.reranker, self.score_cache, cancel_event, timings)
+        results, offset = [], 0
+        for candidates in candidate_lists:
+            results.append((candidates.tolist(), scores[offset:offset + len(candidates)]))
+            offset += len(candidates)
+        return results
+
+    def _rerank(self, state: _IndexState, pairs: List[Tuple[str, int]], model, score_cache: Optional[RerankerScoreCache],
+                cancel_event: Optional[threading.Event] = None,
+                timings: Optional[List[Dict[str, float]]] = None) -> np.ndarray:
+        """
+        Menghitung skor reranker untuk pasangan (query, indeks chunk).
+
+        Skor yang sudah ada di cache skor dipakai langsung; hanya pasangan yang belum
+        pernah diskor yang dikirim ke reranker dalam micro-batch berdasarkan panjang,
+        lalu skornya disimpan ke cache.
+
+        Args:
+            state (_IndexState): Versi indeks yang dipakai query.
+            pairs (List[Tuple[str, int]]): Pasangan (query, indeks chunk).
+            model: Model CrossEncoder yang dipakai.
+            score_cache (RerankerScoreCache | None): Cache skor untuk model tersebut.
+            cancel_event (threading.Event | None): Sinyal pembatalan, diperiksa per micro-batch.
+            timings (List[Dict[str, float]] | None): Jika diberikan, diisi waktu per micro-batch.
+
+        Returns:
+            np.ndarray: Skor reranker, sejajar dengan pairs.
+        """
+        if score_cache is None:
+            return self._predict(model, [[query, state.chunks[i]] for query, i in pairs], cancel_event, timings)
+
+        keys = [(normalize_query(query), chunk_key(state.chunks[i])) for query, i in pairs]
+        keys_by_query: Dict[str, List[str]] = {}
+        for query, key in keys:
+            keys_by_query.setdefault(query, []).append(key)
+        cached: Dict[Tuple[str, str], float] = {}
+        for query, query_keys in keys_by_query.items():
+            found = score_cache.get_many(query, query_keys)
+            cached.update(((query, key), score) for key, score in found.items())
+
+        # Skor disimpan sebagai float32 seperti keluaran predict agar hasil cache dan non-cache identik
+        scores = np.empty(len(pairs), dtype=np.float32)
+        missing = []
+        for position, key in enumerate(keys):
+            if key in cached:
+                scores[position] = cached[key]
+            else:
+                missing.append(position)
+        if missing:
+            predicted = self._predict(model, [[pairs[p][0], state.chunks[pairs[p][1]]] for p in missing],
+                                      cancel_event, timings)
+            scores[missing] = predicted
+            score_cache.put_many([(*keys[p], score) for p, score in zip(missing, scores[missing].tolist())])
+        logging.info(f"Skor reranker: {len(pairs) - len(missing)} dari cache, {len(missing)} dihitung model.")
+        return scores
+
+    def _predict(self, model, rerank_pairs: List[List[str]], cancel_event: Optional[threading.Event] = None,
+                 timings: Optional[List[Dict[str, float]]] = None) -> np.ndarray:
+        """
+        Skor reranker untuk pasangan [query, chunk] dengan micro-batch berdasarkan panjang.
+        Waktu per batch ditambahkan ke timings milik pemanggil (jika ada), bukan ke atribut
+        instance, sehingga query serentak tidak saling menimpa.
+        """
+        call_timings: List[Dict[str, float]] = []
+        service = self._rerank_services.get(id(model))
+        if service is not None:
+            # Digabung dengan request serentak lain; timings berisi batch gabungannya
+            scores = service.predict(rerank_pairs, call_timings, cancel_event)
+        else:
+            scores = predict_bucketed(model, rerank_pairs, self.rerank_batch_size, call_timings, cancel_event)
+        if timings is not None:
+            timings.extend(call_timings)
+        if call_timings:
+            slowest = max(entry['seconds'] for entry in call_timings)
+            total = sum(entry['seconds'] for entry in call_timings)
+            logging.info(
+                f"Reranking {len(rerank_pairs)} pasangan dalam {len(call_timings)} batch: "
+                f"{total * 1000:.0f} ms (batch terlama {slowest * 1000:.0f} ms)."
+            )
+        return scores
+
+    def _format_results(self, state: _IndexState, scored_indices: List[Tuple[int, float]],
+                        return_metadata: bool) -> List[tuple]:
+        """Mengubah pasangan (indeks chunk, skor) menjadi tuple hasil retrieval."""
+        if not return_metadata:
+            return [(state.chunks[i], score) for i, score in scored_indices]
+        return [(state.chunks[i], score, self._chunk_metadata(state, i)) for i, score in scored_indices]
+
+    def _resolve_first_stage(self, first_stage: str, state: Optional[_IndexState] = None) -> str:
+        """
+        Memvalidasi first_stage untuk versi indeks state (default: versi saat ini); kembali ke
+        'tfidf' jika tidak dikenal atau data yang dibutuhkan tidak tersedia.
+        """
+        state = self._state if state is None else state
+        if first_stage not in FIRST_STAGES:
+            logging.warning(f"Tahap pertama '{first_stage}' tidak dikenal. Menggunakan TF-IDF.")
+            return 'tfidf'
+        if first_stage == 'bm25' and not state.has_bm25:
+            logging.warning("Indeks BM25 tidak tersedia (bangun ulang indeks tanpa --no-bm25). Menggunakan TF-IDF.")
+            return 'tfidf'
+        if first_stage == 'hybrid' and (not state.has_embeddings or self._embedding_model_for(state) is None):
+            logging.warning("Embedding chunk atau model embedding tidak tersedia (bangun indeks dengan --embeddings). "
+                            "Menggunakan TF-IDF.")
+            return 'tfidf'
+        return first_stage
+
+    def _scope_rows(self, state: _IndexState, documents: Optional[Sequence[str]], levels: Optional[Sequence[str]],
+                    years: Optional[Sequence[int]]) -> Optional[np.ndarray]:
+        """Baris chunk dalam cakupan filter (None jika tanpa filter atau metadata tidak tersedia)."""
+        if documents is None and levels is None and years is None:
+            return None
+        if state.chunk_metadata is None:
+            logging.warning("Indeks tidak menyimpan metadata chunk. Filter dokumen diabaikan.")
+            return None
+        rows = state.chunk_metadata.scope_rows(documents, levels, years)
+        logging.info(f"Cakupan filter: {len(rows)} dari {len(state.chunks)} chunk.")
+        return rows
+
+    def scope_size(self, documents: Optional[Sequence[str]] = None, levels: Optional[Sequence[str]] = None,
+                   years: Optional[Sequence[int]] = None) -> Optional[int]:
+        """
+        Jumlah chunk dalam cakupan filter (lihat retrieve_chunks), mis. untuk memberi tahu
+        pengguna sebelum retrieval bahwa indeks tidak memuat dokumen untuk cakupan tersebut.
+
+        Returns:
+            int | None: Jumlah chunk, atau None jika tanpa filter atau indeks tidak menyimpan
+            metadata chunk (filter diabaikan).
+        """
+        rows = self._scope_rows(self._state, documents, levels, years)
+        return None if rows is None else len(rows)
+
+    def _resolve_cascade_k(self, cascade_k: int, use_reranker: bool) -> int:
+        """cascade_k efektif: 0 jika reranker tidak dipakai atau reranker cascade tidak tersedia."""
+        if cascade_k <= 0 or not use_reranker or self.reranker is None:
+            return 0
+        if self.cascade_reranker is None:
+            logging.warning("Reranker cascade tidak tersedia. Semua kandidat diskor reranker utama.")
+            return 0
+        return cascade_k
+
+    def _first_stage_top_k(self, state: _IndexState, query: str, k: int, first_stage: str,
+                           rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Mengambil k kandidat teratas dari retrieval tahap pertama (TF-IDF atau BM25).
+
+        Args:
+            state (_IndexState): Versi indeks yang dipakai query.
+            query (str): Pertanyaan pengguna.
+            k (int): Jumlah kandidat.
+            first_stage (str): 'tfidf', 'bm25', atau 'hybrid'.
+            rows (np.ndarray | None): Jika diberikan, hanya chunk di baris ini yang diskor
+                (lihat ChunkMetadata.scope_rows).
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (indeks chunk, skor) terurut dari skor tertinggi.
+            Untuk 'hybrid', skor adalah skor reciprocal rank fusion.
+        """
+        if first_stage == 'bm25':
+            if isinstance(state.vectorizer, QueryVectorizer):
+                columns, query_counts = state.vectorizer.lookup(state.vectorizer.tokenize(query))
+            else:
+                # Vectorizer sklearn dari pickle format lama
+                vocabulary = state.vectorizer.vocabulary_
+                terms = [term for term in state.vectorizer.build_analyzer()(query) if term in vocabulary]
+                columns, query_counts = np.unique([vocabulary[term] for term in terms], return_counts=True)
+            if state.shard_searcher is not None:
+                return state.shard_searcher.bm25_top_k(columns, query_counts, k, rows)
+            row_mask = None
+            if rows is not None:
+                row_mask = np.zeros(len(state.chunks), dtype=bool)
+                row_mask[rows] = True
+            return bm25_top_k(state.bm25_index, columns, query_counts, k, row_mask=row_mask)
+        # Ambil kandidat teratas (skor > 0) dengan partial sort, bukan argsort seluruh chunk
+        query_vector = state.vectorizer.transform([query])
+        if state.shard_searcher is not None:
+            lexical = state.shard_searcher.tfidf_top_k(query_vector, k, rows)
+        else:
+            lexical = tfidf_top_k(query_vector, state.tfidf_matrix, k, rows)
+        if first_stage == 'hybrid':
+            query_embedding = self._embedding_model_for(state).encode([query], normalize_embeddings=True,
+                                                                      convert_to_numpy=True)[0]
+            return self._fuse(state, lexical, query_embedding, k, rows)
+        return lexical
+
+    def _fuse(self, state: _IndexState, lexical: Tuple[np.ndarray, np.ndarray], query_embedding: np.ndarray,
+              k: int, rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Menggabungkan k kandidat TF-IDF dan k kandidat embedding dengan reciprocal rank fusion."""
+        if state.shard_searcher is not None:
+            dense_indices, _ = state.shard_searcher.dense_top_k(query_embedding, k, rows)
+        elif rows is not None:
+            # Cakupan terfilter: skor exact pada baris terpilih saja (ANN tidak mendukung filter)
+            dense_indices, _ = dense_top_k(query_embedding, state.chunk_embeddings, k, rows)
+        elif state.ann_index is not None:
+            dense_indices, _ = state.ann_index.search(query_embedding, k, self.ann_nprobe, self.ann_refine_factor,
+                                                      state.chunk_embeddings)
+        else:
+            dense_indices, _ = dense_top_k(query_embedding, state.chunk_embeddings, k)
+        return reciprocal_rank_fusion([lexical[0], dense_indices], k)
+
+    def get_chunk_metadata(self, index: int) -> Optional[Dict[str, Any]]:
+        """
+        Mengambil metadata sebuah chunk (dokumen, halaman, BAB/Pasal, offset karakter),
+        beserta lokasi salinan near-duplicate yang diwakilinya di field 'duplicates'.
+        
+        Args:
+            index (int): Indeks chunk.
+
+        Returns:
+            Dict[str, Any] | None: Metadata chunk, atau None jika indeks tidak menyimpan metadata.
+        """
+        return self._chunk_metadata(self._state, index)
+
+    @staticmethod
+    def _chunk_metadata(state: _IndexState, index: int) -> Optional[Dict[str, Any]]:
+        if state.chunk_metadata is None:
+            return None
+        return state.chunk_metadata.record(index)
 
     # --- PERUBAHAN UTAMA DI SINI ---
-    def retrieve_chunks(self, query: str, top_k: int = 5, initial_k: int = 50, use_reranker: bool = True) -> List[Tuple[str, float]]:
+    def retrieve_chunks(self, query: str, top_k: int = 5, initial_k: int = 50, use_reranker: bool = True,
+                        return_metadata: bool = False, first_stage: str = "tfidf",
+                        cascade_k: int = 0, cancel_event: Optional[threading.Event] = None,
+                        documents: Optional[Sequence[str]] = None, levels: Optional[Sequence[str]] = None,
+                        years: Optional[Sequence[int]] = None) -> List[tuple]:
         """
         Mengambil potongan dokumen (chunks) yang relevan.
         
         Args:
             query (str): Pertanyaan pengguna.
             top_k (int): Jumlah hasil akhir yang diinginkan.
-            initial_k (int): Jumlah kandidat awal yang diambil oleh TF-IDF (hanya digunakan jika reranker aktif).
-            use_reranker (bool): Jika True, gunakan reranker. Jika False, kembalikan hasil TF-IDF.
+            initial_k (int): Jumlah kandidat awal yang diambil tahap pertama (hanya digunakan jika reranker aktif).
+            use_reranker (bool): Jika True, gunakan reranker. Jika False, kembalikan hasil tahap pertama.
+            return_metadata (bool): Jika True, setiap hasil menyertakan metadata chunk
+                (lihat get_chunk_metadata) sebagai elemen ketiga.
+            first_stage (str): Retrieval tahap pertama: 'tfidf', 'bm25', atau 'hybrid' (TF-IDF
+                dan embedding dense digabung dengan reciprocal rank fusion). Jika data yang
+                dibutuhkan tidak ada di indeks, TF-IDF digunakan.
+            cascade_k (int): Jika > 0, reranker cascade (ringan) menyaring initial_k kandidat
+                menjadi cascade_k kandidat sebelum diskor reranker utama. 0 = semua kandidat
+                diskor reranker utama.
+            cancel_event (threading.Event | None): Jika di-set (dari thread lain), retrieval
+                berhenti di antara tahap atau micro-batch reranker berikutnya dan melempar
+                concurrent.futures.CancelledError. Dipakai oleh aretrieve_chunks.
+            documents (Sequence[str] | None): Hanya ambil chunk dari dokumen (nama file) ini.
+            levels (Sequence[str] | None): Hanya ambil chunk dari jenis peraturan ini, mis.
+                ['perda'] atau index_store.NATIONAL_LEVELS (lihat REGULATION_LEVELS).
+            years (Sequence[int] | None): Hanya ambil chunk dari peraturan tahun ini.
+                Filter digabung dengan AND dan hanya baris chunk dalam cakupan yang diskor.
+                Jika indeks tidak menyimpan metadata chunk, filter diabaikan.
 
         Returns:
-            List[Tuple[str, float]]: Daftar tuple berisi (chunk, skor). Skor adalah dari reranker atau TF-IDF.
+            List[tuple]: Daftar tuple berisi (chunk, skor), atau (chunk, skor, metadata) jika
+            return_metadata=True. Skor adalah dari reranker atau tahap pertama (TF-IDF/BM25).
+            Query yang sama (setelah normalize_query; untuk hybrid tanpa menyeragamkan huruf
+            besar) dengan parameter dan versi indeks yang
+            sama dilayani dari cache.
         """
-        if not self.chunks or self.vectorizer is None or self.tfidf_matrix is None:
+        self._refresh_if_index_changed()
+        # Satu snapshot indeks untuk seluruh query, walaupun indeks dimuat ulang di tengah jalan
+        state = self._state
+        if not state.ready:
             logging.warning("Retriever TF-IDF tidak siap.")
             return []
             
         if not query.strip():
             return []
         
-        # --- Tahap 1: Initial Retrieval (TF-IDF) ---
-        query_vector = self.vectorizer.transform([query])
-        cosine_similarities = cosine_similarity(query_vector, self.tfidf_matrix).flatten()
-        
+        first_stage = self._resolve_first_stage(first_stage, state)
+        cascade_k = self._resolve_cascade_k(cascade_k, use_reranker)
+        rows = self._scope_rows(state, documents, levels, years)
+        scope = None if rows is None else tuple(
+            tuple(sorted(values)) if values is not None else None for values in (documents, levels, years))
+        # Kunci memuat reranker efektif (bukan hanya yang diminta) agar hasil fallback tidak tertukar;
+        # huruf besar hanya diabaikan jika tahap pertama leksikal (model embedding hybrid cased)
+        cache_key = (normalize_query(query, lowercase=first_stage != 'hybrid'), top_k, initial_k,
+                     bool(use_reranker and self.reranker), return_metadata, first_stage, cascade_k, scope,
+                     state.index_version)
+        cached = self.query_cache.get(cache_key)
+        if cached is not None:
+            logging.debug(f"Cache hit untuk query: {cache_key[0]}")
+            return cached
+
+        results = self._retrieve_uncached(state, query, top_k, initial_k, use_reranker, return_metadata, first_stage,
+                                          cascade_k, cancel_event, rows)
+        self.query_cache.put(cache_key, results)
+        return results
+
+    async def aretrieve_chunks(self, query: str, top_k: int = 5, initial_k: int = 50, use_reranker: bool = True,
+                               return_metadata: bool = False, first_stage: str = "tfidf",
+                               cascade_k: int = 0, documents: Optional[Sequence[str]] = None,
+                               levels: Optional[Sequence[str]] = None,
+                               years: Optional[Sequence[int]] = None) -> List[tuple]:
+        """
+        Versi async retrieve_chunks: scoring dan reranking dijalankan di thread pool
+        berukuran tetap (AppConfig.RETRIEVAL_WORKERS), sehingga event loop tetap bebas
+        melayani request lain (mis. menunggu respons LLM) selama retrieval berjalan.
+
+        Jika task dibatalkan (mis. oleh asyncio.wait_for atau sesi yang ditutup), retrieval
+        yang belum mulai tidak dijalankan, dan yang sedang berjalan berhenti di antara tahap
+        atau micro-batch reranker berikutnya.
+
+        Args:
+            query (str): Pertanyaan pengguna.
+            top_k (int): Jumlah hasil akhir yang diinginkan.
+            initial_k (int): Jumlah kandidat awal untuk reranker.
+            use_reranker (bool): Jika True, gunakan reranker.
+            return_metadata (bool): Jika True, setiap hasil menyertakan metadata chunk.
+            first_stage (str): Retrieval tahap pertama, 'tfidf', 'bm25', atau 'hybrid'.
+            cascade_k (int): Jumlah kandidat untuk reranker utama pada mode cascade (0 = tanpa cascade).
+            documents, levels, years: Filter cakupan dokumen (lihat retrieve_chunks).
+
+        Returns:
+            List[tuple]: Sama seperti retrieve_chunks.
+        """
+        cancel_event = threading.Event()
+        call = functools.partial(self.retrieve_chunks, query, top_k, initial_k, use_reranker, return_metadata,
+                                 first_stage, cascade_k, cancel_event=cancel_event, documents=documents,
+                                 levels=levels, years=years)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), call)
+        except asyncio.CancelledError:
+            cancel_event.set()
+            raise
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Thread pool retrieval async, dibuat sekali."""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=max(1, AppConfig.RETRIEVAL_WORKERS),
+                                                    thread_name_prefix="retrieval")
+            return self._executor
+
+    def close(self) -> None:
+        """Menghentikan thread pool async, worker micro-batching, dan worker shard, lalu menutup cache skor."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        for service in self._rerank_services.values():
+            service.close()
+        self._rerank_services.clear()
+        if self._state.shard_searcher is not None:
+            self._state.shard_searcher.close()
+            self._state.shard_searcher = None
+        for cache in (self.score_cache, self.cascade_score_cache):
+            if cache is not None:
+                cache.close()
+        self.score_cache, self.cascade_score_cache = None, None
+
+    def _retrieve_uncached(self, state: _IndexState, query: str, top_k: int, initial_k: int, use_reranker: bool,
+                           return_metadata: bool, first_stage: str, cascade_k: int,
+                           cancel_event: Optional[threading.Event] = None,
+                           rows: Optional[np.ndarray] = None) -> List[tuple]:
+        """Pipeline retrieval (tahap pertama dan reranking) untuk retrieve_chunks, tanpa cache."""
+        raise_if_cancelled(cancel_event)
+        stage_name = FIRST_STAGE_LABELS[first_stage]
+
+        # --- Tahap 1: Initial Retrieval (TF-IDF/BM25) ---
         # Tentukan berapa banyak kandidat yang perlu diambil
         # Jika tidak pakai reranker, cukup ambil top_k. Jika pakai, ambil initial_k.
         num_candidates = initial_k if use_reranker and self.reranker else top_k
         
-        # Ambil indeks kandidat teratas
-        top_indices = cosine_similarities.argsort()[-num_candidates:][::-1]
+        top_indices, top_scores = self._first_stage_top_k(state, query, num_candidates, first_stage, rows)
         
         # --- Logika Pemilihan Versi ---
         
         # Versi 1: TANPA RERANKER (Baseline)
         if not use_reranker or not self.reranker:
             if not use_reranker:
-                logging.info(f"Reranker tidak digunakan. Mengembalikan top {top_k} hasil dari TF-IDF.")
+                logging.info(f"Reranker tidak digunakan. Mengembalikan top {top_k} hasil dari {stage_name}.")
             else: # self.reranker is None but use_reranker was True
-                logging.warning("Reranker diminta tetapi tidak tersedia. Mengembalikan hasil dari TF-IDF.")
+                logging.warning(f"Reranker diminta tetapi tidak tersedia. Mengembalikan hasil dari {stage_name}.")
             
-            # Kembalikan hasil teratas dari TF-IDF beserta skornya
-            results = [(self.chunks[i], cosine_similarities[i]) for i in top_indices if cosine_similarities[i] > 0]
-            return results[:top_k]
+            # Kembalikan hasil teratas dari tahap pertama beserta skornya
+            results = list(zip(top_indices.tolist(), top_scores.tolist()))
+            return self._format_results(state, results[:top_k], return_metadata)
 
         # Versi 2: DENGAN RERANKER
-        initial_chunks = [self.chunks[i] for i in top_indices if cosine_similarities[i] > 0]
-        if not initial_chunks:
+        initial_indices = top_indices.tolist()
+        if not initial_indices:
             return []
-            
-        logging.info(f"TF-IDF menemukan {len(initial_chunks)} kandidat awal. Melanjutkan ke reranking...")
+        logging.info(f"{stage_name} menemukan {len(initial_indices)} kandidat awal. Melanjutkan ke reranking...")
         
-        rerank_pairs = [[query, chunk] for chunk in initial_chunks]
-        scores = self.reranker.predict(rerank_pairs)
+        raise_if_cancelled(cancel_event)
+        reranked_indices, scores = self._rerank_candidates(state, [query], [top_indices], cascade_k, cancel_event)[0]
         
-        scored_chunks = list(zip(initial_chunks, scores))
+        scored_chunks = list(zip(reranked_indices, scores))
         scored_chunks.sort(key=lambda x: x[1], reverse=True)
         
         final_results = scored_chunks[:top_k]
         logging.info(f"Reranker selesai. Mengembalikan top {len(final_results)} hasil dengan skor.")
         
-        return final_results
\ No newline at end of file
+        return self._format_results(state, final_results, return_metadata)
+
+    def retrieve_chunks_batch(self, queries: Sequence[str], top_k: int = 5, initial_k: int = 50,
+                              use_reranker: bool = True, return_metadata: bool = False,
+                              first_stage: str = "tfidf", cascade_k: int = 0) -> List[List[tuple]]:
+        """
+        Versi batch retrieve_chunks untuk banyak query sekaligus (mis. evaluasi).
+
+        Semua query di-vectorize sekaligus dan diskor TF-IDF dengan satu perkalian sparse
+        matriks-matriks (BM25 tetap diskor per query; untuk hybrid, embedding semua query
+        juga di-encode dalam satu batch), lalu semua pasangan query-kandidat dikirim ke
+        reranker bersama-sama (micro-batch berdasarkan panjang). Kandidat per query sama
+        dengan memanggil retrieve_chunks untuk setiap query; skor reranker hanya dapat
+        berbeda sangat kecil karena padding batch yang berbeda. Hasil batch tidak memakai
+        cache query.
+
+        Args:
+            queries (Sequence[str]): Daftar pertanyaan.
+            top_k (int): Jumlah hasil akhir per query.
+            initial_k (int): Jumlah kandidat awal per query (hanya digunakan jika reranker aktif).
+            use_reranker (bool): Jika True, gunakan reranker. Jika False, kembalikan hasil tahap pertama.
+            return_metadata (bool): Jika True, setiap hasil menyertakan metadata chunk.
+            first_stage (str): Retrieval tahap pertama, 'tfidf', 'bm25', atau 'hybrid'.
+            cascade_k (int): Jumlah kandidat per query yang diteruskan dari reranker cascade ke
+                reranker utama (0 = tanpa cascade).
+
+        Returns:
+            List[List[tuple]]: Hasil per query, sejajar dengan queries, dengan format yang
+            sama seperti retrieve_chunks.
+        """
+        self._refresh_if_index_changed()
+        state = self._state
+        if not state.ready:
+            logging.warning("Retriever tidak siap.")
+            return [[] for _ in queries]
+
+        first_stage = self._resolve_first_stage(first_stage, state)
+        rerank = use_reranker and self.reranker is not None
+        if use_reranker and not rerank:
+            logging.warning("Reranker diminta tetapi tidak tersedia. Mengembalikan hasil tahap pertama.")
+        num_candidates = initial_k if rerank else top_k
+        cascade_k = self._resolve_cascade_k(cascade_k, use_reranker)
+
+        # --- Tahap 1: Initial Retrieval untuk semua query non-kosong ---
+        active = [i for i, query in enumerate(queries) if query.strip()]
+        candidates: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        if first_stage in ('tfidf', 'hybrid') and active:
+            active_queries = [queries[i] for i in active]
+            query_matrix = state.vectorizer.transform(active_queries)
+            if state.shard_searcher is not None:
+                lexical = state.shard_searcher.tfidf_top_k_batch(query_matrix, num_candidates)
+            else:
+                lexical = tfidf_top_k_batch(query_matrix, state.tfidf_matrix, num_candidates)
+            candidates = dict(zip(active, lexical))
+            if first_stage == 'hybrid':
+                query_embeddings = self._embedding_model_for(state).encode(active_queries, normalize_embeddings=True,
+                                                                           convert_to_numpy=True)
+                for i, query_embedding in zip(active, query_embeddings):
+                    candidates[i] = self._fuse(state, candidates[i], query_embedding, num_candidates)
+        else:
+            for i in active:
+                candidates[i] = self._first_stage_top_k(state, queries[i], num_candidates, first_stage)
+
+        results: List[List[tuple]] = [[] for _ in queries]
+        if not rerank:
+            for i, (top_indices, top_scores) in candidates.items():
+                scored = list(zip(top_indices.tolist(), top_scores.tolist()))
+                results[i] = self._format_results(state, scored[:top_k], return_metadata)
+            return results
+
+        # --- Tahap 2: Reranking semua pasangan query sekaligus ---
+        num_pairs = sum(len(top_indices) for top_indices, _ in candidates.values())
+        if not num_pairs:
+            return results
+        logging.info(f"Reranking {num_pairs} pasangan query-kandidat untuk {len(candidates)} query...")
+        reranked = self._rerank_candidates(state, [queries[i] for i in candidates],
+                                           [top_indices for top_indices, _ in candidates.values()], cascade_k)
+
+        for i, (reranked_indices, query_scores) in zip(candidates, reranked):
+            scored_chunks = list(zip(reranked_indices, query_scores))
+            scored_chunks.sort(key=lambda x: x[1], reverse=True)
+            results[i] = self._format_results(state, scored_chunks[:top_k], return_metadata)
+        return results
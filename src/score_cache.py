@@ -0,0 +1,156 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Saat melewati max_rows, cache dipangkas hingga fraksi ini agar penghitungan baris tidak terjadi di setiap penulisan
+EVICTION_TARGET_FRACTION = 0.9
+
+def chunk_key(chunk: str) -> str:
+    """
+    Id chunk yang stabil untuk cache skor: hash isi teks chunk.
+
+    Indeks baris chunk berubah setiap kali indeks dibangun ulang, sedangkan skor reranker
+    hanya bergantung pada teks query dan teks chunk.
+
+    Args:
+        chunk (str): Teks chunk.
+
+    Returns:
+        str: Hash BLAKE2b 128-bit dalam heksadesimal.
+    """
+    return hashlib.blake2b(chunk.encode('utf-8'), digest_size=16).hexdigest()
+
+class RerankerScoreCache:
+    """
+    Cache skor reranker di disk (SQLite) dengan kunci (model, query, id chunk).
+
+    Dapat dipakai bersama oleh beberapa proses (mode WAL), mis. aplikasi Streamlit dan
+    skrip evaluasi, serta dari beberapa thread dalam satu proses.
+
+    Jika max_rows diberikan, jumlah baris file (semua model) dibatasi: setelah melewati
+    max_rows, skor yang paling lama ditulis dibuang hingga tersisa
+    EVICTION_TARGET_FRACTION * max_rows baris. Tanpa max_rows, file tumbuh tanpa batas
+    (satu baris per pasangan query-chunk unik yang pernah diskor).
+    """
+
+    def __init__(self, path: str, model_name: str, max_rows: Optional[int] = None):
+        """
+        Args:
+            path (str): Lokasi file SQLite (dibuat jika belum ada).
+            model_name (str): Nama model reranker; skor model lain tidak pernah dipakai.
+            max_rows (int | None): Batas jumlah baris; None atau 0 = tanpa batas.
+        """
+        self.path = path
+        self.model_name = model_name
+        self.max_rows = max_rows or None
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        columns = {row[1] for row in self._connection.execute("PRAGMA table_info(reranker_scores)")}
+        if columns and 'written_at' not in columns:
+            # File format lama tanpa waktu tulis: isinya hanya cache, sehingga dibuat ulang
+            logging.info(f"Cache skor reranker {path} memakai format lama. Cache dikosongkan.")
+            self._connection.execute("DROP TABLE reranker_scores")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS reranker_scores ("
+            " model TEXT NOT NULL, query TEXT NOT NULL, chunk_key TEXT NOT NULL, score REAL NOT NULL,"
+            " written_at REAL NOT NULL, PRIMARY KEY (model, query, chunk_key)) WITHOUT ROWID"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS reranker_scores_written_at ON reranker_scores (written_at)")
+        self._connection.commit()
+        # Perkiraan jumlah baris (proses lain juga menulis); dihitung ulang sebelum memangkas
+        self._approx_rows = self._count_rows() if self.max_rows else 0
+
+    def get_many(self, query: str, chunk_keys: Iterable[str]) -> Dict[str, float]:
+        """
+        Mengambil skor yang sudah tersimpan untuk pasangan (query, chunk).
+
+        Args:
+            query (str): Query (sebaiknya sudah dinormalisasi).
+            chunk_keys (Iterable[str]): Id chunk (lihat chunk_key).
+
+        Returns:
+            Dict[str, float]: Skor per id chunk, hanya untuk pasangan yang ada di cache.
+            Kosong (semua dianggap cache miss) jika file cache tidak dapat dibaca.
+        """
+        keys = list(dict.fromkeys(chunk_keys))
+        scores: Dict[str, float] = {}
+        with self._lock:
+            try:
+                # Batas jumlah parameter SQLite: ambil per kelompok
+                for start in range(0, len(keys), 500):
+                    group = keys[start:start + 500]
+                    placeholders = ",".join("?" * len(group))
+                    rows = self._connection.execute(
+                        f"SELECT chunk_key, score FROM reranker_scores"
+                        f" WHERE model = ? AND query = ? AND chunk_key IN ({placeholders})",
+                        [self.model_name, query, *group],
+                    )
+                    scores.update(rows)
+            except sqlite3.Error as e:
+                # Cache bersifat opsional: kegagalan membaca diperlakukan sebagai cache miss
+                logging.warning(f"Gagal membaca skor reranker dari cache {self.path}: {e}")
+                return {}
+        return scores
+
+    def put_many(self, items: List[Tuple[str, str, float]]) -> None:
+        """
+        Menyimpan skor baru.
+
+        Args:
+            items (List[Tuple[str, str, float]]): Daftar (query, id chunk, skor).
+        """
+        if not items:
+            return
+        written_at = time.time()
+        with self._lock:
+            try:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO reranker_scores (model, query, chunk_key, score, written_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    [(self.model_name, query, key, float(score), written_at) for query, key, score in items],
+                )
+                if self.max_rows:
+                    self._approx_rows += len(items)
+                    if self._approx_rows > self.max_rows:
+                        self._evict()
+                self._connection.commit()
+            except sqlite3.Error as e:
+                # Cache bersifat opsional: kegagalan menulis tidak boleh menggagalkan retrieval
+                logging.warning(f"Gagal menyimpan skor reranker ke cache {self.path}: {e}")
+
+    def _count_rows(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM reranker_scores").fetchone()[0]
+
+    def _evict(self) -> None:
+        """Membuang skor yang paling lama ditulis jika jumlah baris melewati max_rows (dipanggil di dalam lock)."""
+        rows = self._count_rows()
+        if rows > self.max_rows:
+            excess = rows - int(self.max_rows * EVICTION_TARGET_FRACTION)
+            self._connection.execute(
+                "DELETE FROM reranker_scores WHERE (model, query, chunk_key) IN ("
+                " SELECT model, query, chunk_key FROM reranker_scores ORDER BY written_at LIMIT ?)",
+                (excess,),
+            )
+            logging.info(f"Cache skor reranker {self.path}: {excess} skor terlama dibuang.")
+            rows -= excess
+        self._approx_rows = rows
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM reranker_scores WHERE model = ?", (self.model_name,)
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        """Menutup koneksi SQLite."""
+        with self._lock:
+            self._connection.close()
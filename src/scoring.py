@@ -0,0 +1,254 @@
+import heapq
+import itertools
+import numpy as np
+from scipy.sparse import csc_matrix, csr_matrix
+from typing import Dict, List, Optional, Tuple
+
+# Jumlah baris embedding yang dikonversi ke float32 per blok saat scoring dense
+DENSE_BLOCK_ROWS = 65536
+# Konstanta k pada reciprocal rank fusion (nilai umum dari literatur RRF)
+RRF_K = 60
+
+def select_top_k(indices: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Memilih k kandidat dengan skor tertinggi tanpa mengurutkan seluruh kandidat.
+
+    Batas skor ke-k dicari dengan partial sort (np.partition), lalu hanya kandidat
+    terpilih yang diurutkan. Skor seri diurutkan berdasarkan indeks chunk (menaik)
+    agar hasilnya deterministik dan tidak bergantung pada urutan kandidat.
+
+    Args:
+        indices (np.ndarray): Indeks chunk kandidat.
+        scores (np.ndarray): Skor kandidat, sejajar dengan indices.
+        k (int): Jumlah kandidat yang diambil.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (indeks, skor) terurut dari skor tertinggi.
+    """
+    if k <= 0 or len(scores) == 0:
+        return indices[:0], scores[:0]
+    if len(scores) > k:
+        threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+        above = np.flatnonzero(scores > threshold)
+        ties = np.flatnonzero(scores == threshold)
+        if len(ties) > k - len(above):
+            # Kandidat seri di batas: ambil yang indeks chunk-nya paling kecil
+            ties = ties[np.argsort(indices[ties], kind='stable')[:k - len(above)]]
+        selected = np.concatenate([above, ties])
+        indices, scores = indices[selected], scores[selected]
+    order = np.lexsort((indices, -scores))
+    return indices[order], scores[order]
+
+def merge_top_k(results: List[Tuple[np.ndarray, np.ndarray]], k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    K-way merge beberapa hasil top-k yang masing-masing sudah terurut (mis. per shard).
+
+    Urutannya sama dengan select_top_k (skor menurun, seri berdasarkan indeks chunk menaik),
+    sehingga top-k gabungan dari top-k setiap bagian indeks yang saling lepas identik dengan
+    top-k atas seluruh indeks.
+
+    Args:
+        results (List[Tuple[np.ndarray, np.ndarray]]): (indeks chunk, skor) terurut per bagian.
+        k (int): Jumlah kandidat yang diambil.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (indeks chunk, skor) terurut dari skor tertinggi.
+    """
+    results = [(indices, scores) for indices, scores in results if len(indices)]
+    if not results or k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    merged = heapq.merge(*[zip((-scores).tolist(), indices.tolist()) for indices, scores in results])
+    top = [(index, -negative_score) for negative_score, index in itertools.islice(merged, k)]
+    dtype = np.result_type(*[scores.dtype for _, scores in results])
+    return np.array([index for index, _ in top], dtype=np.int64), np.array([score for _, score in top], dtype=dtype)
+
+def tfidf_top_k(query_vector: csr_matrix, tfidf_matrix: csr_matrix, k: int,
+                rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Kernel scoring tahap pertama: dot product query dengan matriks TF-IDF, lalu top-k.
+
+    Baris matriks dan vektor query sudah dinormalisasi L2 oleh vectorizer, sehingga
+    dot product sama dengan cosine similarity tanpa perlu menormalisasi ulang matriks
+    di setiap query. Chunk berskor nol dibuang sebelum pemilihan top-k.
+
+    Args:
+        query_vector (csr_matrix): Vektor TF-IDF query (1 x ukuran vocabulary).
+        tfidf_matrix (csr_matrix): Matriks TF-IDF chunk.
+        k (int): Jumlah kandidat yang diambil.
+        rows (np.ndarray | None): Jika diberikan, hanya baris (chunk) ini yang diskor, sehingga
+            biaya sebanding dengan nnz baris tersebut (lihat ChunkMetadata.scope_rows).
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (indeks chunk, skor) terurut dari skor tertinggi,
+        hanya untuk chunk dengan skor positif.
+    """
+    if query_vector.nnz == 0 or (rows is not None and len(rows) == 0):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=tfidf_matrix.dtype)
+    # Perkalian matriks CSR dengan vektor padat: satu lintasan atas nnz matriks (atau baris terpilih)
+    matrix = tfidf_matrix[rows] if rows is not None else tfidf_matrix
+    scores = matrix.dot(query_vector.toarray().ravel())
+    candidates = np.flatnonzero(scores > 0)
+    indices = rows[candidates] if rows is not None else candidates
+    return select_top_k(indices, scores[candidates], k)
+
+def tfidf_top_k_batch(query_matrix: csr_matrix, tfidf_matrix: csr_matrix, k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Versi batch tfidf_top_k: semua query diskor dengan satu perkalian sparse matriks-matriks.
+
+    Hasil perkalian (chunk x query) tetap sparse, sehingga memori sebanding dengan jumlah
+    pasangan chunk-query berskor positif, bukan jumlah chunk dikali jumlah query. Urutan
+    penjumlahan per chunk sama dengan tfidf_top_k, sehingga skornya identik.
+
+    Args:
+        query_matrix (csr_matrix): Matriks TF-IDF query (jumlah query x ukuran vocabulary).
+        tfidf_matrix (csr_matrix): Matriks TF-IDF chunk.
+        k (int): Jumlah kandidat per query.
+
+    Returns:
+        List[Tuple[np.ndarray, np.ndarray]]: (indeks chunk, skor) per query, seperti tfidf_top_k.
+    """
+    # Kolom ke-q berisi skor semua chunk untuk query ke-q
+    scores = csc_matrix(tfidf_matrix.dot(query_matrix.T.tocsc()))
+    results = []
+    for q in range(query_matrix.shape[0]):
+        candidates = scores.indices[scores.indptr[q]:scores.indptr[q + 1]].astype(np.int64)
+        candidate_scores = scores.data[scores.indptr[q]:scores.indptr[q + 1]]
+        positive = candidate_scores > 0
+        results.append(select_top_k(candidates[positive], candidate_scores[positive], k))
+    return results
+
+def bm25_top_k(bm25_index, columns: np.ndarray, query_counts: np.ndarray, k: int,
+               prune: bool = True, stats: Optional[Dict[str, int]] = None,
+               row_mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k BM25 term-at-a-time dengan early termination MaxScore.
+
+    Term query diproses dari batas atas bobot terbesar. Setelah setiap term, skor
+    kandidat ke-k menjadi threshold; begitu jumlah batas atas term yang tersisa lebih
+    kecil dari threshold, chunk yang belum pernah muncul tidak mungkin masuk top-k.
+    Sejak itu term sisanya (biasanya term umum dengan posting panjang) tidak lagi
+    dipindai, melainkan hanya dicari untuk kandidat yang ada (binary search pada
+    posting yang terurut), dan kandidat yang tidak bisa lagi mencapai threshold
+    dibuang. Hasilnya identik dengan scoring menyeluruh (prune=False).
+
+    Args:
+        bm25_index (BM25Index): Inverted index BM25 (lihat index_store).
+        columns (np.ndarray): Kolom term query (lihat QueryVectorizer.lookup).
+        query_counts (np.ndarray): Jumlah kemunculan setiap term di query.
+        k (int): Jumlah kandidat yang diambil.
+        prune (bool): Jika False, semua posting term query dipindai.
+        stats (Dict[str, int] | None): Jika diberikan, diisi jumlah posting total, yang
+            dipindai penuh, dan perkiraan posting yang dibaca binary search kandidat
+            (kandidat x log2 panjang posting).
+        row_mask (np.ndarray | None): Mask boolean per chunk; jika diberikan, posting chunk di
+            luar mask diabaikan (batas atas bobot tetap valid, sehingga pruning tetap exact).
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (indeks chunk, skor BM25) terurut dari skor tertinggi.
+    """
+    columns = np.asarray(columns, dtype=np.int64)
+    starts, ends = bm25_index.indptr[columns], bm25_index.indptr[columns + 1]
+    present = ends > starts
+    columns, starts, ends = columns[present], starts[present], ends[present]
+    query_counts = np.asarray(query_counts, dtype=np.float64)[present]
+    if stats is not None:
+        stats.update(postings_total=int((ends - starts).sum()), postings_scanned=0, postings_probed=0)
+    if len(columns) == 0 or k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+    upper_bounds = bm25_index.max_weights[columns].astype(np.float64) * query_counts
+    order = np.argsort(-upper_bounds, kind='stable')
+    # Batas atas skor yang masih bisa ditambahkan oleh term setelah posisi i
+    remaining = np.append(np.cumsum(upper_bounds[order][::-1])[::-1][1:], 0.0)
+    # Toleransi pembulatan float agar pruning tidak pernah membuang kandidat yang sah
+    remaining *= 1 + 1e-9
+
+    candidate_docs = np.empty(0, dtype=np.int64)
+    candidate_scores = np.empty(0, dtype=np.float64)
+    admitting = True
+    for position, term in enumerate(order):
+        # Slice memmap berupa view: posting hanya dibaca pada elemen yang diakses
+        docs = bm25_index.docs[starts[term]:ends[term]]
+        if admitting:
+            weights = bm25_index.weights[starts[term]:ends[term]] * query_counts[term]
+            if stats is not None:
+                stats['postings_scanned'] += len(docs)
+            if row_mask is not None:
+                allowed = row_mask[docs]
+                docs, weights = docs[allowed], weights[allowed]
+            merged_docs, inverse = np.unique(np.concatenate([candidate_docs, docs]), return_inverse=True)
+            candidate_scores = np.bincount(inverse, weights=np.concatenate([candidate_scores, weights]),
+                                           minlength=len(merged_docs))
+            candidate_docs = merged_docs
+        elif len(candidate_docs):
+            # Kandidat sudah lolos row_mask; hanya bobot posting yang cocok yang diambil
+            found = np.minimum(np.searchsorted(docs, candidate_docs), len(docs) - 1)
+            hit = docs[found] == candidate_docs
+            candidate_scores[hit] += bm25_index.weights[starts[term] + found[hit]] * query_counts[term]
+            if stats is not None:
+                # Binary search membaca sekitar log2(panjang posting) id chunk per kandidat
+                stats['postings_probed'] += len(candidate_docs) * int(np.ceil(np.log2(len(docs) + 1)))
+
+        if prune and len(candidate_scores) >= k:
+            threshold = np.partition(candidate_scores, len(candidate_scores) - k)[len(candidate_scores) - k]
+            if admitting and remaining[position] < threshold:
+                admitting = False
+            if not admitting:
+                alive = candidate_scores + remaining[position] >= threshold
+                candidate_docs, candidate_scores = candidate_docs[alive], candidate_scores[alive]
+
+    return select_top_k(candidate_docs, candidate_scores, k)
+
+def dense_top_k(query_embedding: np.ndarray, embeddings: np.ndarray, k: int,
+                rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k cosine similarity antara embedding query dan embedding chunk.
+
+    Embedding chunk (biasanya float16 hasil memory-map) dan query sudah dinormalisasi,
+    sehingga dot product sama dengan cosine similarity. Matriks dikonversi ke float32 per
+    blok karena perkalian float16 di NumPy tidak memakai BLAS, dan agar tidak ada salinan
+    float32 seluruh matriks.
+
+    Args:
+        query_embedding (np.ndarray): Embedding query ternormalisasi (dimensi,).
+        embeddings (np.ndarray): Embedding chunk ternormalisasi (chunk x dimensi).
+        k (int): Jumlah kandidat yang diambil.
+        rows (np.ndarray | None): Jika diberikan (terurut), hanya embedding baris ini yang diskor.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (indeks chunk, skor) terurut dari skor tertinggi.
+    """
+    query_embedding = np.asarray(query_embedding, dtype=np.float32)
+    num_rows = len(rows) if rows is not None else len(embeddings)
+    scores = np.empty(num_rows, dtype=np.float32)
+    for start in range(0, num_rows, DENSE_BLOCK_ROWS):
+        if rows is not None:
+            block = embeddings[rows[start:start + DENSE_BLOCK_ROWS]]
+        else:
+            block = embeddings[start:start + DENSE_BLOCK_ROWS]
+        scores[start:start + len(block)] = block.astype(np.float32) @ query_embedding
+    return select_top_k(rows if rows is not None else np.arange(num_rows), scores, k)
+
+def reciprocal_rank_fusion(rankings: List[np.ndarray], k: int, rrf_k: int = RRF_K) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Menggabungkan beberapa peringkat kandidat dengan reciprocal rank fusion (RRF).
+
+    Skor setiap chunk adalah jumlah 1 / (rrf_k + peringkat) dari setiap daftar yang
+    memuatnya (peringkat mulai dari 1), sehingga skala skor TF-IDF dan cosine tidak perlu
+    dikalibrasi satu sama lain.
+
+    Args:
+        rankings (List[np.ndarray]): Indeks chunk per retriever, terurut dari yang terbaik.
+        k (int): Jumlah kandidat hasil fusi.
+        rrf_k (int): Konstanta peredam peringkat atas.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (indeks chunk, skor RRF) terurut dari skor tertinggi.
+    """
+    if not rankings:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    indices = np.concatenate([np.asarray(ranking, dtype=np.int64) for ranking in rankings])
+    contributions = np.concatenate([1.0 / (rrf_k + np.arange(1, len(ranking) + 1)) for ranking in rankings])
+    fused_indices, inverse = np.unique(indices, return_inverse=True)
+    fused_scores = np.bincount(inverse, weights=contributions, minlength=len(fused_indices))
+    return select_top_k(fused_indices, fused_scores, k)
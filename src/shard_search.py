@@ -0,0 +1,134 @@
+import os
+import json
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+import numpy as np
+from scipy.sparse import csr_matrix
+from index_store import META_FILE, SHARDS_DIR, load_shard
+from scoring import bm25_top_k, dense_top_k, merge_top_k, tfidf_top_k, tfidf_top_k_batch
+
+# Array scoring shard yang dimuat di proses worker (diisi oleh _init_worker)
+_shard = None
+
+def _init_worker(shard_dir: str, meta: dict) -> None:
+    """Initializer proses worker: memetakan (mmap) array shard sekali untuk semua pencarian."""
+    global _shard
+    _shard = load_shard(shard_dir, meta)
+
+def _ready() -> bool:
+    return _shard is not None
+
+def _search_shard(kind: str, query, k: int, local_rows: Optional[np.ndarray]):
+    """
+    Top-k di shard milik proses ini; indeks hasil relatif terhadap awal shard. Untuk
+    'tfidf_batch', query adalah matriks query dan hasilnya daftar top-k per query.
+    """
+    tfidf_matrix, bm25_index, embeddings = _shard
+    if kind == 'tfidf':
+        return tfidf_top_k(query, tfidf_matrix, k, local_rows)
+    if kind == 'tfidf_batch':
+        return tfidf_top_k_batch(query, tfidf_matrix, k)
+    if kind == 'bm25':
+        columns, query_counts = query
+        row_mask = None
+        if local_rows is not None:
+            row_mask = np.zeros(tfidf_matrix.shape[0], dtype=bool)
+            row_mask[local_rows] = True
+        return bm25_top_k(bm25_index, columns, query_counts, k, row_mask=row_mask)
+    return dense_top_k(query, embeddings, k, local_rows)
+
+class ShardedSearcher:
+    """
+    Pencarian tahap pertama scatter-gather atas shard indeks di proses worker terpisah.
+
+    Setiap shard (rentang baris chunk, ditulis save_index dengan num_shards > 1) dilayani oleh
+    satu proses worker yang hanya memetakan array shard tersebut, sehingga satu query memakai
+    semua core dan tidak ada satu proses pun yang perlu menyentuh seluruh matriks. Query
+    di-vectorize sekali oleh pemanggil (vocabulary dan idf global), dikirim ke semua shard,
+    lalu top-k per shard digabung dengan k-way merge (scoring.merge_top_k). Hasilnya identik
+    dengan scoring atas indeks utuh.
+    """
+
+    def __init__(self, index_dir: str, mp_context: str = "spawn"):
+        """
+        Args:
+            index_dir (str): Direktori indeks mmap yang memiliki shard.
+            mp_context (str): Metode start proses; 'spawn' aman dipakai dari proses yang sudah
+                menjalankan thread (model PyTorch, thread pool retriever).
+
+        Raises:
+            ValueError: Jika indeks tidak memiliki shard.
+        """
+        with open(os.path.join(index_dir, META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if not meta.get('shards'):
+            raise ValueError(f"Indeks {index_dir} tidak memiliki shard (bangun dengan --shards > 1).")
+        self.ranges: List[Tuple[int, int]] = [tuple(shard_range) for shard_range in meta['shards']]
+        # Array scoring yang tersedia di shard (proses induk tidak memuat array utuhnya)
+        self.has_bm25 = bool(meta.get('bm25'))
+        self.embedding_model: Optional[str] = (meta.get('embeddings') or {}).get('model')
+        context = multiprocessing.get_context(mp_context)
+        # Satu proses per shard: array shard hanya dimuat di proses yang melayaninya
+        self._workers = [
+            ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_init_worker,
+                                initargs=(os.path.join(index_dir, SHARDS_DIR, f"{shard_id:02d}"), meta))
+            for shard_id in range(len(self.ranges))
+        ]
+        # Proses worker dimulai (dan shard dimuat) di latar, bukan saat query pertama
+        for worker in self._workers:
+            worker.submit(_ready)
+        logging.info(f"Pencarian shard aktif: {len(self.ranges)} shard di proses worker terpisah.")
+
+    def __len__(self) -> int:
+        return len(self.ranges)
+
+    def _scatter_gather(self, kind: str, query, k: int, rows: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        futures = []
+        for worker, (start, end) in zip(self._workers, self.ranges):
+            local_rows = None
+            if rows is not None:
+                # rows terurut: ambil bagian yang jatuh di rentang shard ini
+                local_rows = rows[np.searchsorted(rows, start):np.searchsorted(rows, end)] - start
+                if len(local_rows) == 0:
+                    continue
+            futures.append((start, worker.submit(_search_shard, kind, query, k, local_rows)))
+        results = []
+        for start, future in futures:
+            indices, scores = future.result()
+            results.append((indices + start, scores))
+        return merge_top_k(results, k)
+
+    def tfidf_top_k(self, query_vector: csr_matrix, k: int,
+                    rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Seperti scoring.tfidf_top_k atas seluruh indeks."""
+        if query_vector.nnz == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=query_vector.dtype)
+        return self._scatter_gather('tfidf', query_vector, k, rows)
+
+    def tfidf_top_k_batch(self, query_matrix: csr_matrix, k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Seperti scoring.tfidf_top_k_batch atas seluruh indeks (satu perkalian matriks per shard)."""
+        futures = [(start, worker.submit(_search_shard, 'tfidf_batch', query_matrix, k, None))
+                   for worker, (start, _) in zip(self._workers, self.ranges)]
+        shard_results = [(start, future.result()) for start, future in futures]
+        return [
+            merge_top_k([(results[q][0] + start, results[q][1]) for start, results in shard_results], k)
+            for q in range(query_matrix.shape[0])
+        ]
+
+    def bm25_top_k(self, columns: np.ndarray, query_counts: np.ndarray, k: int,
+                   rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Seperti scoring.bm25_top_k atas seluruh indeks (rows menggantikan row_mask)."""
+        return self._scatter_gather('bm25', (columns, query_counts), k, rows)
+
+    def dense_top_k(self, query_embedding: np.ndarray, k: int,
+                    rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Seperti scoring.dense_top_k (exact) atas seluruh embedding chunk."""
+        return self._scatter_gather('dense', np.asarray(query_embedding, dtype=np.float32), k, rows)
+
+    def close(self) -> None:
+        """Menghentikan semua proses worker."""
+        for worker in self._workers:
+            worker.shutdown(wait=True, cancel_futures=True)
+        self._workers = []
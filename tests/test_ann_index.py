@@ -0,0 +1,71 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Menambahkan path src ke sys.path agar modul dapat diimpor
+sys.path.append(os.path.abspath("src"))
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from ann_index import IVFPQIndex
+from index_store import load_ann_index, save_index
+from scoring import dense_top_k
+
+class TestIVFPQIndex(unittest.TestCase):
+    """
+    Unit test untuk indeks approximate nearest neighbour IVF-PQ.
+    """
+
+    def setUp(self):
+        """
+        Membuat embedding ternormalisasi dengan beberapa cluster.
+        """
+        rng = np.random.default_rng(0)
+        centers = rng.standard_normal((8, 16))
+        embeddings = centers[rng.integers(0, 8, 600)] + 0.3 * rng.standard_normal((600, 16))
+        self.embeddings = (embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)).astype(np.float16)
+        self.queries = self.embeddings[[3, 150, 420]].astype(np.float32)
+        self.index = IVFPQIndex.build(self.embeddings, nlist=8, m=4, iterations=10)
+
+    def test_structure(self):
+        """
+        Setiap vektor muncul tepat sekali di list IVF dengan kode PQ 1 byte per sub-quantizer.
+        """
+        self.assertEqual(sorted(self.index.list_ids.tolist()), list(range(len(self.embeddings))))
+        self.assertEqual(self.index.codes.shape, (len(self.embeddings), 4))
+        self.assertEqual(self.index.codes.dtype, np.uint8)
+        self.assertEqual(self.index.list_indptr[-1], len(self.embeddings))
+
+    def test_full_probe_with_refine_matches_exact(self):
+        """
+        Dengan semua list diperiksa dan semua kandidat diskor ulang, hasil sama dengan pencarian exact.
+        """
+        for query in self.queries:
+            found, scores = self.index.search(query, 10, nprobe=8, refine_factor=60, embeddings=self.embeddings)
+            expected, expected_scores = dense_top_k(query, self.embeddings, 10)
+            self.assertEqual(found.tolist(), expected.tolist())
+            np.testing.assert_allclose(scores, expected_scores, rtol=1e-6)
+
+    def test_save_load_mmap(self):
+        """
+        Indeks ANN disimpan di direktori indeks dan dimuat lewat mmap dengan hasil pencarian yang sama.
+        """
+        chunks = [f"chunk nomor {i}" for i in range(len(self.embeddings))]
+        vectorizer = TfidfVectorizer()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            index_dir = os.path.join(tmp_dir, "perda_index")
+            save_index(index_dir, chunks, vectorizer, vectorizer.fit_transform(chunks),
+                       chunk_embeddings=self.embeddings, embedding_model="model-uji", ann_index=self.index)
+
+            loaded = load_ann_index(index_dir)
+
+            self.assertIsInstance(loaded.codes, np.memmap)
+            for query in self.queries:
+                expected = self.index.search(query, 5, nprobe=2, refine_factor=0)
+                actual = loaded.search(query, 5, nprobe=2, refine_factor=0)
+                self.assertEqual(actual[0].tolist(), expected[0].tolist())
+            del loaded
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Menambahkan path src ke sys.path agar modul dapat diimpor
+sys.path.append(os.path.abspath("src"))
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from index_store import describe_document, save_index, load_chunk_embeddings, load_chunk_metadata, load_index
+
+class TestIndexStore(unittest.TestCase):
+    """
+    Unit test untuk format indeks on-disk berbasis memory-map.
+    """
+
+    def setUp(self):
+        """
+        Membuat indeks TF-IDF kecil dan menyimpannya ke direktori sementara.
+        """
+        self.chunks = [
+            "pasal 1 setiap orang dilarang membakar sampah",
+            "pasal 2 sanksi administratif berupa denda",
+            "pengelolaan sampah rumah tangga oleh pemerintah daerah — ü",
+        ]
+        self.vectorizer = TfidfVectorizer()
+        self.tfidf_matrix = self.vectorizer.fit_transform(self.chunks)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.index_dir = os.path.join(self.tmp_dir.name, "perda_index")
+        save_index(self.index_dir, self.chunks, self.vectorizer, self.tfidf_matrix)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_roundtrip(self):
+        """
+        Chunks, matriks, dan transformasi query dari indeks mmap harus sama
+        dengan objek scikit-learn aslinya.
+        """
+        chunks, vectorizer, tfidf_matrix = load_index(self.index_dir)
+
+        self.assertEqual(list(chunks), self.chunks)
+        self.assertEqual(abs(tfidf_matrix - self.tfidf_matrix).max(), 0)
+
+        for query in ["Sanksi membakar sampah?", "kata tidak dikenal", ""]:
+            expected = self.vectorizer.transform([query]).toarray()
+            actual = vectorizer.transform([query]).toarray()
+            np.testing.assert_allclose(actual, expected, atol=1e-12)
+
+    def test_roundtrip_float32_pruned(self):
+        """
+        Indeks float32 dengan vocabulary yang dipangkas (min_df, token angka dibuang)
+        harus tetap mentransformasi query sama seperti scikit-learn.
+        """
+        chunks = self.chunks + ["pasal 29 sampah 2008 dilarang", "sampah b3 pasal 30"]
+        vectorizer = TfidfVectorizer(min_df=2, token_pattern=r"(?u)\b(?!\d+\b)\w\w+\b", dtype=np.float32)
+        tfidf_matrix = vectorizer.fit_transform(chunks)
+        index_dir = os.path.join(self.tmp_dir.name, "pruned_index")
+        save_index(index_dir, chunks, vectorizer, tfidf_matrix)
+
+        _, loaded_vectorizer, loaded_matrix = load_index(index_dir)
+
+        self.assertEqual(loaded_matrix.dtype, np.float32)
+        self.assertNotIn("2008", list(loaded_vectorizer.vocabulary))
+        for query in ["sampah pasal 29 tahun 2008", "dilarang membakar sampah b3"]:
+            expected = vectorizer.transform([query]).toarray()
+            actual = loaded_vectorizer.transform([query]).toarray()
+            self.assertEqual(actual.dtype, np.float32)
+            np.testing.assert_allclose(actual, expected, atol=1e-6)
+
+    def test_chunk_embeddings_roundtrip(self):
+        """
+        Embedding chunk disimpan sebagai float16 yang di-memory-map beserta nama modelnya.
+        """
+        self.assertIsNone(load_chunk_embeddings(self.index_dir))
+        embeddings = np.random.default_rng(0).standard_normal((len(self.chunks), 8))
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        index_dir = os.path.join(self.tmp_dir.name, "embedding_index")
+        save_index(index_dir, self.chunks, self.vectorizer, self.tfidf_matrix,
+                   chunk_embeddings=embeddings, embedding_model="model-uji")
+
+        loaded_embeddings, model_name = load_chunk_embeddings(index_dir)
+
+        self.assertEqual(model_name, "model-uji")
+        self.assertEqual(loaded_embeddings.dtype, np.float16)
+        self.assertIsInstance(loaded_embeddings, np.memmap)
+        np.testing.assert_allclose(loaded_embeddings, embeddings, atol=1e-3)
+
+        # Indeks sharded tidak menyimpan salinan utuh; embedding digabung dari shard
+        sharded_dir = os.path.join(self.tmp_dir.name, "sharded_embedding_index")
+        save_index(sharded_dir, self.chunks, self.vectorizer, self.tfidf_matrix,
+                   chunk_embeddings=embeddings, embedding_model="model-uji", num_shards=2)
+        self.assertFalse(os.path.exists(os.path.join(sharded_dir, "embeddings.npy")))
+        np.testing.assert_array_equal(load_chunk_embeddings(sharded_dir)[0], loaded_embeddings)
+
+    def test_scope_rows_roundtrip(self):
+        """
+        Jenis dan tahun peraturan dikenali dari judul, dan baris chunk per cakupan filter
+        (termasuk chunk yang hanya diwakili near-duplicate) dibaca dari indeks.
+        """
+        self.assertEqual(describe_document("uu_18_2008.pdf", "undang-undang republik indonesia nomor 18 tahun 2008 "
+                                           "tentang pengelolaan sampah sesuai peraturan pemerintah tahun 2012"),
+                         {'level': 'uu', 'year': 2008})
+        self.assertEqual(describe_document("Perda Kota Bandung No. 9 Tahun 2018.pdf"), {'level': 'perda', 'year': 2018})
+        documents = ["perda_9_2018.pdf", "uu_18_2008.pdf"]
+        attributes = [{'level': 'perda', 'year': 2018}, {'level': 'uu', 'year': 2008}]
+        chunk_metadata = {field: np.array(values, dtype=np.int32) for field, values in
+                          {'doc_id': [0, 1, 0], 'page_start': [1, 1, 2]}.items()}
+        # Chunk uu yang dibuang sebagai near-duplicate dari chunk 2 (perda)
+        duplicates = {'doc_id': np.array([1], dtype=np.int32), 'page_start': np.array([3], dtype=np.int32),
+                      'representative': np.array([2], dtype=np.int32)}
+        index_dir = os.path.join(self.tmp_dir.name, "scoped_index")
+        save_index(index_dir, self.chunks, self.vectorizer, self.tfidf_matrix, documents=documents,
+                   chunk_metadata=chunk_metadata, duplicate_metadata=duplicates, document_attributes=attributes)
+
+        metadata = load_chunk_metadata(index_dir)
+
+        self.assertIsNone(metadata.scope_rows())
+        self.assertEqual(metadata.scope_rows(levels=["perda"]).tolist(), [0, 2])
+        self.assertEqual(metadata.scope_rows(levels=["uu"]).tolist(), [1, 2])
+        self.assertEqual(metadata.scope_rows(documents=["uu_18_2008.pdf"], years=[2018]).tolist(), [])
+        self.assertIs(metadata.scope_rows(years=[2008]), metadata.scope_rows(levels=["uu"]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -18,10 +18,10 @@ class TestChatbotIntegration(unittest.TestCase):
         """
         Setup test dengan inisialisasi retriever dan generator.
 
-        Mengasumsikan bahwa file 'perda_data.pkl' sudah tersedia
+        Mengasumsikan bahwa indeks 'perda_index' sudah tersedia
         setelah menjalankan perda_processor.py.
         """
-        self.data_path = os.path.join(os.path.dirname(__file__), "..", "data", "perda_data.pkl")
+        self.data_path = os.path.join(os.path.dirname(__file__), "..", "data", "perda_index")
         if not os.path.exists(self.data_path):
             self.fail(f"File data tidak ditemukan di {self.data_path}. Pastikan sudah dibuat.")
 
@@ -0,0 +1,369 @@
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+from unittest import mock
+
+# Menambahkan path src ke sys.path agar modul dapat diimpor
+sys.path.append(os.path.abspath("src"))
+
+import numpy as np
+import index_store
+import perda_processor
+from config import AppConfig
+
+REFERENCE_DIR = os.path.join(os.path.dirname(__file__), "..", "reference", "nasional")
+
+def fail_on_permen(pdf_path, max_tokens):
+    """Pengganti process_document (dapat di-pickle ke worker) yang gagal untuk PDF Permen."""
+    if "Permen" in pdf_path:
+        raise RuntimeError("worker gagal")
+    return perda_processor.chunk_document_pages(os.path.basename(pdf_path), perda_processor.iter_document_pages(
+        perda_processor.iter_pdf_pages(pdf_path)), max_tokens)
+
+class TestPerdaProcessor(unittest.TestCase):
+    """
+    Unit test untuk pipeline pemrosesan PDF pada perda_processor.
+    """
+
+    def setUp(self):
+        """
+        Menyiapkan beberapa PDF referensi kecil sebagai input pipeline.
+        """
+        pdf_files = ["Permen No.33-2010.pdf", "Perpres Nomor 97 Tahun 2017.pdf"]
+        self.pdf_paths = [os.path.join(REFERENCE_DIR, pdf_file) for pdf_file in pdf_files]
+        for pdf_path in self.pdf_paths:
+            if not os.path.exists(pdf_path):
+                self.skipTest(f"File referensi tidak ditemukan: {pdf_path}")
+
+    def test_parallel_matches_serial(self):
+        """
+        Pemrosesan paralel (termasuk pemecahan per rentang halaman) harus
+        menghasilkan chunks yang identik dengan pemrosesan serial.
+        """
+        serial_results = [perda_processor.process_document(pdf_path) for pdf_path in self.pdf_paths]
+        parallel_results = perda_processor.process_documents_parallel(self.pdf_paths, workers=2, pages_per_task=4)
+
+        self.assertTrue(all(serial_results), "Setiap dokumen seharusnya menghasilkan chunks.")
+        for serial, parallel in zip(serial_results, parallel_results):
+            self.assertEqual(serial['chunks'], parallel['chunks'])
+            for field, values in serial['metadata'].items():
+                np.testing.assert_array_equal(values, parallel['metadata'][field])
+
+    def test_parallel_skips_failed_document(self):
+        """
+        Error dari satu future dokumen dicatat dan dokumen itu dilewati; dokumen lain tetap diproses.
+        """
+        with mock.patch.object(perda_processor, 'process_document', fail_on_permen), \
+                self.assertLogs(level='ERROR') as logs:
+            results = perda_processor.process_documents_parallel(self.pdf_paths, workers=2, pages_per_task=1000)
+
+        self.assertIsNone(results[0])
+        self.assertEqual(results[1]['chunks'], perda_processor.process_document(self.pdf_paths[1])['chunks'])
+        self.assertIn("Permen No.33-2010.pdf", logs.output[0])
+
+    def test_chunk_metadata(self):
+        """
+        Setiap chunk harus memiliki metadata halaman dan offset yang konsisten,
+        dan judul Pasal harus terdeteksi dari penomoran yang berurutan.
+        """
+        result = perda_processor.process_document(self.pdf_paths[0])
+        metadata = result['metadata']
+
+        self.assertEqual(len(metadata['page_start']), len(result['chunks']))
+        self.assertTrue((metadata['page_start'] >= 1).all())
+        self.assertTrue((metadata['page_start'] <= metadata['page_end']).all())
+        self.assertTrue((metadata['char_start'] < metadata['char_end']).all())
+        self.assertTrue((np.diff(metadata['pasal']) >= 0).all(), "Nomor Pasal seharusnya tidak pernah mundur.")
+        self.assertGreater(metadata['pasal'].max(), 0)
+        self.assertEqual(metadata['n_tokens'].tolist(), [len(chunk.split()) for chunk in result['chunks']])
+        self.assertEqual(result['stats']['chunking']['items'], len(result['chunks']))
+        self.assertEqual(set(result['stats']), {'extraction', 'cleaning', 'chunking'})
+
+    def test_streamed_pages_match_whole_document(self):
+        """
+        Ekstraksi dan pembersihan per halaman harus identik dengan pemrosesan seluruh
+        dokumen sekaligus, dan nomor halaman di metadata chunk harus sesuai dengan
+        halaman tempat offset chunk berada.
+        """
+        pdf_path = self.pdf_paths[0]
+        pages = list(perda_processor.iter_pdf_pages(pdf_path))
+        whole_text = perda_processor.extract_text_from_pdf(pdf_path)
+
+        self.assertEqual([page_no for page_no, _ in pages], list(range(1, len(pages) + 1)))
+        self.assertEqual("".join(text for _, text in pages), whole_text)
+        self.assertEqual(" ".join(text for _, text in perda_processor.iter_clean_pages(pages)),
+                         perda_processor.preprocess_text(whole_text))
+
+        body = "".join(text for _, text in perda_processor.iter_document_pages(pages))
+        result = perda_processor.process_document(pdf_path)
+        self.assertEqual(result['chunks'], perda_processor.chunk_text_by_structure(body))
+
+        # Offset awal setiap halaman pada teks mentah (halaman digabung tanpa pemisah)
+        page_starts = np.cumsum([0] + [len(text) for _, text in pages])
+        metadata = result['metadata']
+        start_pages = np.searchsorted(page_starts, metadata['char_start'], side='right')
+        end_pages = np.searchsorted(page_starts, metadata['char_end'] - 1, side='right')
+        np.testing.assert_array_equal(start_pages, metadata['page_start'])
+        np.testing.assert_array_equal(end_pages, metadata['page_end'])
+        self.assertGreater(metadata['page_end'].max(), 1)
+
+    def test_chunk_budget_fits_reranker_max_length(self):
+        """
+        Chunk berukuran maksimum beserta query harus muat dalam max_length reranker,
+        sehingga reranker tidak memotong chunk berukuran default.
+        """
+        pair_length = (perda_processor.DEFAULT_MAX_CHUNK_TOKENS * perda_processor.WORDPIECES_PER_TOKEN
+                       + perda_processor.QUERY_TOKEN_RESERVE)
+        self.assertLessEqual(pair_length, AppConfig.RERANKER_MAX_LENGTH)
+
+    def test_structural_chunks(self):
+        """
+        Chunker hierarkis harus memisahkan per Pasal pada teks mentah, mengabaikan
+        rujukan Pasal di dalam kalimat, dan membatasi panjang chunk.
+        """
+        text = (
+            "UNDANG-UNDANG REPUBLIK INDONESIA\n"
+            "BAB I\nKETENTUAN UMUM\n"
+            "Pasal 1\nDalam Undang-Undang ini yang dimaksud dengan sampah adalah sisa kegiatan.\n"
+            "Pasal 2\n(1) Setiap orang wajib mengurangi sampah sebagaimana dimaksud dalam\n"
+            "Pasal 1\nsecara berwawasan lingkungan.\n"
+            "(2) " + "Pengelolaan sampah rumah tangga dilakukan oleh pemerintah daerah. " * 10 + "\n"
+            "- 3 -\nBAB II . . .\n"
+            "BAB II\nLARANGAN\n"
+            "Pasal 3\nSetiap orang dilarang membakar sampah.\n"
+        )
+        records = list(perda_processor.iter_structural_chunks([(1, text)], max_tokens=40, overlap=5))
+        pasals = [record.pasal for record in records]
+
+        self.assertEqual(sorted(set(pasals)), [-1, 1, 2, 3])
+        self.assertTrue(all(len(record.text.split()) <= 40 for record in records))
+        self.assertTrue(records[-1].text.startswith("bab ii larangan pasal 3"))
+        self.assertEqual(records[-1].bab, 2)
+        self.assertIn("dimaksud dalam pasal 1 secara", " ".join(r.text for r in records if r.pasal == 2))
+        self.assertFalse(any("bab ii . . ." in record.text for record in records))
+
+    def test_missing_pasal_headings_resync(self):
+        """
+        Jika dua judul Pasal berturut-turut hilang, penomoran disinkronkan ulang pada judul
+        yang melanjutkan judul di luar urutan, atau pada Pasal pertama setelah BAB baru.
+        """
+        text = (
+            "BAB I\nKETENTUAN UMUM\n"
+            "Pasal 1\nsatu.\nPasal 2\ndua.\n"
+            "Pasal 5\nlima.\nPasal 6\nenam.\n"
+            "BAB II\nLARANGAN\n"
+            "Pasal 10\nsepuluh.\nPasal 11\nsebelas, lihat\nPasal 3\n"
+        )
+        records = list(perda_processor.iter_structural_chunks([(1, text)]))
+
+        self.assertEqual([record.pasal for record in records], [1, 2, 6, 10, 11])
+        self.assertEqual([record.bab for record in records], [1, 1, 1, 2, 2])
+        self.assertIn("pasal 5 lima.", records[1].text)
+        self.assertTrue(records[-1].text.endswith("sebelas, lihat pasal 3"))
+
+    def test_explanation_split_across_pages(self):
+        """
+        Judul penjelasan yang terpotong di batas halaman tetap memotong dokumen di halaman sebelumnya.
+        """
+        pages = [(1, "Pasal 1\nisi.\nPenjelas"), (2, "an\nAtas\nPeraturan"), (3, "penjelasan pasal 1")]
+
+        self.assertEqual(list(perda_processor.iter_document_pages(pages)), [(1, "Pasal 1\nisi.\n")])
+        self.assertEqual(list(perda_processor.iter_clean_pages(pages)), [(1, "pasal 1 isi.")])
+        self.assertEqual(list(perda_processor.iter_document_pages(pages[:1] + [(2, "Atas")])), [(1, "Pasal 1\nisi.\nPenjelas"), (2, "Atas")])
+
+    def test_deduplicate_chunks(self):
+        """
+        Chunk near-duplicate harus dibuang dan lokasinya dirujuk dari representatifnya.
+        """
+        body = " ".join(f"kata{i}" for i in range(100))
+        chunks = [f"pasal 1 {body}", "pasal 2 setiap orang dilarang membakar sampah", f"pasal 7 {body} tambahan"]
+        metadata = {field: np.arange(3, dtype=dtype) for field, dtype in perda_processor.CHUNK_METADATA_DTYPES.items()}
+
+        kept_chunks, kept_metadata, duplicates = perda_processor.deduplicate_chunks(chunks, metadata, threshold=0.8)
+
+        self.assertEqual(kept_chunks, chunks[:2])
+        np.testing.assert_array_equal(kept_metadata['doc_id'], [0, 1])
+        np.testing.assert_array_equal(duplicates['doc_id'], [2])
+        np.testing.assert_array_equal(duplicates['representative'], [0])
+
+class TestIncrementalBuild(unittest.TestCase):
+    """
+    Unit test untuk build indeks inkremental (manifest) pada perda_processor.main.
+    """
+
+    def setUp(self):
+        """
+        Menyalin dua PDF referensi kecil ke direktori input sementara.
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.pdf_dir = os.path.join(self.tmp_dir.name, "pdf")
+        self.output = os.path.join(self.tmp_dir.name, "perda_index")
+        os.makedirs(self.pdf_dir)
+        for pdf_file in ["Permen No.33-2010.pdf", "Perpres Nomor 97 Tahun 2017.pdf"]:
+            pdf_path = os.path.join(REFERENCE_DIR, pdf_file)
+            if not os.path.exists(pdf_path):
+                self.skipTest(f"File referensi tidak ditemukan: {pdf_path}")
+            shutil.copy(pdf_path, self.pdf_dir)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def build(self, *options: str) -> dict:
+        """Menjalankan build (tanpa embedding, default) dan mengembalikan meta.json indeks."""
+        perda_processor.main([self.pdf_dir, "--output", self.output, "--log-level", "ERROR", *options])
+        with open(os.path.join(self.output, "meta.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def build_counting(self, *options: str):
+        """Seperti build, beserta daftar PDF yang diekstrak ulang (tidak diambil dari manifest)."""
+        with mock.patch.object(perda_processor, 'process_document', wraps=perda_processor.process_document) as process:
+            meta = self.build(*options)
+        return meta, [os.path.basename(call.args[0]) for call in process.call_args_list]
+
+    def test_unchanged_files_reuse_cached_chunks(self):
+        """
+        Dokumen yang tidak berubah tidak diekstrak ulang dan chunks-nya sama dengan build pertama.
+        """
+        meta, processed = self.build_counting()
+        self.assertEqual(len(processed), 2)
+
+        rebuilt_meta, processed = self.build_counting("--dtype", "float32")
+
+        self.assertEqual(processed, [])
+        self.assertEqual(rebuilt_meta['num_chunks'], meta['num_chunks'])
+        self.assertEqual(rebuilt_meta['documents'], meta['documents'])
+
+    def test_changed_file_is_reextracted(self):
+        """
+        Hanya dokumen yang isinya berubah yang diekstrak ulang.
+        """
+        meta, _ = self.build_counting()
+        shutil.copy(os.path.join(REFERENCE_DIR, "PP Nomor 81 Tahun 2012.pdf"),
+                    os.path.join(self.pdf_dir, "Permen No.33-2010.pdf"))
+
+        rebuilt_meta, processed = self.build_counting()
+
+        self.assertEqual(processed, ["Permen No.33-2010.pdf"])
+        self.assertNotEqual(rebuilt_meta['num_chunks'], meta['num_chunks'])
+
+    def test_deleted_file_is_dropped(self):
+        """
+        Dokumen yang dihapus dari direktori input hilang dari indeks tanpa ekstraksi ulang.
+        """
+        self.build_counting()
+        os.remove(os.path.join(self.pdf_dir, "Permen No.33-2010.pdf"))
+
+        meta, processed = self.build_counting()
+
+        self.assertEqual(processed, [])
+        self.assertEqual(meta['documents'], ["Perpres Nomor 97 Tahun 2017.pdf"])
+        self.assertTrue((np.load(os.path.join(self.output, "meta_doc_id.npy")) == 0).all())
+
+    def test_chunking_setting_change_reprocesses_all(self):
+        """
+        Pengaturan chunking yang berubah membuat semua dokumen diekstrak ulang.
+        """
+        self.build_counting()
+
+        _, processed = self.build_counting("--max-chunk-tokens", "120")
+
+        self.assertEqual(sorted(processed), ["Permen No.33-2010.pdf", "Perpres Nomor 97 Tahun 2017.pdf"])
+
+    def test_index_option_change_rebuilds(self):
+        """
+        Opsi tingkat indeks yang berubah pada dokumen yang sama harus menulis ulang indeks.
+        """
+        meta = self.build()
+        self.assertEqual(meta['vectorizer']['dtype'], 'float64')
+
+        meta = self.build("--min-df", "2", "--dtype", "float32")
+
+        self.assertEqual(meta['vectorizer']['dtype'], 'float32')
+        self.assertLess(meta['shape'][1], self.build()['shape'][1])
+
+    def test_parallel_build_matches_serial(self):
+        """
+        Build paralel (termasuk ekstraksi per rentang halaman) menulis chunks dan metadata
+        chunk yang identik dengan build serial, bukan hanya jumlahnya.
+        """
+        def indexed_chunks():
+            chunks = list(index_store.load_index(self.output)[0])
+            metadata = index_store.load_chunk_metadata(self.output)
+            return chunks, {field: np.array(values) for field, values in metadata.arrays.items()}
+
+        self.build()
+        serial_chunks, serial_metadata = indexed_chunks()
+        self.build("--workers", "2", "--pages-per-task", "4", "--full-rebuild")
+        parallel_chunks, parallel_metadata = indexed_chunks()
+
+        self.assertEqual(parallel_chunks, serial_chunks)
+        self.assertEqual(set(parallel_metadata), set(serial_metadata))
+        for field, values in serial_metadata.items():
+            np.testing.assert_array_equal(parallel_metadata[field], values)
+
+    def test_report_settings_follow_build_signature(self):
+        """
+        Pengaturan di laporan build diturunkan dari signature build, sehingga setiap opsi
+        tingkat indeks tercatat tanpa daftar terpisah.
+        """
+        self.build("--workers", "2", "--dtype", "float32", "--no-dedup")
+        with open(perda_processor.default_report_path(self.output), 'r', encoding='utf-8') as f:
+            settings = json.load(f)['settings']
+        index_settings = perda_processor.joblib.load(perda_processor.default_manifest_path(self.output))['index_settings']
+
+        self.assertEqual({option: settings[option] for option in index_settings if option != 'ann'},
+                         {option: value for option, value in index_settings.items() if option != 'ann'})
+        self.assertEqual((settings['dtype'], settings['dedup_threshold'], settings['embedding_model']),
+                         ('float32', None, None))
+        self.assertEqual(settings['workers'], 2)
+        self.assertGreater(settings['vocabulary_size'], 0)
+
+    def test_failed_embeddings_are_retried(self):
+        """
+        Embedding hanya dibuat dengan --embeddings, dan model yang gagal dimuat tidak dicatat
+        di signature sehingga build berikutnya mencoba lagi.
+        """
+        with mock.patch.object(perda_processor, 'create_chunk_embeddings') as create_embeddings:
+            self.assertIsNone(self.build()['embeddings'])
+            create_embeddings.assert_not_called()
+
+            create_embeddings.return_value = None
+            self.assertIsNone(self.build("--embeddings")['embeddings'])
+
+            create_embeddings.side_effect = lambda chunks, *args: np.ones((len(chunks), 4), dtype=np.float16) / 2
+            meta = self.build("--embeddings")
+
+        self.assertEqual(create_embeddings.call_count, 2)
+        self.assertEqual(meta['embeddings']['dim'], 4)
+
+    def test_subdirectories_are_included(self):
+        """
+        PDF di subdirektori ikut diindeks dengan nama path relatif, dan jenis peraturannya
+        tetap dikenali.
+        """
+        os.makedirs(os.path.join(self.pdf_dir, "nasional"))
+        shutil.move(os.path.join(self.pdf_dir, "Perpres Nomor 97 Tahun 2017.pdf"), os.path.join(self.pdf_dir, "nasional"))
+
+        meta = self.build()
+
+        self.assertEqual(meta['documents'], ["Permen No.33-2010.pdf", "nasional/Perpres Nomor 97 Tahun 2017.pdf"])
+        self.assertEqual([attributes['level'] for attributes in meta['document_attributes']], ["permen", "perpres"])
+
+    def test_shard_and_bm25_options_rebuild(self):
+        """
+        --shards dan opsi BM25 pada korpus yang tidak berubah juga termasuk signature build.
+        """
+        meta = self.build()
+        self.assertIsNone(meta['shards'])
+        self.assertIsNotNone(meta['bm25'])
+
+        meta = self.build("--shards", "2", "--no-bm25")
+
+        self.assertEqual(len(meta['shards']), 2)
+        self.assertIsNone(meta['bm25'])
+
+if __name__ == "__main__":
+    unittest.main()
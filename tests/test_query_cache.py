@@ -0,0 +1,78 @@
+import unittest
+import sys
+import os
+
+# Menambahkan path src ke sys.path agar modul dapat diimpor
+sys.path.append(os.path.abspath("src"))
+
+from query_cache import QueryResultCache, normalize_query
+
+class FakeClock:
+    """Sumber waktu yang dapat dimajukan secara manual."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+class TestQueryResultCache(unittest.TestCase):
+    """
+    Unit test untuk cache hasil retrieval (LRU + TTL).
+    """
+
+    def test_lru_eviction_and_stats(self):
+        """
+        Entri yang paling lama tidak dipakai dibuang lebih dulu saat cache penuh.
+        """
+        cache = QueryResultCache(max_entries=2, ttl_seconds=None)
+        cache.put("a", [1])
+        cache.put("b", [2])
+        self.assertEqual(cache.get("a"), [1])
+        cache.put("c", [3])
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), [1])
+        self.assertEqual(cache.get("c"), [3])
+        self.assertEqual(cache.stats(), {'entries': 2, 'hits': 3, 'misses': 1, 'evictions': 1, 'expirations': 0})
+
+    def test_ttl_expiration(self):
+        """
+        Entri yang lebih tua dari TTL dianggap tidak ada dan dibuang.
+        """
+        clock = FakeClock()
+        cache = QueryResultCache(max_entries=4, ttl_seconds=10, clock=clock)
+        cache.put("a", [1])
+        clock.now = 9
+        self.assertEqual(cache.get("a"), [1])
+        clock.now = 11
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.stats()['expirations'], 1)
+
+    def test_disabled_and_normalization(self):
+        """
+        Cache berukuran 0 tidak menyimpan apa pun; query dinormalisasi spasi dan (opsional) huruf kecil.
+        """
+        cache = QueryResultCache(max_entries=0)
+        cache.put("a", [1])
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(normalize_query("  Sanksi   MEMBAKAR\tsampah "), "sanksi membakar sampah")
+        self.assertEqual(normalize_query("  Sanksi   MEMBAKAR\tsampah ", lowercase=False), "Sanksi MEMBAKAR sampah")
+
+    def test_values_are_copied(self):
+        """
+        Mengubah hasil yang diambil (atau yang disimpan) tidak mengubah isi cache.
+        """
+        cache = QueryResultCache(max_entries=2, ttl_seconds=None)
+        results = [("pasal 1", 0.5, {'document': "a.pdf"})]
+        cache.put("a", results)
+        results[0][2]['document'] = "b.pdf"
+        cache.get("a")[0][2]['document'] = "c.pdf"
+        cache.get("a").append(("pasal 2", 0.1, None))
+
+        self.assertEqual(cache.get("a"), [("pasal 1", 0.5, {'document': "a.pdf"})])
+
+if __name__ == "__main__":
+    unittest.main()
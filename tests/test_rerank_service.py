@@ -0,0 +1,136 @@
+import unittest
+import sys
+import os
+import time
+import threading
+from concurrent.futures import CancelledError
+
+# Menambahkan path src ke sys.path agar modul dapat diimpor
+sys.path.append(os.path.abspath("src"))
+
+import numpy as np
+from rerank_service import MicroBatchReranker
+
+class FakeReranker:
+    """Reranker palsu: skor = panjang passage; mencatat jumlah pasangan per panggilan predict."""
+
+    def __init__(self, fail_on=None, gate=None):
+        self.calls = []
+        self.fail_on = fail_on
+        # Jika diberikan, predict menunggu gate di-set (mensimulasikan batch yang lama)
+        self.gate = gate
+        self.lock = threading.Lock()
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        if self.gate is not None:
+            self.gate.wait()
+        if any(passage == self.fail_on for _, passage in pairs):
+            raise RuntimeError("model gagal")
+        with self.lock:
+            self.calls.append(len(pairs))
+        return np.array([len(passage) for _, passage in pairs], dtype=np.float32)
+
+class TestMicroBatchReranker(unittest.TestCase):
+    """
+    Unit test untuk worker reranking yang menggabungkan request serentak.
+    """
+
+    def test_concurrent_requests_share_batches(self):
+        """
+        Request dari beberapa thread digabung ke batch yang sama, dan setiap pemanggil
+        menerima skor untuk pasangannya sendiri.
+        """
+        model = FakeReranker()
+        service = MicroBatchReranker(model, max_batch_pairs=1000, max_wait_ms=200, batch_size=1000)
+        requests = [[["q", "a" * (n + i)] for n in range(5)] for i in range(8)]
+        results = [None] * len(requests)
+
+        def worker(i):
+            results[i] = service.predict(requests[i])
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(requests))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        service.close()
+
+        for pairs, scores in zip(requests, results):
+            self.assertEqual(scores.tolist(), [len(passage) for _, passage in pairs])
+        stats = service.stats()
+        self.assertEqual(stats['requests'], len(requests))
+        self.assertLess(stats['batches'], len(requests))
+        self.assertEqual(stats['queue_depth'], 0)
+
+    def test_batch_limit_and_errors(self):
+        """
+        Batch gabungan tidak melebihi max_batch_pairs (kecuali satu request yang lebih besar),
+        dan kegagalan model diteruskan ke Future setiap request di batch tersebut.
+        """
+        model = FakeReranker(fail_on="rusak")
+        service = MicroBatchReranker(model, max_batch_pairs=4, max_wait_ms=50, batch_size=100)
+        futures = [service.submit([["q", "x"]] * size) for size in (3, 3, 6, 1)]
+        self.assertEqual([len(future.result()) for future in futures], [3, 3, 6, 1])
+
+        with self.assertRaises(RuntimeError):
+            service.predict([["q", "rusak"]])
+        self.assertEqual(len(service.predict([])), 0)
+        service.close()
+        self.assertTrue(all(size <= 4 or size == 6 for size in model.calls))
+
+    def test_cancelled_request_is_dropped(self):
+        """
+        Request yang dibatalkan saat menunggu di antrian langsung kembali dengan CancelledError
+        dan tidak pernah diskor model.
+        """
+        gate = threading.Event()
+        model = FakeReranker(gate=gate)
+        service = MicroBatchReranker(model, max_batch_pairs=2, max_wait_ms=0, batch_size=100)
+        self.addCleanup(service.close)
+        self.addCleanup(gate.set)
+        # Batch pertama memblokir worker; request kedua menunggu di antrian
+        busy = service.submit([["q", "a"], ["q", "b"]])
+        while not busy.running():
+            time.sleep(0.001)
+        cancel_event = threading.Event()
+        errors = []
+
+        def worker():
+            try:
+                service.predict([["q", "dibatalkan"]] * 3, cancel_event=cancel_event)
+            except CancelledError as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        while service.queue_depth < 1:
+            time.sleep(0.001)
+        cancel_event.set()
+        thread.join(timeout=5)
+        self.assertFalse(thread.is_alive(), "predict seharusnya kembali tanpa menunggu batch yang berjalan.")
+        self.assertEqual(len(errors), 1)
+
+        gate.set()
+        self.assertEqual(busy.result(timeout=5).tolist(), [1, 1])
+        self.assertEqual(service.predict([["q", "abc"]]).tolist(), [3])
+        self.assertEqual(model.calls, [2, 1])
+        self.assertEqual(service.stats()['queue_depth'], 0)
+        with self.assertRaises(CancelledError):
+            service.predict([["q", "a"]], cancel_event=cancel_event)
+
+    def test_submit_after_close_raises(self):
+        """
+        Setelah close, submit dan predict melempar RuntimeError alih-alih menunggu selamanya.
+        """
+        service = MicroBatchReranker(FakeReranker())
+        self.assertEqual(service.predict([["q", "ab"]]).tolist(), [2])
+        service.close()
+        service.close()
+
+        with self.assertRaises(RuntimeError):
+            service.submit([["q", "ab"]])
+        with self.assertRaises(RuntimeError):
+            service.predict([["q", "ab"]])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import sys
+import os
+
+# Menambahkan path src ke sys.path agar modul dapat diimpor
+sys.path.append(os.path.abspath("src"))
+
+import numpy as np
+from reranking import backend_model_key, predict_bucketed, resolve_backend
+
+class FakeReranker:
+    """Reranker palsu: skor = panjang passage; mencatat ukuran setiap batch."""
+
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.batches.append([len(passage) for _, passage in pairs])
+        return np.array([len(passage) for _, passage in pairs], dtype=np.float32)
+
+class TestPredictBucketed(unittest.TestCase):
+    """
+    Unit test untuk reranking micro-batch berdasarkan panjang.
+    """
+
+    def test_batches_sorted_by_length_and_scores_in_order(self):
+        """
+        Batch berisi pasangan dengan panjang serupa, dan skor kembali sesuai urutan input.
+        """
+        passages = ["a" * n for n in [5, 50, 1, 30, 2, 40, 3]]
+        pairs = [["query", passage] for passage in passages]
+        model = FakeReranker()
+        timings = []
+
+        scores = predict_bucketed(model, pairs, batch_size=3, timings=timings)
+
+        self.assertEqual(scores.tolist(), [5, 50, 1, 30, 2, 40, 3])
+        self.assertEqual(model.batches, [[50, 40, 30], [5, 3, 2], [1]])
+        self.assertEqual([entry['pairs'] for entry in timings], [3, 3, 1])
+        self.assertEqual(timings[0]['max_chars'], len("query") + 50)
+        self.assertEqual(len(predict_bucketed(model, [], batch_size=3)), 0)
+
+    def test_backend_selection(self):
+        """
+        Backend tidak dikenal jatuh ke fp32, dan skor int8 disimpan di cache dengan nama model berbeda.
+        """
+        self.assertEqual(resolve_backend("INT8"), "int8")
+        self.assertEqual(resolve_backend("onnx"), "fp32")
+        self.assertEqual(backend_model_key("model-uji", "fp32"), "model-uji")
+        self.assertEqual(backend_model_key("model-uji", "int8"), "model-uji@int8")
+        self.assertEqual(backend_model_key("model-uji", "int8", 256), "model-uji@int8@max_length=256")
+        self.assertNotEqual(backend_model_key("model-uji", "fp32", 256), backend_model_key("model-uji", "fp32", 512))
+
+if __name__ == "__main__":
+    unittest.main()
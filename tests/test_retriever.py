@@ -0,0 +1,251 @@
+import unittest
+import sys
+import os
+import tempfile
+import threading
+from concurrent.futures import CancelledError
+from unittest import mock
+
+# Menambahkan path src ke sys.path agar modul dapat diimpor
+sys.path.append(os.path.abspath("src"))
+
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from index_store import BM25Index, save_index
+from retriever import DocumentRetriever
+
+class StubCrossEncoder:
+    """CrossEncoder tiruan: skor = panjang chunk, dan setiap pasangan yang diskor dicatat."""
+
+    def __init__(self):
+        self.scored_pairs = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.scored_pairs.extend(pairs)
+        return np.array([len(chunk) for _, chunk in pairs], dtype=np.float32)
+
+class TestDocumentRetriever(unittest.IsolatedAsyncioTestCase):
+    """
+    Unit test untuk DocumentRetriever tanpa model: pemuatan model yang ditunda dan API async.
+    """
+
+    def setUp(self):
+        """
+        Membuat indeks TF-IDF kecil di direktori sementara.
+        """
+        chunks = [
+            "pasal 1 setiap orang dilarang membakar sampah",
+            "pasal 2 sanksi administratif berupa denda",
+            "pengelolaan sampah rumah tangga oleh pemerintah daerah",
+        ]
+        self.chunks = chunks
+        vectorizer = TfidfVectorizer()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.index_dir = os.path.join(self.tmp_dir.name, "perda_index")
+        chunk_metadata = {'doc_id': np.array([0, 0, 1], dtype=np.int32)}
+        save_index(self.index_dir, chunks, vectorizer, vectorizer.fit_transform(chunks),
+                   documents=["perda_9_2018.pdf", "uu_18_2008.pdf"], chunk_metadata=chunk_metadata,
+                   document_attributes=[{'level': 'perda', 'year': 2018}, {'level': 'uu', 'year': 2008}])
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_baseline_does_not_load_reranker(self):
+        """
+        Retrieval tanpa reranker dapat langsung dilayani tanpa memuat model apa pun.
+        """
+        retriever = DocumentRetriever(self.index_dir, score_cache_path=None)
+
+        results = retriever.retrieve_chunks("sanksi membakar sampah", top_k=2, use_reranker=False)
+
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0][0], "pasal 1 setiap orang dilarang membakar sampah")
+        self.assertFalse(retriever.reranker_ready)
+        self.assertIsNone(retriever._reranker)
+        self.assertIn('index', retriever.startup_timings)
+        self.assertNotIn('reranker', retriever.startup_timings)
+
+    def test_scoped_retrieval(self):
+        """
+        Filter cakupan hanya mengembalikan chunk dari dokumen yang cocok dan tidak
+        tertukar dengan hasil tanpa filter di cache query.
+        """
+        retriever = DocumentRetriever(self.index_dir, score_cache_path=None)
+
+        unscoped = retriever.retrieve_chunks("pengelolaan sampah", top_k=3, use_reranker=False)
+        national = retriever.retrieve_chunks("pengelolaan sampah", top_k=3, use_reranker=False, levels=["uu"])
+        perda = retriever.retrieve_chunks("pengelolaan sampah", top_k=3, use_reranker=False,
+                                          documents=["perda_9_2018.pdf"])
+
+        self.assertEqual(unscoped[0][0], "pengelolaan sampah rumah tangga oleh pemerintah daerah")
+        self.assertEqual([chunk for chunk, _ in national], ["pengelolaan sampah rumah tangga oleh pemerintah daerah"])
+        self.assertEqual([chunk for chunk, _ in perda], ["pasal 1 setiap orang dilarang membakar sampah"])
+        self.assertEqual(retriever.retrieve_chunks("pengelolaan sampah", top_k=3, use_reranker=False, years=[1999]), [])
+        self.assertEqual(retriever.scope_size(years=[1999]), 0)
+        self.assertEqual(retriever.scope_size(levels=["perda"]), 2)
+        self.assertIsNone(retriever.scope_size())
+
+    def test_sharded_search_matches_unsharded(self):
+        """
+        Scatter-gather atas shard di proses worker memberi hasil yang identik (urutan dan skor)
+        dengan indeks utuh (digabung dari shard), untuk TF-IDF dan BM25, dengan atau tanpa
+        filter cakupan, dan juga untuk retrieval batch.
+        """
+        rng = np.random.default_rng(0)
+        words = ["sampah", "pasal", "denda", "daerah", "retribusi", "izin", "limbah", "sanksi", "bank", "kompos"]
+        chunks = [" ".join(rng.choice(words, size=rng.integers(3, 12))) + f" nomor{i}" for i in range(60)]
+        vectorizer = TfidfVectorizer()
+        tfidf_matrix = vectorizer.fit_transform(chunks)
+        term_frequencies = CountVectorizer(vocabulary=vectorizer.vocabulary_).fit_transform(chunks)
+        index_dir = os.path.join(self.tmp_dir.name, "sharded_index")
+        bm25_index = BM25Index.from_term_frequencies(term_frequencies)
+        save_index(index_dir, chunks, vectorizer, tfidf_matrix, documents=["a.pdf", "b.pdf"],
+                   chunk_metadata={'doc_id': (np.arange(60) % 2).astype(np.int32)},
+                   bm25_index=bm25_index, num_shards=3)
+        unsharded = DocumentRetriever(index_dir, cache_size=0, score_cache_path=None)
+        sharded = DocumentRetriever(index_dir, cache_size=0, score_cache_path=None, shard_workers=True)
+        self.addCleanup(sharded.close)
+
+        self.assertEqual(len(sharded.shard_searcher), 3)
+        for first_stage in ("tfidf", "bm25"):
+            for query in ["denda sampah", "izin limbah bank sampah kompos", "retribusi"]:
+                for documents in (None, ["b.pdf"]):
+                    expected = unsharded.retrieve_chunks(query, top_k=15, use_reranker=False,
+                                                         first_stage=first_stage, documents=documents)
+                    actual = sharded.retrieve_chunks(query, top_k=15, use_reranker=False,
+                                                     first_stage=first_stage, documents=documents)
+                    self.assertEqual(actual, expected)
+                    self.assertTrue(actual)
+
+        # Array scoring hanya disimpan per shard, dan proses induk tidak memuatnya
+        self.assertFalse(os.path.exists(os.path.join(index_dir, "tfidf_data.npy")))
+        self.assertIsNone(sharded.tfidf_matrix)
+        self.assertIsNone(sharded.bm25_index)
+        np.testing.assert_array_equal(unsharded.tfidf_matrix.toarray(), tfidf_matrix.toarray())
+        for name in BM25Index.ARRAY_NAMES:
+            np.testing.assert_array_equal(getattr(unsharded.bm25_index, name), getattr(bm25_index, name))
+
+        queries = ["denda sampah", "", "izin limbah bank sampah kompos", "retribusi", "tidakada"]
+        for first_stage in ("tfidf", "bm25"):
+            expected = unsharded.retrieve_chunks_batch(queries, top_k=15, use_reranker=False, first_stage=first_stage)
+            actual = sharded.retrieve_chunks_batch(queries, top_k=15, use_reranker=False, first_stage=first_stage)
+            self.assertEqual(actual, expected)
+            self.assertTrue(actual[0])
+
+    def test_cascade_model_loaded_lazily_and_prunes(self):
+        """
+        Reranker cascade baru dimuat pada query pertama dengan cascade_k > 0, lalu menyaring
+        kandidat menjadi cascade_k sebelum reranker utama menskor.
+        """
+        models = {'utama': StubCrossEncoder(), 'cascade': StubCrossEncoder()}
+        loaded = []
+
+        def load_cross_encoder(model_name, timing_key):
+            loaded.append(model_name)
+            return models['cascade' if model_name == 'stub-cascade' else 'utama']
+
+        retriever = DocumentRetriever(self.index_dir, cache_size=0, score_cache_path=None, cascade_model='stub-cascade')
+        with mock.patch.object(retriever, '_load_cross_encoder', side_effect=load_cross_encoder):
+            retriever.warm_up(background=False)
+            retriever.retrieve_chunks("pasal sampah", top_k=3, initial_k=3, use_reranker=True)
+            self.assertNotIn('stub-cascade', loaded)
+
+            results = retriever.retrieve_chunks("pasal sampah", top_k=3, initial_k=3, use_reranker=True, cascade_k=2)
+
+        self.assertEqual(loaded.count('stub-cascade'), 1)
+        self.assertEqual(len(models['cascade'].scored_pairs), 3)
+        # Dua chunk terpanjang (skor cascade tertinggi) yang diteruskan ke reranker utama
+        longest = sorted(retriever.chunks, key=len)[1:]
+        self.assertEqual(sorted(chunk for _, chunk in models['utama'].scored_pairs[-2:]), sorted(longest))
+        # Pemanasan (1 pasangan), query tanpa cascade (3), query cascade (2)
+        self.assertEqual(len(models['utama'].scored_pairs), 1 + 3 + 2)
+        self.assertEqual([chunk for chunk, _ in results], sorted(longest, key=len, reverse=True))
+
+    def test_warm_up_goes_through_micro_batch_service(self):
+        """
+        Dengan micro-batching, prediksi pemanasan dikirim lewat worker micro-batch sehingga
+        model tidak dipanggil bersamaan dari thread pemanasan dan thread worker.
+        """
+        model = StubCrossEncoder()
+        retriever = DocumentRetriever(self.index_dir, cache_size=0, score_cache_path=None, cascade_model=None,
+                                      micro_batching=True)
+        self.addCleanup(retriever.close)
+        with mock.patch.object(retriever, '_load_cross_encoder', return_value=model):
+            retriever.warm_up(background=False)
+
+        self.assertEqual(len(model.scored_pairs), 1)
+        self.assertEqual(retriever.rerank_queue_stats()['requests'], 1)
+
+    def test_rerank_timings_are_per_call(self):
+        """
+        Waktu per micro-batch reranking dikembalikan ke timings milik pemanggil, bukan
+        disimpan di atribut instance yang dipakai bersama oleh query serentak.
+        """
+        retriever = DocumentRetriever(self.index_dir, cache_size=0, score_cache_path=None, cascade_model=None)
+        with mock.patch.object(retriever, '_load_cross_encoder', return_value=StubCrossEncoder()):
+            retriever.warm_up(background=False)
+            first, second = [], []
+            retriever._rerank_candidates(retriever._state, ["sampah"], [np.array([0, 1, 2])], timings=first)
+            retriever._rerank_candidates(retriever._state, ["denda"], [np.array([1])], timings=second)
+        self.addCleanup(retriever.close)
+
+        self.assertEqual(sum(entry['pairs'] for entry in first), 3)
+        self.assertEqual(sum(entry['pairs'] for entry in second), 1)
+        self.assertFalse(hasattr(retriever, 'last_rerank_timings'))
+
+    def test_reload_during_queries_is_consistent(self):
+        """
+        Query yang berjalan bersamaan dengan muat ulang indeks selalu memakai satu versi indeks
+        utuh: semua chunk hasilnya berasal dari versi yang sama.
+        """
+        versions = [[f"versi{version} sampah pasal {i} " + "kata " * i for i in range(6)] for version in range(2)]
+        retriever = DocumentRetriever(self.index_dir, cache_size=0, score_cache_path=None)
+        errors, results = [], []
+        stop = threading.Event()
+
+        def query_loop():
+            while not stop.is_set():
+                try:
+                    results.append(retriever.retrieve_chunks("sampah pasal", top_k=6, use_reranker=False))
+                except Exception as e:
+                    errors.append(e)
+
+        threads = [threading.Thread(target=query_loop) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for rebuild in range(10):
+            chunks = versions[rebuild % 2]
+            vectorizer = TfidfVectorizer()
+            save_index(self.index_dir, chunks, vectorizer, vectorizer.fit_transform(chunks))
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertTrue(results)
+        # Indeks awal dari setUp juga merupakan satu versi
+        version_sets = [set(chunks) for chunks in versions] + [set(self.chunks)]
+        for result in results:
+            chunks = {chunk for chunk, _ in result}
+            self.assertTrue(any(chunks <= version for version in version_sets), f"Hasil mencampur versi indeks: {chunks}")
+        self.assertTrue(all(chunk in versions[1] for chunk, _ in retriever.retrieve_chunks("sampah", use_reranker=False)))
+
+    async def test_async_matches_sync_and_cancels(self):
+        """
+        aretrieve_chunks memberi hasil yang sama dengan retrieve_chunks, dan retrieval
+        dengan sinyal pembatalan yang sudah di-set berhenti tanpa hasil.
+        """
+        retriever = DocumentRetriever(self.index_dir, cache_size=0, score_cache_path=None)
+        self.addCleanup(retriever.close)
+
+        expected = retriever.retrieve_chunks("pengelolaan sampah", top_k=3, use_reranker=False)
+        actual = await retriever.aretrieve_chunks("pengelolaan sampah", top_k=3, use_reranker=False)
+
+        self.assertEqual(actual, expected)
+        cancel_event = threading.Event()
+        cancel_event.set()
+        with self.assertRaises(CancelledError):
+            retriever.retrieve_chunks("pengelolaan sampah", use_reranker=False, cancel_event=cancel_event)
+
+if __name__ == "__main__":
+    unittest.main()
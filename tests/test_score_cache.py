@@ -0,0 +1,79 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Menambahkan path src ke sys.path agar modul dapat diimpor
+sys.path.append(os.path.abspath("src"))
+
+from score_cache import RerankerScoreCache, chunk_key
+
+class TestRerankerScoreCache(unittest.TestCase):
+    """
+    Unit test untuk cache skor reranker berbasis SQLite.
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "scores.sqlite")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_persistence_and_model_isolation(self):
+        """
+        Skor tersimpan di disk per model; model lain dan query lain tidak ikut terbaca.
+        """
+        key_a, key_b = chunk_key("pasal 1 dilarang membakar sampah"), chunk_key("pasal 2 sanksi denda")
+        cache = RerankerScoreCache(self.path, "model-a")
+        cache.put_many([("sanksi membakar sampah", key_a, 4.5), ("sanksi membakar sampah", key_b, -1.25)])
+        cache.close()
+
+        reopened = RerankerScoreCache(self.path, "model-a")
+        other_model = RerankerScoreCache(self.path, "model-b")
+
+        self.assertEqual(reopened.get_many("sanksi membakar sampah", [key_a, key_b, chunk_key("lain")]),
+                         {key_a: 4.5, key_b: -1.25})
+        self.assertEqual(reopened.get_many("jadwal tps", [key_a]), {})
+        self.assertEqual(other_model.get_many("sanksi membakar sampah", [key_a]), {})
+        self.assertEqual(len(reopened), 2)
+        reopened.close()
+        other_model.close()
+
+    def test_eviction_keeps_newest_scores(self):
+        """
+        Setelah melewati max_rows, skor yang paling lama ditulis dibuang lebih dulu.
+        """
+        cache = RerankerScoreCache(self.path, "model-a", max_rows=10)
+        old_keys = [chunk_key(f"lama {i}") for i in range(10)]
+        new_keys = [chunk_key(f"baru {i}") for i in range(5)]
+        cache.put_many([("q", key, 1.0) for key in old_keys])
+        self.assertEqual(len(cache), 10)
+        cache.put_many([("q", key, 2.0) for key in new_keys])
+
+        self.assertEqual(len(cache), 9)
+        self.assertEqual(len(cache.get_many("q", new_keys)), 5)
+        self.assertEqual(len(cache.get_many("q", old_keys)), 4)
+        cache.close()
+
+    def test_read_errors_are_cache_misses(self):
+        """
+        Kegagalan membaca file cache diperlakukan sebagai cache miss, bukan error retrieval.
+        """
+        key = chunk_key("pasal 1")
+        cache = RerankerScoreCache(self.path, "model-a")
+        cache.put_many([("q", key, 1.0)])
+        cache.close()
+
+        self.assertEqual(cache.get_many("q", [key]), {})
+        cache.put_many([("q", key, 1.0)])
+
+    def test_chunk_key_depends_on_text(self):
+        """
+        Id chunk hanya bergantung pada teks chunk.
+        """
+        self.assertEqual(chunk_key("pasal 1"), chunk_key("pasal 1"))
+        self.assertNotEqual(chunk_key("pasal 1"), chunk_key("pasal 2"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,208 @@
+import unittest
+import sys
+import os
+
+# Menambahkan path src ke sys.path agar modul dapat diimpor
+sys.path.append(os.path.abspath("src"))
+
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+from index_store import BM25Index
+from scoring import (bm25_top_k, dense_top_k, merge_top_k, reciprocal_rank_fusion, select_top_k, tfidf_top_k,
+                     tfidf_top_k_batch)
+
+class CountingArray:
+    """Pembungkus array yang menghitung jumlah elemen yang dibaca lewat indexing."""
+
+    def __init__(self, array):
+        self.array = array
+        self.elements_read = 0
+
+    def __getitem__(self, key):
+        values = self.array[key]
+        self.elements_read += np.size(values)
+        return values
+
+class TestScoring(unittest.TestCase):
+    """
+    Unit test untuk kernel scoring tahap pertama.
+    """
+
+    def test_select_top_k_ties(self):
+        """
+        Skor seri di batas top-k harus dipilih dan diurutkan berdasarkan indeks chunk.
+        """
+        indices = np.array([9, 3, 7, 1, 5])
+        scores = np.array([0.5, 0.9, 0.5, 0.5, 0.1])
+
+        top_indices, top_scores = select_top_k(indices, scores, 3)
+
+        self.assertEqual(top_indices.tolist(), [3, 1, 7])
+        self.assertEqual(top_scores.tolist(), [0.9, 0.5, 0.5])
+        self.assertEqual(select_top_k(indices, scores, 10)[0].tolist(), [3, 1, 7, 9, 5])
+
+    def test_tfidf_top_k_matches_cosine(self):
+        """
+        Hasil kernel harus sama dengan cosine similarity + argsort, tanpa chunk berskor nol.
+        """
+        chunks = [
+            "pasal 1 setiap orang dilarang membakar sampah",
+            "pasal 2 sanksi administratif berupa denda",
+            "pengelolaan sampah rumah tangga oleh pemerintah daerah",
+            "retribusi pelayanan persampahan",
+        ]
+        vectorizer = TfidfVectorizer()
+        tfidf_matrix = vectorizer.fit_transform(chunks)
+        query_vector = vectorizer.transform(["sanksi membakar sampah"])
+
+        top_indices, top_scores = tfidf_top_k(query_vector, tfidf_matrix, 10)
+
+        expected = cosine_similarity(query_vector, tfidf_matrix).ravel()
+        self.assertEqual(top_indices.tolist(), [i for i in np.argsort(-expected, kind='stable') if expected[i] > 0])
+        np.testing.assert_allclose(top_scores, expected[top_indices])
+        self.assertEqual(len(tfidf_top_k(vectorizer.transform(["kata asing"]), tfidf_matrix, 5)[0]), 0)
+
+    def test_tfidf_top_k_batch_matches_single(self):
+        """
+        Scoring batch harus memberi kandidat dan skor yang sama dengan tfidf_top_k per query.
+        """
+        chunks = [
+            "pasal 1 setiap orang dilarang membakar sampah",
+            "pasal 2 sanksi administratif berupa denda",
+            "pengelolaan sampah rumah tangga oleh pemerintah daerah",
+            "retribusi pelayanan persampahan",
+        ]
+        vectorizer = TfidfVectorizer()
+        tfidf_matrix = vectorizer.fit_transform(chunks)
+        queries = ["sanksi membakar sampah", "kata asing", "retribusi sampah daerah"]
+
+        batch_results = tfidf_top_k_batch(vectorizer.transform(queries), tfidf_matrix, 2)
+
+        self.assertEqual(len(batch_results), len(queries))
+        for query, (top_indices, top_scores) in zip(queries, batch_results):
+            expected_indices, expected_scores = tfidf_top_k(vectorizer.transform([query]), tfidf_matrix, 2)
+            self.assertEqual(top_indices.tolist(), expected_indices.tolist())
+            np.testing.assert_array_equal(top_scores, expected_scores)
+
+    def test_dense_top_k_float16(self):
+        """
+        Scoring dense pada embedding float16 harus sama dengan cosine similarity float32.
+        """
+        rng = np.random.default_rng(0)
+        embeddings = rng.standard_normal((500, 16)).astype(np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        query = embeddings[7] + 0.1 * rng.standard_normal(16).astype(np.float32)
+        query /= np.linalg.norm(query)
+
+        top_indices, top_scores = dense_top_k(query, embeddings.astype(np.float16), 5)
+
+        expected = embeddings.astype(np.float16).astype(np.float32) @ query
+        self.assertEqual(top_indices[0], 7)
+        self.assertEqual(top_indices.tolist(), np.argsort(-expected, kind='stable')[:5].tolist())
+        np.testing.assert_allclose(top_scores, expected[top_indices], rtol=1e-6)
+
+    def test_merge_top_k_matches_select_top_k(self):
+        """
+        K-way merge top-k per bagian indeks sama dengan top-k atas seluruh indeks, termasuk seri.
+        """
+        rng = np.random.default_rng(0)
+        # Skor dibulatkan agar banyak seri yang melintasi batas bagian
+        scores = rng.integers(0, 20, size=1000).astype(np.float32) / 4
+        expected = select_top_k(np.arange(len(scores)), scores, 50)
+
+        bounds = [0, 137, 600, 601, 1000]
+        parts = [select_top_k(np.arange(start, end), scores[start:end], 50) for start, end in zip(bounds[:-1], bounds[1:])]
+        merged = merge_top_k(parts, 50)
+
+        np.testing.assert_array_equal(merged[0], expected[0])
+        np.testing.assert_array_equal(merged[1], expected[1])
+        self.assertEqual(merged[1].dtype, np.float32)
+
+    def test_reciprocal_rank_fusion(self):
+        """
+        Chunk yang muncul di kedua peringkat harus mengungguli chunk yang hanya muncul di satu peringkat.
+        """
+        lexical = np.array([3, 1, 4])
+        dense = np.array([1, 5, 9])
+
+        fused_indices, fused_scores = reciprocal_rank_fusion([lexical, dense], 4, rrf_k=60)
+
+        self.assertEqual(fused_indices.tolist(), [1, 3, 5, 4])
+        self.assertAlmostEqual(fused_scores[0], 1 / 62 + 1 / 61)
+        self.assertAlmostEqual(fused_scores[1], 1 / 61)
+
+    def test_bm25_top_k_pruning_is_exact(self):
+        """
+        Top-k BM25 dengan pruning MaxScore harus sama dengan scoring menyeluruh dan rumus BM25.
+        """
+        rng = np.random.default_rng(0)
+        words = [f"kata{i}" for i in range(40)]
+        # Distribusi Zipf agar ada term umum (posting panjang) dan term langka
+        probabilities = 1.0 / np.arange(1, len(words) + 1)
+        probabilities /= probabilities.sum()
+        chunks = [" ".join(rng.choice(words, size=rng.integers(5, 30), p=probabilities)) for _ in range(300)]
+        counter = CountVectorizer()
+        term_frequencies = counter.fit_transform(chunks)
+        bm25_index = BM25Index.from_term_frequencies(term_frequencies, k1=1.2, b=0.75)
+
+        # Skor BM25 brute force
+        tf = term_frequencies.toarray().astype(np.float64)
+        doc_lengths = tf.sum(axis=1)
+        df = (tf > 0).sum(axis=0)
+        idf = np.log(1 + (len(chunks) - df + 0.5) / (df + 0.5))
+        norm = 1.2 * (1 - 0.75 + 0.75 * doc_lengths / doc_lengths.mean())
+
+        for _ in range(20):
+            terms = np.unique(rng.choice(len(words), size=rng.integers(1, 8), p=probabilities))
+            columns = np.array([counter.vocabulary_[words[t]] for t in terms])
+            query_counts = rng.integers(1, 3, size=len(columns))
+            expected = (tf[:, columns] * 2.2 / (tf[:, columns] + norm[:, None]) * idf[columns] * query_counts).sum(axis=1)
+
+            stats = {}
+            pruned = bm25_top_k(bm25_index, columns, query_counts, 10, stats=stats)
+            exhaustive = bm25_top_k(bm25_index, columns, query_counts, 10, prune=False)
+
+            self.assertEqual(pruned[0].tolist(), exhaustive[0].tolist())
+            np.testing.assert_array_equal(pruned[1], exhaustive[1])
+            np.testing.assert_allclose(pruned[1], expected[pruned[0]], rtol=1e-5)
+            self.assertAlmostEqual(pruned[1][-1], np.sort(expected)[-10], places=4)
+            self.assertLessEqual(stats['postings_scanned'], stats['postings_total'])
+
+            # Cakupan terfilter: top-k dari baris dalam mask saja
+            row_mask = rng.random(len(chunks)) < 0.3
+            scoped = bm25_top_k(bm25_index, columns, query_counts, 10, row_mask=row_mask)
+            self.assertTrue(row_mask[scoped[0]].all())
+            np.testing.assert_allclose(scoped[1], np.sort(expected[row_mask & (expected > 0)])[::-1][:10], rtol=1e-5)
+
+    def test_bm25_pruned_probes_touch_only_matching_postings(self):
+        """
+        Setelah pruning aktif, term umum (posting panjang) hanya dicari untuk kandidat: bobot
+        yang dibaca hanya milik kandidat yang cocok, bukan seluruh posting.
+        """
+        num_docs = 5000
+        # Korpus miring: "umum" ada di semua chunk, "langka" hanya di 20 chunk
+        chunks = [("langka " if i % 250 == 0 else "") + "umum " + f"isi{i % 50}" for i in range(num_docs)]
+        counter = CountVectorizer()
+        bm25_index = BM25Index.from_term_frequencies(counter.fit_transform(chunks))
+        columns = np.array([counter.vocabulary_["langka"], counter.vocabulary_["umum"]])
+        expected = bm25_top_k(bm25_index, columns, np.ones(2), 5, prune=False)
+
+        weights = CountingArray(bm25_index.weights)
+        row_mask = CountingArray(np.ones(num_docs, dtype=bool))
+        counting_index = BM25Index(bm25_index.indptr, bm25_index.docs, weights, bm25_index.max_weights,
+                                   bm25_index.num_docs, bm25_index.k1, bm25_index.b, bm25_index.avgdl)
+        stats = {}
+        actual = bm25_top_k(counting_index, columns, np.ones(2), 5, stats=stats, row_mask=row_mask)
+
+        self.assertEqual(actual[0].tolist(), expected[0].tolist())
+        np.testing.assert_array_equal(actual[1], expected[1])
+        self.assertEqual(stats['postings_total'], num_docs + 20)
+        self.assertEqual(stats['postings_scanned'], 20)
+        # Bobot dan mask hanya dibaca untuk posting "langka" dan paling banyak 20 kandidat di posting "umum"
+        self.assertLessEqual(weights.elements_read, 40)
+        self.assertEqual(row_mask.elements_read, 20)
+        self.assertLess(stats['postings_scanned'] + stats['postings_probed'], num_docs // 10)
+
+if __name__ == "__main__":
+    unittest.main()